@@ -0,0 +1,210 @@
+"""
+Swept circle collisions against the walls of the map
+Walls are the edges of every room's rect w/ the entryways cut out (same walls/doors that are baked into the navmesh)
+ - Wall segments are extracted once and stored in a uniform grid (each cell lists the segments passing through it)
+ - A move gathers the segments near the swept circle once, then finds the earliest hit, slides along the wall and
+   repeats w/ the rest of the move (a few times at most, for corners)
+"""
+
+import math
+
+import numpy as np
+
+import configs
+
+# debug variables
+debug = False
+
+# distance kept between a circle and the wall it slid along (avoids starting the next step inside of the wall)
+skin = 1e-3
+
+
+def wall_segments(rooms, skip=('building',)):
+    """
+    Walls of every room w/ the entryways cut out
+    :param rooms: dict of rooms
+    :param skip: names of rooms whose entryway isn't a door (the building's exit isn't cut out of the navmesh either)
+    :return: list of (x0, y0, x1, y1) axis aligned segments
+    """
+    doors = np.array([tuple(r.entry_rect) for name, r in rooms.items() if name not in skip]).reshape((-1, 4))
+    d_left, d_top = doors[:, 0], doors[:, 1]
+    d_right, d_bottom = d_left + doors[:, 2], d_top + doors[:, 3]
+    out = []
+    for r in rooms.values():
+        rect = r.rect
+        sides = [
+            (rect.left, rect.top, rect.right, rect.top),  # top
+            (rect.left, rect.bottom, rect.right, rect.bottom),  # bottom
+            (rect.left, rect.top, rect.left, rect.bottom),  # left
+            (rect.right, rect.top, rect.right, rect.bottom),  # right
+        ]
+        for x0, y0, x1, y1 in sides:
+            horizontal = y0 == y1
+            lo, hi = (x0, x1) if horizontal else (y0, y1)
+            line = y0 if horizontal else x0
+
+            # intervals of the side covered by an entryway (every door is checked at once)
+            across = (d_top, d_bottom) if horizontal else (d_left, d_right)
+            along = (d_left, d_right) if horizontal else (d_top, d_bottom)
+            hit = (across[0] <= line) & (line <= across[1]) & (along[0] < hi) & (along[1] > lo)
+            gaps = list(zip(np.maximum(along[0][hit], lo).tolist(), np.minimum(along[1][hit], hi).tolist()))
+
+            # keep what is left of the side
+            start = lo
+            for a, b in sorted(gaps):
+                if a > start:
+                    out += [(start, line, a, line) if horizontal else (line, start, line, a)]
+                start = max(start, b)
+            if start < hi:
+                out += [(start, line, hi, line) if horizontal else (line, start, line, hi)]
+    return out
+
+
+class WallGrid:
+    """
+    Wall segments bucketed in a uniform grid
+    """
+
+    def __init__(self, segments, cell=configs.collision_cell, max_steps=configs.collision_steps):
+        """
+        :param segments: list of (x0, y0, x1, y1) segments
+        :param cell: size of a grid cell in pixels
+        :param max_steps: max number of slides in a single move
+        """
+        self.segments = [tuple(float(v) for v in s) for s in segments]
+        self.cell = cell
+        self.max_steps = max_steps
+        self.cells = {}  # (i, j): list of segment ids
+        for k, (x0, y0, x1, y1) in enumerate(self.segments):
+            for i in range(int(min(x0, x1) // cell), int(max(x0, x1) // cell) + 1):
+                for j in range(int(min(y0, y1) // cell), int(max(y0, y1) // cell) + 1):
+                    self.cells.setdefault((i, j), []).append(k)
+
+        # stats
+        self.moves = 0
+        self.hits = 0
+        self.tested = 0  # segments tested over every move
+
+    def nearby(self, x0, y0, x1, y1):
+        """
+        Ids of the segments in the cells overlapping a box
+        """
+        c = self.cell
+        out = set()
+        for i in range(int(x0 // c), int(x1 // c) + 1):
+            for j in range(int(y0 // c), int(y1 // c) + 1):
+                out.update(self.cells.get((i, j), ()))
+        return out
+
+    @staticmethod
+    def hit_circle(px, py, dx, dy, cx, cy, r):
+        """
+        Time of impact of a moving point against a circle
+        :return: (t, normal x, normal y) or None
+        """
+        fx, fy = px - cx, py - cy
+        c = fx * fx + fy * fy - r * r
+        b = fx * dx + fy * dy
+        if c <= 0:  # already touching, only stop if moving further in
+            if b >= 0:
+                return None
+            f = math.sqrt(fx * fx + fy * fy) or 1
+            return 0, fx / f, fy / f
+        a = dx * dx + dy * dy
+        disc = b * b - a * c
+        if b >= 0 or disc < 0 or a == 0:
+            return None
+        t = (-b - math.sqrt(disc)) / a
+        if t > 1:
+            return None
+        return t, (px + t * dx - cx) / r, (py + t * dy - cy) / r
+
+    def hit_segment(self, px, py, dx, dy, r, segment):
+        """
+        Time of impact of a moving circle against a segment (a point against the segment's capsule)
+        :return: (t, normal x, normal y) or None
+        """
+        ax, ay, bx, by = segment
+        ux, uy = bx - ax, by - ay
+        length = math.hypot(ux, uy)
+        if length == 0:
+            return self.hit_circle(px, py, dx, dy, ax, ay, r)
+        ux, uy = ux / length, uy / length
+        nx, ny = -uy, ux
+        s = (px - ax) * nx + (py - ay) * ny
+        if s < 0:  # face the normal towards the circle
+            nx, ny, s = -nx, -ny, -s
+        dn = dx * nx + dy * ny
+        along = (px - ax) * ux + (py - ay) * uy
+
+        if s < r and 0 <= along <= length:  # already touching the side
+            return (0, nx, ny) if dn < 0 else None
+        if dn < 0 and s >= r:
+            t = (s - r) / -dn
+            if t <= 1:
+                a = along + t * (dx * ux + dy * uy)
+                if 0 <= a <= length:
+                    return t, nx, ny
+
+        # rounded ends
+        best = None
+        for cx, cy in ((ax, ay), (bx, by)):
+            h = self.hit_circle(px, py, dx, dy, cx, cy, r)
+            if h and (best is None or h[0] < best[0]):
+                best = h
+        return best
+
+    def move(self, position, dp, radius):
+        """
+        Move a circle through the walls, sliding along any walls it hits
+        :param position: current position (tools.vector)
+        :param dp: change in position (tools.vector)
+        :param radius: radius of the circle
+        :return: (x, y) change in position allowed by the walls
+        """
+        self.moves += 1
+        px, py = position.x, position.y
+        dx, dy = dp.x, dp.y
+        if dx == 0 and dy == 0:
+            return 0.0, 0.0
+
+        # every segment the swept circle could touch (slides only ever shorten the move)
+        reach = radius + skin
+        ids = self.nearby(min(px, px + dx) - reach, min(py, py + dy) - reach,
+                          max(px, px + dx) + reach, max(py, py + dy) + reach)
+        segments = [self.segments[k] for k in ids]
+
+        x, y = px, py
+        for _ in range(self.max_steps):
+            best = None
+            for s in segments:
+                h = self.hit_segment(x, y, dx, dy, radius, s)
+                if h and (best is None or h[0] < best[0]):
+                    best = h
+            self.tested += len(segments)
+            if best is None:
+                x, y = x + dx, y + dy
+                break
+
+            # move up to the wall, then slide the rest of the move along it
+            self.hits += 1
+            t, nx, ny = best
+            x, y = x + dx * t + nx * skin, y + dy * t + ny * skin
+            dx, dy = dx * (1 - t), dy * (1 - t)
+            dn = dx * nx + dy * ny
+            if dn < 0:
+                dx, dy = dx - nx * dn, dy - ny * dn
+            if dx * dx + dy * dy < skin * skin:
+                break
+        if debug and (x - px, y - py) != (dp.x, dp.y):
+            print("Collision adjusted (%.2f, %.2f) to (%.2f, %.2f)" % (dp.x, dp.y, x - px, y - py))
+        return x - px, y - py
+
+    def stats(self):
+        return {
+            'segments': len(self.segments),
+            'cells': len(self.cells),
+            'moves': self.moves,
+            'hits': self.hits,
+            'tested_per_move': self.tested / self.moves if self.moves else 0,
+        }
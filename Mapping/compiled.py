@@ -0,0 +1,120 @@
+"""
+Compiled map artifacts
+Everything derived from the map definition (navmesh, waypoint graph arrays, room/door/waypoint rasters, event index and
+potentially visible sets) is saved once and memory mapped on the next startup
+ - Artifacts are keyed by a hash of the map definition (rooms, waypoints, edges, event regions and map settings)
+ - Changing the definition changes the key, the artifact is rebuilt and the old one is removed
+ - Arrays are stored as plain .npy files (not a compressed .npz), since compressed arrays can't be memory mapped
+"""
+
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+
+import configs
+
+# debug variables
+debug = False
+
+# bump whenever the layout of an artifact changes (old artifacts are rebuilt)
+version = 1
+
+
+def definition_hash(rooms, waypoints, edges, regions):
+    """
+    Hash of everything a compiled map is built from
+    :param rooms: dict of rooms
+    :param waypoints: list of every waypoint (Waypoint.waypoints)
+    :param edges: list of every edge (Edge.edges)
+    :param regions: list of event regions (EventRegion/TankEventRegion)
+    :return: hex string
+    """
+    h = hashlib.sha1()
+
+    def add(*values):
+        h.update(repr(values).encode())
+
+    add(version, configs.width, configs.height, configs.navmesh_ratio, configs.pvs_cell)
+    for name, r in rooms.items():
+        add(name, tuple(r.rect), tuple(r.entry_rect), r.depth, tuple(wp.index for wp in r.waypoints.values()))
+    for wp in waypoints:
+        add(wp.index, wp.position.x, wp.position.y, tuple(m.index for m in wp.paths))
+    for e in edges:
+        add(e.node1.index, e.node2.index, e.bi, e.enabled)
+    for r in regions:
+        add(r.key, tuple(r.rect))
+    return h.hexdigest()
+
+
+class MapArtifact:
+    """
+    Directory of arrays (one .npy each) + a manifest, saved under Storage/
+    """
+
+    def __init__(self, name, key, path=configs.compiled_path):
+        """
+        :param name: name of the map (each map keeps a single artifact)
+        :param key: definition hash of the map
+        :param path: directory holding every artifact
+        """
+        self.name = name
+        self.key = key
+        self.root = path
+        self.path = os.path.join(path, "%s-%s" % (name, key[:16]))
+        self.arrays = {}  # name: (memory mapped) array
+        self.meta = {}  # json data saved w/ the arrays
+
+    def load(self):
+        """
+        Memory map a saved artifact
+        :return: bool for if the artifact exists and matches the key
+        """
+        manifest = os.path.join(self.path, 'manifest.json')
+        if not os.path.exists(manifest):
+            return False
+        try:
+            with open(manifest) as f:
+                data = json.load(f)
+            if data['key'] != self.key or data['version'] != version:
+                return False
+            self.arrays = {k: np.load(os.path.join(self.path, k + '.npy'), mmap_mode='r') for k in data['arrays']}
+            self.meta = data['meta']
+        except (OSError, KeyError, ValueError):
+            self.arrays, self.meta = {}, {}
+            return False
+        if debug:
+            print("Loaded compiled map %s (%i arrays)" % (self.path, len(self.arrays)))
+        return True
+
+    def save(self, arrays, meta=None):
+        """
+        Write an artifact (written next to the final directory first, so a crash never leaves half of one behind)
+        :param arrays: dict of name: numpy array
+        :param meta: dict of json serializable data
+        :return: bool for if the artifact was saved
+        """
+        tmp = self.path + '.tmp'
+        try:
+            shutil.rmtree(tmp, ignore_errors=True)
+            os.makedirs(tmp)
+            for k, a in arrays.items():
+                np.save(os.path.join(tmp, k + '.npy'), np.ascontiguousarray(a))
+            with open(os.path.join(tmp, 'manifest.json'), 'w') as f:
+                json.dump({'key': self.key, 'version': version, 'arrays': list(arrays), 'meta': meta or {}}, f)
+
+            # replace this map's old artifacts
+            for d in os.listdir(self.root):
+                if d.startswith(self.name + '-') and not d.endswith('.tmp'):
+                    shutil.rmtree(os.path.join(self.root, d), ignore_errors=True)
+            os.replace(tmp, self.path)
+        except OSError:  # read only install, rebuild on every startup
+            shutil.rmtree(tmp, ignore_errors=True)
+            if debug:
+                print("Unable to save compiled map to " + self.path)
+            return False
+        self.arrays = dict(arrays)
+        self.meta = meta or {}
+        return True
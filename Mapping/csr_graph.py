@@ -0,0 +1,308 @@
+"""
+Compiled (CSR) form of the waypoint graph
+Waypoints keep their paths as lists of other Waypoint objects, which is slow to walk and heavy to copy
+ - Arcs of waypoint i are offsets[i]:offsets[i + 1] in the targets/weights arrays
+ - Every arc created by an Edge is kept, locked doors only clear the arc's bit in the enabled mask
+ - The incoming arcs of each waypoint are stored the same way (for searching backwards from a destination)
+The arrays are built from Waypoint.waypoints/Edge.edges and kept in sync through Edge.notify
+"""
+
+import heapq
+import math
+
+import numpy as np
+
+from Mapping.waypoint import Waypoint, Edge
+
+# debug variables
+debug = False
+
+# value stored in parent arrays when a waypoint was never reached
+no_path = -1
+
+
+class CSRGraph:
+    """
+    Waypoint graph stored as flat numpy arrays, indexed by Waypoint.index
+    """
+
+    def __init__(self):
+        self.size = 0  # number of waypoints the arrays were built for
+        self.n_edges = -1  # number of Edges the arrays were built for
+        self.offsets = np.zeros(1, dtype=np.int32)
+        self.targets = np.zeros(0, dtype=np.int32)
+        self.weights = np.zeros(0, dtype=np.float32)
+        self.enabled = np.zeros(0, dtype=bool)  # one bit per arc, cleared while its Edge is locked
+        self.positions = np.zeros((0, 2), dtype=np.float32)
+
+        # incoming arcs (rev_arcs point back into the forward arrays, so they share the enabled mask)
+        self.rev_offsets = np.zeros(1, dtype=np.int32)
+        self.rev_sources = np.zeros(0, dtype=np.int32)
+        self.rev_arcs = np.zeros(0, dtype=np.int32)
+
+        self.edge_arcs = {}  # Edge: list of the arcs it created
+        self.view = None  # python list copies of the arrays for the search loops (numpy scalar indexing is slow)
+        self.frozen = False  # snapshots never rebuild (their process may not have the waypoints)
+
+        # stats
+        self.builds = 0
+        self.toggles = 0
+
+        # registered before anything built on top of the graph (they all import this module first)
+        Edge.add_listener(self.edge_changed)
+
+    def ensure(self):
+        """
+        Build the arrays if waypoints or edges were added since the last build
+        :return: None
+        """
+        if self.frozen:
+            return
+        if self.size != len(Waypoint.waypoints) or self.n_edges != len(Edge.edges):
+            self.build()
+
+    def build(self):
+        """
+        Compile Waypoint.waypoints and Edge.edges into the CSR arrays
+        :return: None
+        """
+        waypoints = Waypoint.waypoints
+        n = len(waypoints)
+
+        # current arcs + the arcs of locked edges (removed from the waypoint's paths)
+        src, dst, on = [], [], []
+        for wp in waypoints:
+            for m in wp.paths:
+                src += [wp.index]
+                dst += [m.index]
+                on += [True]
+        for e in Edge.edges:
+            if not e.enabled:
+                for a, b in self._edge_pairs(e):
+                    src += [a]
+                    dst += [b]
+                    on += [False]
+
+        src = np.array(src, dtype=np.int32)
+        dst = np.array(dst, dtype=np.int32)
+        order = np.argsort(src, kind='stable')  # keep the waypoint's path order inside each row
+        self.targets = dst[order]
+        self.enabled = np.array(on, dtype=bool)[order]
+        self.positions = np.array([[wp.position.x, wp.position.y] for wp in waypoints],
+                                  dtype=np.float32).reshape((n, 2))
+        src = src[order]
+        self.weights = np.hypot(*(self.positions[self.targets] - self.positions[src]).T).astype(np.float32)
+        self.offsets = np.zeros(n + 1, dtype=np.int32)
+        np.cumsum(np.bincount(src, minlength=n), out=self.offsets[1:])
+
+        # transpose for incoming arcs
+        rev = np.argsort(self.targets, kind='stable').astype(np.int32)
+        self.rev_arcs = rev
+        self.rev_sources = src[rev]
+        self.rev_offsets = np.zeros(n + 1, dtype=np.int32)
+        np.cumsum(np.bincount(self.targets, minlength=n), out=self.rev_offsets[1:])
+
+        self._map_edges(src)
+        self.size = n
+        self.n_edges = len(Edge.edges)
+        self.view = None
+        self.builds += 1
+        if debug:
+            print("Built CSR graph w/ %i waypoints and %i arcs" % (n, len(self.targets)))
+
+    def _map_edges(self, src):
+        # arcs owned by each edge (first matching arc, duplicate edges share it)
+        arc_of = {}
+        for k, (a, b) in reversed(list(enumerate(zip(src.tolist(), self.targets.tolist())))):
+            arc_of[(a, b)] = k
+        self.edge_arcs = {}
+        for e in Edge.edges:
+            self.edge_arcs[e] = [arc_of[p] for p in self._edge_pairs(e) if p in arc_of]
+
+    # names of the arrays saved in compiled maps
+    array_names = ('offsets', 'targets', 'weights', 'enabled', 'positions', 'rev_offsets', 'rev_sources', 'rev_arcs')
+
+    def arrays(self):
+        """
+        :return: dict of the graph's arrays (for saving w/ a compiled map)
+        """
+        self.ensure()
+        return {k: getattr(self, k) for k in self.array_names}
+
+    def load(self, arrays):
+        """
+        Use arrays saved by CSRGraph.arrays instead of building them (must match Waypoint.waypoints and Edge.edges)
+        :param arrays: dict of arrays (copied, they are small and the enabled bits are flipped when doors lock)
+        :return: None
+        """
+        for k in self.array_names:
+            setattr(self, k, np.array(arrays[k]))
+        n = len(self.offsets) - 1
+        self._map_edges(np.repeat(np.arange(n, dtype=np.int32), np.diff(self.offsets)))
+        self.size = n
+        self.n_edges = len(Edge.edges)
+        self.view = None
+
+    @staticmethod
+    def _edge_pairs(edge):
+        pairs = [(edge.node1.index, edge.node2.index)]
+        if edge.bi:
+            pairs += [(edge.node2.index, edge.node1.index)]
+        return pairs
+
+    def edge_changed(self, edge):
+        """
+        Called by Edge.notify, flips the enabled bits of the edge's arcs
+        """
+        arcs = self.edge_arcs.get(edge)
+        if arcs is None or self.size != len(Waypoint.waypoints):
+            self.size = 0  # unknown edge (or the graph was reset), rebuild on the next query
+            return
+        self.enabled[arcs] = edge.enabled
+        self.view = None
+        self.toggles += 1
+
+    def arcs(self, i):
+        """
+        Enabled arcs leaving a waypoint
+        :param i: waypoint index
+        :return: (array of target indices, array of arc lengths)
+        """
+        lo, hi = self.offsets[i], self.offsets[i + 1]
+        on = self.enabled[lo:hi]
+        return self.targets[lo:hi][on], self.weights[lo:hi][on]
+
+    def arc_ids(self, u, v):
+        """
+        Ids of the arcs from waypoint u to waypoint v (enabled or not)
+        """
+        lo, hi = self.offsets[u], self.offsets[u + 1]
+        return (lo + np.flatnonzero(self.targets[lo:hi] == v)).tolist()
+
+    # ---------- searches ----------
+
+    def lists(self):
+        """
+        Arrays as python lists (rebuilt after a build or an edge change)
+        :return: (offsets, targets, weights, enabled, rev_offsets, rev_sources, rev_arcs, positions)
+        """
+        self.ensure()
+        if self.view is None:
+            self.view = tuple(a.tolist() for a in (self.offsets, self.targets, self.weights, self.enabled,
+                                                   self.rev_offsets, self.rev_sources, self.rev_arcs, self.positions))
+        return self.view
+
+    def dijkstra(self, source, reverse=False, target=None, allowed=None):
+        """
+        Single source shortest paths over the enabled arcs
+        :param source: waypoint index to start from
+        :param reverse: walk arcs backwards (distances from every waypoint to the source)
+        :param target: optional waypoint index to stop at once settled
+        :param allowed: optional bool array, waypoints outside of it are never entered
+        :return: (float array of distances (inf if not settled), int array of parents, list of settled indices in order)
+                 parents are the previous waypoint, or the next waypoint towards the source when searching in reverse
+        """
+        offsets, targets, weights, enabled, rev_offsets, rev_sources, rev_arcs, _ = self.lists()
+        if reverse:
+            offsets, nodes, arc_ids = rev_offsets, rev_sources, rev_arcs
+        else:
+            nodes, arc_ids = targets, None
+        if allowed is not None:
+            allowed = allowed.tolist()
+
+        dist = np.full(self.size, np.inf)
+        parent = np.full(self.size, no_path, dtype=np.int32)
+        parent[source] = source
+        g = {source: 0.0}
+        heap = [(0.0, source)]
+        order = []
+        settled = set()
+        while heap:
+            d, i = heapq.heappop(heap)
+            if i in settled:
+                continue
+            settled.add(i)
+            dist[i] = d
+            order += [i]
+            if i == target:
+                break
+            for k in range(offsets[i], offsets[i + 1]):
+                a = k if arc_ids is None else arc_ids[k]
+                if not enabled[a]:
+                    continue
+                j = nodes[k]
+                if allowed is not None and not allowed[j]:
+                    continue
+                dj = d + weights[a]
+                if j not in settled and dj < g.get(j, math.inf):
+                    g[j] = dj
+                    parent[j] = i
+                    heapq.heappush(heap, (dj, j))
+        return dist, parent, order
+
+    def a_star(self, start, end):
+        """
+        A* between two waypoint indices
+        :return: list of waypoint indices w/ the tools.a_star contract (reversed, start excluded, empty if no path)
+        """
+        if start == end:
+            return [start]
+        offsets, targets, weights, enabled, _, _, _, positions = self.lists()
+        gx, gy = positions[end]
+
+        def h(j):
+            x, y = positions[j]
+            return math.hypot(x - gx, y - gy)
+
+        g = {start: 0.0}
+        parents = {start: start}
+        closed = set()
+        heap = [(h(start), start)]
+        while heap:
+            _, n = heapq.heappop(heap)
+            if n in closed:
+                continue
+            if n == end:
+                fp = []
+                while n != start:
+                    fp += [n]
+                    n = parents[n]
+                return fp
+            closed.add(n)
+            for k in range(offsets[n], offsets[n + 1]):
+                if not enabled[k]:
+                    continue
+                m = targets[k]
+                gm = g[n] + weights[k]
+                if m not in closed and gm < g.get(m, math.inf):
+                    g[m] = gm
+                    parents[m] = n
+                    heapq.heappush(heap, (gm + h(m), m))
+        if debug:
+            print("No CSR path from %i to %i" % (start, end))
+        return []
+
+    def path(self, start_node, end_node):
+        """
+        Drop-in replacement for tools.a_star over the compiled graph
+        :return: a reversed list of waypoints, start node excluded (empty if no path is found)
+        """
+        waypoints = Waypoint.waypoints
+        return [waypoints[i] for i in self.a_star(start_node.index, end_node.index)]
+
+    def snapshot(self):
+        """
+        Read-only copy of the arrays (cheap to pickle for worker processes)
+        """
+        self.ensure()
+        out = CSRGraph.__new__(CSRGraph)
+        out.__dict__.update({k: (v.copy() if isinstance(v, np.ndarray) else v)
+                             for k, v in self.__dict__.items() if k not in ('edge_arcs', 'view')})
+        out.edge_arcs = {}
+        out.view = None  # rebuilt by the worker
+        out.frozen = True
+        return out
+
+
+# shared compiled graph (built lazily on the first query, once the map has created all of its waypoints)
+csr_graph = CSRGraph()
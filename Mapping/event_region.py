@@ -3,7 +3,10 @@ Used to create an area for location specific events
 Created in the map script, each region has a list of keys that permit items
 """
 
+import numpy as np
 import pygame
+
+import configs
 import tools
 
 debug = True
@@ -40,6 +43,9 @@ class TankEventRegion:
     """
     Event region used to a queue for multiple action items
     """
+
+    regions = []
+
     def __init__(self, key, room, items, queue_positions):
         # manage event attributes
         self.key = key
@@ -58,6 +64,9 @@ class TankEventRegion:
         self.queue_positions = queue_positions
         self.queue = tools.ActorQueue(queue_positions)
 
+        # keep track of all tank regions (kept apart from EventRegion.regions)
+        TankEventRegion.regions += [self]
+
     def register_actor(self, actor):
         """
         Used to register an actor for the event
@@ -142,4 +151,141 @@ class TankEventRegion:
             return False
 
 
+# --- End of class
+
+class EventIndex:
+    """
+    Per key bitmask raster of every EventRegion and TankEventRegion
+     - Bit k of a cell is set if a region w/ the k-th key covers the cell
+     - Points off of the raster (regions can hang off of the map) fall back to checking the rects
+     - Rebuilt on the next query if regions were created since the last build
+    """
+
+    def __init__(self, shape, ratio=configs.navmesh_ratio):
+        """
+        :param shape: shape of the raster (same as the navmesh)
+        :param ratio: size of a raster cell in pixels
+        """
+        self.shape = shape
+        self.ratio = ratio
+        self.keys = {}  # key: bit index
+        self.key_list = []  # key of each bit index
+        self.masks = None  # int64 array of key bits
+        self.n_regions = -1  # number of regions the raster was built for
+
+    @staticmethod
+    def regions():
+        return EventRegion.regions + TankEventRegion.regions
+
+    def ensure(self):
+        if self.n_regions != len(EventRegion.regions) + len(TankEventRegion.regions):
+            self.build()
+
+    def build(self):
+        """
+        Paint every region's rect into the key raster
+        :return: None
+        """
+        regions = self.regions()
+        self.keys = {}
+        self.key_list = []
+        for r in regions:
+            if r.key not in self.keys:
+                self.keys[r.key] = len(self.key_list)
+                self.key_list += [r.key]
+        if len(self.key_list) > 63:
+            raise Exception("Event index only supports 63 unique keys (got %i)" % len(self.key_list))
+
+        self.masks = np.zeros(self.shape, dtype=np.int64)
+        for r in regions:
+            xs = slice(max(r.rect.left // self.ratio, 0), max(r.rect.right // self.ratio, 0))
+            ys = slice(max(r.rect.top // self.ratio, 0), max(r.rect.bottom // self.ratio, 0))
+            self.masks[xs, ys] |= 1 << self.keys[r.key]
+        self.n_regions = len(regions)
+
+    def load(self, masks, keys):
+        """
+        Use a raster saved w/ a compiled map (must be built from the current regions)
+        :param masks: int64 array of key bits
+        :param keys: key of each bit
+        :return: None
+        """
+        self.masks = masks
+        self.key_list = list(keys)
+        self.keys = {k: i for i, k in enumerate(self.key_list)}
+        self.n_regions = len(self.regions())
+
+    def mask_at(self, position):
+        """
+        Key bits of a position
+        :param position: position as type tools.vector
+        :return: int w/ bit k set if key_list[k] is valid at the position
+        """
+        self.ensure()
+        # truncate like pygame.Rect.collidepoint does
+        x = int(position.x) // self.ratio
+        y = int(position.y) // self.ratio
+        if 0 <= x < self.shape[0] and 0 <= y < self.shape[1]:
+            return int(self.masks[x, y])
+        return self._scan((position.x, position.y))
+
+    def _scan(self, p):
+        # slow path for points off of the raster
+        mask = 0
+        for r in self.regions():
+            if r.rect.collidepoint(p):
+                mask |= 1 << self.keys[r.key]
+        return mask
 
+    def keys_at(self, position):
+        """
+        Every key valid at a position
+        :param position: position as type tools.vector
+        :return: list of keys (in the order they were first registered)
+        """
+        mask = self.mask_at(position)
+        return [k for i, k in enumerate(self.key_list) if mask >> i & 1]
+
+    def is_valid(self, position, key):
+        """
+        Check if a key is valid at a position
+        :param position: position as type tools.vector
+        :param key: key to check
+        :return: boolean
+        """
+        bit = self.keys.get(key)
+        if bit is None:
+            self.ensure()  # key may belong to a region created since the last build
+            bit = self.keys.get(key)
+            if bit is None:
+                return False
+        return bool(self.mask_at(position) >> bit & 1)
+
+    def masks_at(self, points):
+        """
+        Vectorized EventIndex.mask_at
+        :param points: array of shape (n, 2) w/ x, y positions
+        :return: int64 array of key bits
+        """
+        self.ensure()
+        points = np.asarray(points)
+        xy = points.astype(int) // self.ratio
+        inside = (xy[:, 0] >= 0) & (xy[:, 0] < self.shape[0]) & (xy[:, 1] >= 0) & (xy[:, 1] < self.shape[1])
+        out = np.zeros(len(points), dtype=np.int64)
+        out[inside] = self.masks[xy[inside, 0], xy[inside, 1]]
+        for k in np.flatnonzero(~inside):
+            out[k] = self._scan((points[k, 0], points[k, 1]))
+        return out
+
+    def valid_at(self, points, key):
+        """
+        Vectorized EventIndex.is_valid
+        :param points: array of shape (n, 2) w/ x, y positions
+        :param key: key to check
+        :return: bool array
+        """
+        masks = self.masks_at(points)
+        bit = self.keys.get(key)
+        if bit is None:
+            return np.zeros(len(masks), dtype=bool)
+        return (masks >> bit & 1).astype(bool)
@@ -0,0 +1,110 @@
+"""
+Shared flow fields for crowds heading to the same waypoints
+One reverse Dijkstra per destination gives every waypoint its next step towards it
+ - Any number of actors can then read their next waypoint w/ a single array lookup
+ - Fields are only thrown away when a door Edge is locked/unlocked
+"""
+
+import numpy as np
+
+from Mapping.waypoint import Waypoint, Edge
+from Mapping.csr_graph import csr_graph
+from Mapping.routing import index_dtype
+
+# debug variables
+debug = False
+
+# value stored in a field when a waypoint can not reach the destination
+no_path = -1
+
+
+class FlowField:
+    """
+    Next step and remaining distance from every waypoint to a single destination
+    """
+
+    def __init__(self, destination, next_hop, dist):
+        self.destination = destination  # destination waypoint
+        self.next_hop = next_hop  # int array indexed by Waypoint.index (int16 until the indices don't fit)
+        self.dist = dist  # float32 array indexed by Waypoint.index
+
+
+class FlowFieldService:
+    """
+    Builds flow fields on demand and keeps them until the graph changes
+    """
+
+    def __init__(self):
+        self.fields = {}  # destination index: FlowField
+
+        # stats
+        self.builds = 0
+        self.lookups = 0
+
+        # drop the fields whenever a door is locked/unlocked
+        Edge.add_listener(self.edge_changed)
+
+    def edge_changed(self, edge):
+        self.invalidate()
+
+    def invalidate(self):
+        self.fields = {}
+
+    def field(self, destination):
+        """
+        Return the flow field for a destination (solved on the first request)
+        :param destination: destination waypoint
+        :return: FlowField
+        """
+        f = self.fields.get(destination.index)
+        if f is None or len(f.next_hop) != len(Waypoint.waypoints):
+            f = self._solve(destination)
+            self.fields[destination.index] = f
+        return f
+
+    def _solve(self, destination):
+        # searching the incoming arcs backwards, each waypoint's parent is its next step towards the destination
+        dist, parent, _ = csr_graph.dijkstra(destination.index, reverse=True)
+        next_hop = parent.astype(index_dtype(len(parent)))  # same width as the routing table
+        dist = dist.astype(np.float32)
+
+        self.builds += 1
+        if debug:
+            print("Built flow field for %s" % destination.name)
+        return FlowField(destination, next_hop, dist)
+
+    def next_waypoint(self, current, destination):
+        """
+        Next waypoint to walk to from the current waypoint
+        :param current: waypoint the actor is at (or has just reached)
+        :param destination: destination waypoint
+        :return: Waypoint (None if the destination can not be reached)
+        """
+        self.lookups += 1
+        if current == destination:
+            return destination
+        h = self.field(destination).next_hop[current.index]
+        if h == no_path:
+            return None
+        return Waypoint.waypoints[h]
+
+    def path(self, start_node, end_node):
+        """
+        Follow the field to build a full path w/ the tools.a_star contract
+        """
+        if start_node == end_node:
+            return [start_node]
+        f = self.field(end_node)
+        i, j = start_node.index, end_node.index
+        if f.next_hop[i] == no_path:
+            return []
+        fp = []
+        while i != j:
+            i = f.next_hop[i]
+            fp += [Waypoint.waypoints[i]]
+        fp.reverse()
+        return fp
+
+
+# shared service for all actors
+flow_fields = FlowFieldService()
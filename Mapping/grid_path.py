@@ -0,0 +1,249 @@
+"""
+Grid pathfinding over the navmesh
+Uses jump point search (8-connected, diagonals are not allowed to cut wall corners)
+ - Straight jumps are answered by precomputed "next stop" tables (built once w/ numpy)
+ - Only jump points are pushed to the open list, so open rooms cost a handful of nodes
+"""
+
+import heapq
+import math
+
+import numpy as np
+
+import configs
+
+# debug variables
+debug = False
+
+# directions used by the start node (no parent to prune with)
+directions = [(1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1)]
+
+
+def octile(a, b):
+    dx = abs(a[0] - b[0])
+    dy = abs(a[1] - b[1])
+    return max(dx, dy) + (math.sqrt(2) - 1) * min(dx, dy)
+
+
+class GridPlanner:
+    """
+    Jump point search planner for a 2D walkable grid indexed as grid[x, y]
+    Internally the grid is padded w/ a blocked border, so neighbors never need bounds checks
+    """
+
+    def __init__(self, grid, ratio=configs.navmesh_ratio):
+        """
+        :param grid: 2D numpy array, non-zero cells are walkable
+        :param ratio: world units per grid cell
+        """
+        self.ratio = ratio
+        self.walk = None
+        self.stops = {}
+        self.goal = None
+
+        # stats
+        self.searches = 0
+        self.expanded = 0
+
+        self.build(grid)
+
+    def build(self, grid):
+        """
+        Precompute the padded walkable grid and the straight jump tables
+        :param grid: 2D numpy array, non-zero cells are walkable
+        :return: None
+        """
+        w, h = grid.shape
+        walk = np.zeros((w + 2, h + 2), dtype=bool)
+        walk[1:-1, 1:-1] = grid > 0
+        self.walk = walk
+        self.stops = {d: self._stop_table(d) for d in directions[:4]}
+
+    def _stop_table(self, d):
+        """
+        For a straight direction, store the first cell at or after each cell where a jump has to stop
+         - Either a blocked cell (jump fails) or a cell w/ a forced neighbor (jump point)
+        :param d: (dx, dy) w/ one of them being 0
+        :return: int array of the stopping coordinate along the direction's axis
+        """
+        walk = self.walk
+        dx, dy = d
+        axis = 0 if dx else 1
+        step = dx or dy
+
+        # forced neighbors: an open side cell whose cell behind it is blocked
+        if axis == 0:
+            side_a = np.roll(walk, 1, axis=1)  # walk[x, y - 1]
+            side_b = np.roll(walk, -1, axis=1)  # walk[x, y + 1]
+        else:
+            side_a = np.roll(walk, 1, axis=0)  # walk[x - 1, y]
+            side_b = np.roll(walk, -1, axis=0)  # walk[x + 1, y]
+        behind_a = np.roll(side_a, step, axis=axis)
+        behind_b = np.roll(side_b, step, axis=axis)
+        forced = (side_a & ~behind_a) | (side_b & ~behind_b)
+        event = ~walk | forced
+
+        # nearest event in the direction of travel (the blocked border guarantees there always is one)
+        n = walk.shape[axis]
+        coords = np.arange(n).reshape((-1, 1) if axis == 0 else (1, -1))
+        if step > 0:
+            idx = np.where(event, coords, n)
+            idx = np.flip(np.minimum.accumulate(np.flip(idx, axis=axis), axis=axis), axis=axis)
+        else:
+            idx = np.where(event, coords, -1)
+            idx = np.maximum.accumulate(idx, axis=axis)
+        return idx.astype(np.int16)
+
+    # ---------- jumping ----------
+
+    def _jump_straight(self, x, y, dx, dy):
+        s = self.stops[(dx, dy)][x, y]
+        gx, gy = self.goal
+        if dy == 0:
+            if gy == y and min(x, s) <= gx <= max(x, s):
+                return self.goal
+            return (int(s), y) if self.walk[s, y] else None
+        else:
+            if gx == x and min(y, s) <= gy <= max(y, s):
+                return self.goal
+            return (x, int(s)) if self.walk[x, s] else None
+
+    def _jump_diagonal(self, x, y, dx, dy):
+        walk = self.walk
+        while True:
+            if not walk[x, y]:
+                return None
+            if (x, y) == self.goal:
+                return x, y
+            # stop if either straight component finds something worth looking at
+            if self._jump_straight(x + dx, y, dx, 0) or self._jump_straight(x, y + dy, 0, dy):
+                return x, y
+            # keep going only if the move doesn't cut a corner
+            if walk[x + dx, y] and walk[x, y + dy]:
+                x += dx
+                y += dy
+            else:
+                return None
+
+    def _jump(self, x, y, dx, dy):
+        if dx and dy:
+            return self._jump_diagonal(x, y, dx, dy)
+        return self._jump_straight(x, y, dx, dy)
+
+    def _neighbors(self, node, parent):
+        """
+        Pruned neighbor directions for a node (every open direction for the start node)
+        """
+        walk = self.walk
+        x, y = node
+        if parent is None:
+            out = []
+            for dx, dy in directions:
+                if dx and dy:
+                    if walk[x + dx, y] and walk[x, y + dy] and walk[x + dx, y + dy]:
+                        out += [(dx, dy)]
+                elif walk[x + dx, y + dy]:
+                    out += [(dx, dy)]
+            return out
+
+        dx = (x > parent[0]) - (x < parent[0])
+        dy = (y > parent[1]) - (y < parent[1])
+        out = []
+        if dx and dy:
+            if walk[x, y + dy]:
+                out += [(0, dy)]
+            if walk[x + dx, y]:
+                out += [(dx, 0)]
+            if walk[x, y + dy] and walk[x + dx, y]:
+                out += [(dx, dy)]
+        elif dx:
+            nxt, up, down = walk[x + dx, y], walk[x, y + 1], walk[x, y - 1]
+            if nxt:
+                out += [(dx, 0)]
+                if up:
+                    out += [(dx, 1)]
+                if down:
+                    out += [(dx, -1)]
+            if up:
+                out += [(0, 1)]
+            if down:
+                out += [(0, -1)]
+        else:
+            nxt, right, left = walk[x, y + dy], walk[x + 1, y], walk[x - 1, y]
+            if nxt:
+                out += [(0, dy)]
+                if right:
+                    out += [(1, dy)]
+                if left:
+                    out += [(-1, dy)]
+            if right:
+                out += [(1, 0)]
+            if left:
+                out += [(-1, 0)]
+        return out
+
+    # ---------- search ----------
+
+    def cell(self, position):
+        """
+        Padded grid cell for a world position (accepts tools.vector or (x, y))
+        """
+        try:
+            x, y = position.x, position.y
+        except AttributeError:
+            x, y = position
+        return int(x // self.ratio) + 1, int(y // self.ratio) + 1
+
+    def find_path(self, start, end):
+        """
+        Find a path between two world positions
+        :param start: starting position (tools.vector or (x, y))
+        :param end: ending position (tools.vector or (x, y))
+        :return: float array of shape (n, 2) w/ the jump points from start to end (empty if there is no path)
+        """
+        self.searches += 1
+        start, goal = self.cell(start), self.cell(end)
+        empty = np.zeros((0, 2))
+        shape = self.walk.shape
+        if not (0 < start[0] < shape[0] - 1 and 0 < start[1] < shape[1] - 1 and
+                0 < goal[0] < shape[0] - 1 and 0 < goal[1] < shape[1] - 1):
+            return empty
+        if not (self.walk[start] and self.walk[goal]):
+            return empty
+
+        self.goal = goal
+        g = {start: 0}
+        parents = {start: None}
+        closed = set()
+        heap = [(octile(start, goal), 0, start)]
+        while heap:
+            _, gn, node = heapq.heappop(heap)
+            if node in closed:
+                continue
+            if node == goal:
+                return self._reconstruct(parents, node)
+            closed.add(node)
+            self.expanded += 1
+
+            for dx, dy in self._neighbors(node, parents[node]):
+                jp = self._jump(node[0] + dx, node[1] + dy, dx, dy)
+                if jp is None or jp in closed:
+                    continue
+                gj = gn + octile(node, jp)
+                if jp not in g or gj < g[jp]:
+                    g[jp] = gj
+                    parents[jp] = node
+                    heapq.heappush(heap, (gj + octile(jp, goal), gj, jp))
+
+        if debug:
+            print("No navmesh path from %s to %s" % (start, goal))
+        return empty
+
+    def _reconstruct(self, parents, node):
+        cells = []
+        while node is not None:
+            cells += [node]
+            node = parents[node]
+        cells.reverse()
+        # remove the padding and return the center of each cell in world units
+        return (np.array(cells, dtype=float) - 1 + .5) * self.ratio
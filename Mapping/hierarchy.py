@@ -0,0 +1,275 @@
+"""
+Two level pathfinding using the rooms as clusters of waypoints
+ - Top level: graph of portal waypoints (waypoints w/ an edge into another room) w/ precomputed costs across each room
+ - Bottom level: waypoint paths, only solved for the next room segment once the previous one has been walked
+Long trips across the building only search the small portal graph up front
+"""
+
+import heapq
+
+import numpy as np
+
+from tools import vector
+from Mapping.waypoint import Waypoint, Edge
+from Mapping.csr_graph import csr_graph
+
+# debug variables
+debug = False
+
+
+class LazyPath:
+    """
+    Path returned by the hierarchical planner
+    Acts like the reversed lists returned by tools.a_star (pop the next waypoint, append a waypoint to visit first)
+    Each room segment is only refined into waypoints once the previous segment has been used up
+    """
+
+    def __init__(self, planner, portals):
+        self.planner = planner
+        self.portals = portals  # abstract path (start, portal, ..., end), start excluded once refined
+        self.steps = []  # refined waypoints of the current segment (reversed)
+        self.front = []  # waypoints appended by the caller (visited before anything else)
+        self.smoother = None  # optional function(start, segment) applied to each segment once it is refined
+        self.epoch = Edge.epoch  # edges changed since the portals were planned if this doesn't match Edge.epoch
+
+    def pop(self):
+        if self.front:
+            return self.front.pop()
+        while not self.steps:
+            if len(self.portals) < 2:
+                raise IndexError("pop from empty path")
+            a, b = self.portals[0], self.portals[1]
+            if self.epoch != Edge.epoch:  # a door was locked/unlocked, plan the rest of the trip again
+                self.replan()
+                continue
+            steps = self.planner.refine(a, b)
+            if steps is None:  # shouldn't happen on a freshly planned path, give up instead of looping
+                if debug:
+                    print("Couldn't refine %s -> %s" % (a.name, b.name))
+                self.portals = []
+                continue
+            self.portals = self.portals[1:]
+            self.steps = steps
+            if self.smoother:
+                self.steps = self.smoother(a, self.steps)
+        return self.steps.pop()
+
+    def replan(self):
+        """
+        Replace the unrefined portals w/ a new abstract path from the current portal to the destination
+        Leaves the path empty (pop raises IndexError) if the destination can't be reached anymore
+        :return: None
+        """
+        path = self.planner.path(self.portals[0], self.portals[-1])
+        self.portals = path.portals
+        self.epoch = path.epoch
+
+    def append(self, waypoint):
+        self.front += [waypoint]
+
+    def __iadd__(self, waypoints):
+        for wp in waypoints:
+            self.append(wp)
+        return self
+
+    def __len__(self):
+        # number of waypoints that are known without refining (enough to check for an empty path)
+        return len(self.front) + len(self.steps) + max(len(self.portals) - 1, 0)
+
+    def __iter__(self):
+        # fully refine a copy (used for debugging / drawing, the path itself stays lazy)
+        out = list(self.steps) + list(self.front)
+        for a, b in zip(self.portals[:-1], self.portals[1:]):
+            steps = self.planner.refine(a, b)
+            if steps is None:  # cut off by a locked door (pop plans around it)
+                break
+            out = steps + out
+        return iter(out)
+
+
+class HierarchicalPlanner:
+    """
+    Builds the portal graph from the map's rooms and answers path queries w/ LazyPath objects
+    """
+
+    def __init__(self, rooms):
+        """
+        :param rooms: dict of Mapping.room.Room objects (every waypoint is assigned to one of them)
+        """
+        self.rooms = list(rooms.values())
+        self.cluster = {}  # waypoint index: room
+        self.masks = {}  # room: bool array of the waypoints assigned to it (limits searches to the room)
+        self.portals = {}  # room: list of portal waypoints
+        self.abstract = {}  # portal waypoint: list of (waypoint, cost, is_intra_room)
+        self.size = 0  # number of waypoints the graph was built for
+        self.dirty = True
+
+        # stats
+        self.builds = 0
+        self.queries = 0
+        self.refinements = 0
+
+        Edge.add_listener(self.edge_changed)
+
+    def edge_changed(self, edge):
+        self.dirty = True
+
+    def ensure(self):
+        if self.dirty or self.size != len(Waypoint.waypoints):
+            self.build()
+
+    def _room_at(self, position):
+        # deepest room containing a position (same rule as Map.get_room)
+        out = None
+        for r in self.rooms:
+            if r.collidepoint(position) and (not out or out.depth < r.depth):
+                out = r
+        return out
+
+    def build(self):
+        """
+        Assign waypoints to rooms, find the portals and precompute the costs across each room
+        :return: None
+        """
+        self.cluster = {}
+        for r in self.rooms:
+            for wp in r.waypoints.values():
+                self.cluster[wp.index] = r
+        for wp in Waypoint.waypoints:  # waypoints that were never added to a room (map objects)
+            if wp.index not in self.cluster:
+                self.cluster[wp.index] = self._room_at(wp.position) or self.rooms[0]
+
+        waypoints = Waypoint.waypoints
+        room_ids = np.array([self.rooms.index(self.cluster[wp.index]) for wp in waypoints], dtype=np.int32)
+        self.masks = {r: room_ids == i for i, r in enumerate(self.rooms)}
+
+        # portals: waypoints w/ an (enabled) arc leaving or entering their room
+        csr_graph.ensure()
+        src = np.repeat(np.arange(csr_graph.size), np.diff(csr_graph.offsets))
+        dst = csr_graph.targets
+        crossing = csr_graph.enabled & (room_ids[src] != room_ids[dst])
+        portal_set = set(waypoints[i] for i in np.concatenate([src[crossing], dst[crossing]]).tolist())
+        self.portals = {r: [] for r in self.rooms}
+        for wp in Waypoint.waypoints:
+            if wp in portal_set:
+                self.portals[self.cluster[wp.index]] += [wp]
+
+        # abstract edges
+        self.abstract = {wp: [] for wp in portal_set}
+        for wp in portal_set:
+            room = self.cluster[wp.index]
+            targets, weights = csr_graph.arcs(wp.index)
+            for j, w in zip(targets.tolist(), weights.tolist()):  # edges into other rooms
+                if self.cluster[j] is not room:
+                    self.abstract[wp] += [(waypoints[j], w, False)]
+            dist, _ = self._search(wp, room)  # costs to the other portals of the room
+            for p in self.portals[room]:
+                if p is not wp and p in dist:
+                    self.abstract[wp] += [(p, dist[p], True)]
+
+        self.size = len(Waypoint.waypoints)
+        self.dirty = False
+        self.builds += 1
+        if debug:
+            print("Built portal graph w/ %i portals" % len(portal_set))
+
+    def _search(self, source, room, target=None, reverse=False):
+        """
+        Dijkstra restricted to the waypoints of a single room
+        :param source: waypoint to start from
+        :param room: room to stay inside of
+        :param target: optional waypoint to stop at
+        :param reverse: walk edges backwards (costs from each waypoint to the source)
+        :return: (dict of waypoint: cost, dict of waypoint: parent)
+        """
+        waypoints = Waypoint.waypoints
+        dist, parent, order = csr_graph.dijkstra(source.index, reverse=reverse,
+                                                 target=None if target is None else target.index,
+                                                 allowed=self.masks[room])
+        parents = {waypoints[i]: waypoints[parent[i]] for i in order[1:]}
+        parents[source] = None
+        return {waypoints[i]: dist[i] for i in order}, parents
+
+    def refine(self, a, b):
+        """
+        Turn one abstract edge into waypoints (against the current state of the edges)
+        :return: reversed list of waypoints from a to b (a excluded), None if a locked door cut b off
+        """
+        self.refinements += 1
+        csr_graph.ensure()
+        if self.cluster[a.index] is not self.cluster[b.index]:  # edge between rooms
+            if csr_graph.enabled[csr_graph.arc_ids(a.index, b.index)].any():
+                return [b]
+            return None
+        _, parents = self._search(a, self.cluster[a.index], target=b)
+        if b not in parents:
+            return None
+        fp = []
+        n = b
+        while n is not a:
+            fp += [n]
+            n = parents[n]
+        return fp
+
+    def path(self, start_node, end_node):
+        """
+        Drop-in replacement for tools.a_star returning a LazyPath
+        :param start_node: starting waypoint
+        :param end_node: ending waypoint
+        :return: LazyPath (empty if no path is found)
+        """
+        self.ensure()
+        self.queries += 1
+        if start_node == end_node:
+            out = LazyPath(self, [])
+            out.append(start_node)
+            return out
+
+        start_room = self.cluster[start_node.index]
+        end_room = self.cluster[end_node.index]
+
+        # temporary edges from the start to its room's portals and from the goal room's portals to the goal
+        start_edges = list(self.abstract.get(start_node, []))  # the start may already be a portal
+        dist, _ = self._search(start_node, start_room)
+        for p in self.portals[start_room]:
+            if p in dist and p is not start_node:
+                start_edges += [(p, dist[p], True)]
+        if end_room is start_room and end_node in dist:
+            start_edges += [(end_node, dist[end_node], True)]
+        to_goal, _ = self._search(end_node, end_room, reverse=True)
+
+        # A* over the portal graph
+        g = {start_node: 0}
+        parents = {start_node: None}
+        closed = set()
+        count = 0
+        heap = [(vector.distance(start_node.position, end_node.position), count, start_node)]
+        while heap:
+            _, _, n = heapq.heappop(heap)
+            if n in closed:
+                continue
+            if n is end_node:
+                portals = []
+                while n is not None:
+                    portals += [n]
+                    n = parents[n]
+                portals.reverse()
+                return LazyPath(self, portals)
+            closed.add(n)
+
+            edges = start_edges if n is start_node else list(self.abstract.get(n, []))
+            if n is not start_node and n in to_goal and n is not end_node:
+                edges += [(end_node, to_goal[n], True)]
+            for m, cost, _ in edges:
+                if m in closed:
+                    continue
+                gm = g[n] + cost
+                if gm < g.get(m, float('inf')):
+                    g[m] = gm
+                    parents[m] = n
+                    count += 1
+                    heapq.heappush(heap, (gm + vector.distance(m.position, end_node.position), count, m))
+
+        if debug:
+            print("No portal path from %s to %s" % (start_node.name, end_node.name))
+        return LazyPath(self, [])
@@ -0,0 +1,199 @@
+"""
+Incremental replanning for locked/unlocked doors (D* Lite style)
+Each destination keeps its backwards search state (g and rhs values of every waypoint) between queries
+ - Locking/unlocking an Edge only re-expands the waypoints whose distance to the destination changed
+ - Only actors whose current path uses the changed edge are told to swap paths
+Searches are not focused on a single start (many actors share a destination), so the key is just min(g, rhs)
+"""
+
+import heapq
+import math
+
+from Mapping.waypoint import Waypoint, Edge
+from Mapping.csr_graph import csr_graph
+
+# debug variables
+debug = False
+
+
+class DestinationSearch:
+    """
+    Backwards search state for a single destination
+     - g[i]: current distance from waypoint i to the destination
+     - rhs[i]: one step lookahead of g[i] (min over the arcs leaving i), g == rhs once i is consistent
+    """
+
+    def __init__(self, destination):
+        n = csr_graph.size
+        self.destination = destination
+        self.g = [math.inf] * n
+        self.rhs = [math.inf] * n
+        self.rhs[destination] = 0
+        self.heap = [(0, destination)]
+        self.updates = 0  # waypoints expanded by this search
+
+    def update_vertex(self, u):
+        offsets, targets, weights, enabled = csr_graph.lists()[:4]
+        if u != self.destination:
+            best = math.inf
+            g = self.g
+            for k in range(offsets[u], offsets[u + 1]):
+                # skip self loops (the map has a few), a zero cost loop would keep a cut off waypoint's g alive
+                if enabled[k] and targets[k] != u and weights[k] + g[targets[k]] < best:
+                    best = weights[k] + g[targets[k]]
+            self.rhs[u] = best
+        if self.g[u] != self.rhs[u]:
+            heapq.heappush(self.heap, (min(self.g[u], self.rhs[u]), u))  # stale entries are skipped when popped
+
+    def compute(self):
+        """
+        Expand inconsistent waypoints until every waypoint is consistent
+        """
+        _, _, _, enabled, rev_offsets, rev_sources, rev_arcs, _ = csr_graph.lists()
+        g, rhs, heap = self.g, self.rhs, self.heap
+        while heap:
+            key, u = heapq.heappop(heap)
+            if g[u] == rhs[u] or key != min(g[u], rhs[u]):
+                continue
+            self.updates += 1
+            if g[u] > rhs[u]:  # distance went down, settle it
+                g[u] = rhs[u]
+            else:  # distance went up, reopen it and let its successors decide
+                g[u] = math.inf
+                self.update_vertex(u)
+            for k in range(rev_offsets[u], rev_offsets[u + 1]):  # waypoints w/ an arc into u
+                if enabled[rev_arcs[k]]:
+                    self.update_vertex(rev_sources[k])
+
+    def next_hop(self, u):
+        """
+        Best arc out of waypoint u (None if the destination can't be reached)
+        """
+        offsets, targets, weights, enabled = csr_graph.lists()[:4]
+        best, hop = math.inf, None
+        for k in range(offsets[u], offsets[u + 1]):
+            if enabled[k] and targets[k] != u and weights[k] + self.g[targets[k]] < best:
+                best, hop = weights[k] + self.g[targets[k]], targets[k]
+        return hop
+
+
+class IncrementalPlanner:
+    """
+    Keeps a DestinationSearch per destination and repairs all of them when an Edge changes
+    """
+
+    def __init__(self):
+        self.searches = {}  # destination index: DestinationSearch
+        self.watchers = []  # actors w/ a path from this planner (told when their path is cut)
+        self.size = 0
+
+        # stats
+        self.builds = 0
+        self.repairs = 0  # waypoints re-expanded after edge changes
+        self.notified = 0
+
+        Edge.add_listener(self.edge_changed)
+
+    def search(self, destination):
+        """
+        Search state for a destination (solved on the first request)
+        :param destination: destination index
+        :return: DestinationSearch
+        """
+        csr_graph.ensure()
+        if self.size != csr_graph.size:
+            self.searches = {}
+            self.size = csr_graph.size
+        s = self.searches.get(destination)
+        if s is None:
+            s = DestinationSearch(destination)
+            s.compute()
+            self.searches[destination] = s
+            self.builds += 1
+        return s
+
+    def path(self, start_node, end_node):
+        """
+        Drop-in replacement for tools.a_star using the stored search of the destination
+        :return: a reversed list of waypoints, start node excluded (empty if no path is found)
+        """
+        if start_node == end_node:
+            return [start_node]
+        s = self.search(end_node.index)
+        i, j = start_node.index, end_node.index
+        if s.g[i] == math.inf:
+            return []
+        fp = []
+        while i != j:
+            i = s.next_hop(i)
+            fp += [Waypoint.waypoints[i]]
+        fp.reverse()
+        return fp
+
+    def watch(self, actor):
+        """
+        Tell an actor when an edge on its path changes (actor needs waypoint, destination, path and path_changed())
+        """
+        if actor not in self.watchers:
+            self.watchers += [actor]
+
+    def unwatch(self, actor):
+        if actor in self.watchers:
+            self.watchers.remove(actor)
+
+    def edge_changed(self, edge):
+        """
+        Called by Edge.notify, repairs every stored search and then notifies the affected actors
+        :param edge: the Edge that changed
+        :return: None
+        """
+        if edge is None:  # graph was reset, none of the searches (or watched paths) are valid anymore
+            self.searches = {}
+            self.watchers = []
+            self.size = 0
+            return
+        if self.size != csr_graph.size or self.size != len(Waypoint.waypoints):
+            return  # searches are thrown away on the next query
+        arcs = [(edge.node1.index, edge.node2.index)]
+        if edge.bi:
+            arcs += [(edge.node2.index, edge.node1.index)]
+
+        for s in self.searches.values():
+            before = s.updates
+            for u, _ in arcs:
+                s.update_vertex(u)
+            s.compute()
+            self.repairs += s.updates - before
+
+        if edge.enabled:
+            return  # nobody is walking through an edge that was locked
+        for actor in list(self.watchers):
+            if self.crosses(actor, arcs):
+                self.notified += 1
+                actor.path_changed()
+
+    @staticmethod
+    def crosses(actor, arcs):
+        """
+        Check if the rest of an actor's path walks along any of the given arcs
+        :param arcs: list of (from index, to index)
+        """
+        if type(actor.waypoint) is not Waypoint:
+            return False
+        route = [actor.waypoint] + list(reversed(actor.path))
+        for a, b in zip(route[:-1], route[1:]):
+            if (a.index, b.index) in arcs:
+                return True
+        return False
+
+    def stats(self):
+        return {
+            'destinations': len(self.searches),
+            'builds': self.builds,
+            'repairs': self.repairs,
+            'notified': self.notified,
+        }
+
+
+# shared planner for every actor
+incremental_planner = IncrementalPlanner()
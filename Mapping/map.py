@@ -11,16 +11,20 @@ import tools
 from tools import vector
 from objects.base_object import BaseObject
 
-from Mapping.room import Room
-from Mapping.waypoint import Waypoint, Edge, IdleLocation
-from Mapping.event_region import EventRegion
+from Mapping.waypoint import Waypoint, Edge
+from Mapping.event_region import EventRegion, EventIndex
+from Mapping.map_loader import load_map
+from Mapping.grid_path import GridPlanner
+from Mapping.hierarchy import HierarchicalPlanner
+from Mapping.path_workers import PathWorkers
+from Mapping.smoothing import PathSmoother
+from Mapping.visibility import LineOfSight
+from Mapping.pvs import load_pvs, VisibilitySets
+from Mapping.compiled import MapArtifact, definition_hash
+from Mapping.csr_graph import csr_graph
+from Mapping.collision import WallGrid, wall_segments
 import Mapping.event_region as er_classes
 
-# import map object classes
-from Mapping.objects.WF import WF
-from Mapping.objects.hng import Hng
-from Mapping.objects.tank import Tank
-
 # load event manager LAST
 from event_manager import event_manager
 
@@ -37,770 +41,34 @@ draw_rooms = False
 draw_waypoints = False
 draw_edges = False
 
+# behavior variables
+use_pvs = True  # answer most line of sight checks from the potentially visible sets (Storage/pvs.npz)
+use_compiled = True  # memory map the navmesh and indexes from Storage/compiled (built on the first run)
+
 # ensure that we track edges if needed
 if draw_edges:
     Edge.track = True  # track all created edges
 
-# --- room definitions
-rooms = {
-    # blank room template for quicker boilerplate creation
-    # '': Room(
-    #     xlim=[, ],
-    #     ylim=[, ],
-    #     entrance=[, ],
-    #     depth=2
-    # ),
-    'building': Room(
-        xlim=[10, 390],
-        ylim=[10, 390],
-        entrance=[-10, -10],  # entrance is impossible to reach (need to ensure this doesn't cause issues)
-        depth=1,  # lowest depth
-    ),  # TODO: allow player to walk out this exit to close the game
-    'Office': Room(
-        xlim=[10, 60],
-        ylim=[10, 110],
-        entrance=[60, 55],
-        depth=3
-    ),
-    'Reception': Room(
-        xlim=[60, 110],
-        ylim=[10, 70],
-        entrance=[110, 30],
-        depth=2
-    ),
-    'Main Closet': Room(
-        xlim=[60, 110],
-        ylim=[70, 110],
-        entrance=[110, 90],
-        depth=2
-    ),
-    'Library': Room(
-        xlim=[160, 260],
-        ylim=[10, 110],
-        entrance=[160, 90],
-        depth=2
-    ),
-    'Lib Office': Room(
-        xlim=[160, 200],
-        ylim=[10, 50],
-        entrance=[200, 30],
-        depth=3
-    ),
-    'Lib Closet': Room(
-        xlim=[160, 200],
-        ylim=[50, 70],
-        entrance=[200, 60],
-        depth=3
-    ),
-    'Cafe': Room(
-        xlim=[260, 340],
-        ylim=[10, 110],
-        entrance=[285, 110],
-        depth=2
-    ),
-    'Kitchen': Room(
-        xlim=[340, 390],
-        ylim=[10, 80],
-        entrance=[340, 25],
-        depth=3
-    ),
-    'Fridge': Room(
-        xlim=[340, 390],
-        ylim=[80, 110],
-        entrance=[375, 80],
-        depth=4
-    ),
-    'Closet North': Room(
-        xlim=[10, 40],
-        ylim=[110, 160],
-        entrance=[40, 145],
-        depth=2
-    ),
-    'Room 1': Room(
-        xlim=[10, 110],
-        ylim=[160, 220],
-        entrance=[110, 200],
-        depth=2
-    ),
-    'Room 2': Room(
-        xlim=[10, 110],
-        ylim=[220, 280],
-        entrance=[110, 235],
-        depth=2
-    ),
-    'Room 3': Room(
-        xlim=[160, 260],
-        ylim=[160, 230],
-        entrance=[160, 200],
-        depth=2
-    ),
-    'Room 4': Room(
-        xlim=[160, 260],
-        ylim=[280, 340],
-        entrance=[180, 280],
-        depth=2
-    ),
-    'MR': Room(
-        xlim=[310, 350],
-        ylim=[160, 205],
-        entrance=[335, 160],
-        depth=2
-    ),
-    'WR': Room(
-        xlim=[350, 390],
-        ylim=[160, 205],
-        entrance=[365, 160],
-        depth=2
-    ),
-
-    'SR': Room(
-        xlim=[310, 390],
-        ylim=[205, 340],
-        entrance=[370, 340],
-        depth=2
-    ),
-    'SR Closet': Room(
-        xlim=[310, 350],
-        ylim=[300, 340],
-        entrance=[350, 320],
-        depth=3
-    ),
-    'Gym': Room(
-        xlim=[80, 160],
-        ylim=[280, 390],
-        entrance=[135, 280],
-        depth=2
-    ),
-    'ML': Room(
-        xlim=[10, 80],
-        ylim=[280, 335],
-        entrance=[80, 320],
-        depth=3
-    ),
-    'WL': Room(
-        xlim=[10, 80],
-        ylim=[335, 390],
-        entrance=[80, 350],
-        depth=3
-    ),
-    'Gym Office': Room(
-        xlim=[160, 210],
-        ylim=[340, 390],
-        entrance=[160, 375],
-        depth=3
-    ),
-    'Gym Closet': Room(
-        xlim=[210, 230],
-        ylim=[340, 390],
-        entrance=[210, 350],
-        depth=4
-    ),
-    'Closet South': Room(
-        xlim=[230, 260],
-        ylim=[340, 390],
-        entrance=[260, 375],
-        depth=2
-    ),
-}
-
-# assign a name to each room
-for key, value in rooms.items():
-    value.name = key
-
-# --- hallway waypoint definitions
-hallway_nodes = [
-    # boiler plate for easier creation
-    # Waypoint(
-    #     position=(, )
-    # ),
-    # --- office hallway left
-    Waypoint(  # reception door
-        position=(120, 30),
-    ),
-    Waypoint(  # mid point left
-        position=(120, 60)
-    ),
-    Waypoint(  # office closet door
-        position=(120, 90)
-    ),
-    Waypoint(
-        position=(120, 120)
-    ),
-    # --- Office hallway right (starts: indx 4)
-    Waypoint(
-        position=(150, 30)
-    ),
-    Waypoint(
-        position=(150, 60)
-    ),
-
-    Waypoint(
-        position=(150, 90)
-    ),
-    Waypoint(
-        position=(150, 120)
-    ),
-    # --- closet north hallway top (starts: indx 8)
-    Waypoint(
-        position=(100, 130)
-    ),
-    Waypoint(
-        position=(70, 130)
-    ),
-    Waypoint(
-        position=(50, 130)
-    ),
-    # --- North Closet hallway bottom (starts: indx 11)
-    Waypoint(
-        position=(100, 150)
-    ),
-    Waypoint(
-        position=(70, 150)
-    ),
-    Waypoint(
-        position=(50, 145)
-    ),
-    Waypoint(
-        position=(120, 150)
-    ),
-    # --- Lib/Room3 hallway top (starts: indx 15)
-    Waypoint(
-        position=(170, 120)
-    ),
-    Waypoint(
-        position=(200, 120)
-    ),
-    Waypoint(
-        position=(240, 120)
-    ),
-    Waypoint(  # cafe door
-        position=(285, 120)
-    ),
-    # --- Lib/Room3 hallway bottom (starts: indx 19)
-    Waypoint(
-        position=(170, 150)
-    ),
-    Waypoint(
-        position=(200, 150)
-    ),
-    Waypoint(
-        position=(240, 150)
-    ),
-    Waypoint(  # cafe door
-        position=(270, 150)
-    ),
-    Waypoint(
-        position=(150, 150)
-    ),
-    # MR and WR hallway top/bottom (start: indx 24)
-    Waypoint(
-        position=(310, 120)
-    ),
-    Waypoint(
-        position=(340, 120)
-    ),
-    Waypoint(
-        position=(370, 120)
-    ),
-    Waypoint(
-        position=(365, 150)
-    ),
-    Waypoint(
-        position=(335, 150)
-    ),
-    Waypoint(
-        position=(300, 150)
-    ),
-    # --- Rooms 1/2/3 left (starts: indx 30)
-    Waypoint(
-        position=(120, 170)
-    ),
-    Waypoint(
-        position=(120, 200)
-    ),
-    Waypoint(
-        position=(120, 235)
-    ),
-    Waypoint(
-        position=(125, 260)
-    ),
-    Waypoint(
-        position=(135, 270)
-    ),
-    # Rooms 1/2/3 hallway left (starts: indx 35)
-    Waypoint(
-        position=(150, 240)
-    ),
-    Waypoint(
-        position=(150, 200)
-    ),
-    Waypoint(
-        position=(150, 170)
-    ),
-    # --- Rooms 3/4 hallway bottom (starts: indx 38)
-    Waypoint(
-        position=(160, 270)
-    ),
-    Waypoint(  # room 4 door
-        position=(180, 270)
-    ),
-    Waypoint(
-        position=(220, 270)
-    ),
-    Waypoint(
-        position=(270, 270)
-    ),
-    # --- Rooms 3/4 hallway top (starts: indx 42)
-    Waypoint(
-        position=(180, 250)
-    ),
-    Waypoint(
-        position=(220, 250)
-    ),
-    Waypoint(
-        position=(270, 250)
-    ),
-    # --- Right hallway North (starts: indx 45)
-    Waypoint(
-        position=(270, 170)
-    ),
-    Waypoint(
-        position=(270, 195)
-    ),
-    Waypoint(
-        position=(270, 220)
-    ),
-    Waypoint(
-        position=(300, 170)
-    ),
-    Waypoint(
-        position=(300, 195)
-    ),
-    Waypoint(
-        position=(300, 220)
-    ),
-    Waypoint(
-        position=(300, 240)
-    ),
-    Waypoint(
-        position=(300, 270)
-    ),
-    # --- Right hallway South bottom (starts: 53)
-    Waypoint(
-        position=(270, 290)
-    ),
-    Waypoint(
-        position=(270, 320)
-    ),
-    Waypoint(
-        position=(275, 355)
-    ),
-    Waypoint(
-        position=(270, 375)
-    ),
-    Waypoint(  # 57
-        position=(300, 290)
-    ),
-    Waypoint(
-        position=(300, 320)
-    ),
-    Waypoint(  # ISSUE: missing the path, covered by another wp
-        position=(300, 320)
-    ),
-    Waypoint(
-        position=(300, 360)
-    ),
-    # --- South hallway (starts: indx 61)
-    Waypoint(
-        position=(290, 380)
-    ),
-    Waypoint(
-        position=(320, 380)
-    ),
-    Waypoint(
-        position=(370, 380)
-    ),
-    Waypoint(
-        position=(370, 360)
-    ),
-    Waypoint(
-        position=(320, 360)
-    ),
-]
-
-# rooms['building'].waypoints = hallway_nodes  # give the building access to all of the entry nodes
-rooms['building'].add_waypoint(hallway_nodes)
-
-# --- room waypoint definitions (specifically: entrances)
-entryways = {}
-for key, value in rooms.items():
-    value.init_entrance()  # create entrance waypoint and keep ref in list of room's waypoints
-
-# --- Edge definitions
-# boiler plate for arthritis aversion
-# Edge(hallway_nodes[], hallway_nodes[])
-# --- office/library hallway
-Edge(hallway_nodes[0], hallway_nodes[1])
-Edge(hallway_nodes[1], hallway_nodes[2])
-Edge(hallway_nodes[2], hallway_nodes[3])
-Edge(hallway_nodes[4], hallway_nodes[0])
-Edge(hallway_nodes[5], hallway_nodes[4])
-Edge(hallway_nodes[6], hallway_nodes[5])
-Edge(hallway_nodes[7], hallway_nodes[6])
-Edge(hallway_nodes[7], hallway_nodes[3])
-Edge(hallway_nodes[3], hallway_nodes[14])
-Edge(hallway_nodes[3], hallway_nodes[23])
-# --- North Closet hallway
-Edge(hallway_nodes[3], hallway_nodes[8])
-Edge(hallway_nodes[8], hallway_nodes[9])
-Edge(hallway_nodes[9], hallway_nodes[10])
-Edge(hallway_nodes[10], hallway_nodes[13], bi=True)  # add bi-directional just in case
-Edge(hallway_nodes[13], hallway_nodes[12])
-Edge(hallway_nodes[12], hallway_nodes[11])
-Edge(hallway_nodes[11], hallway_nodes[14])
-Edge(hallway_nodes[14], hallway_nodes[7])
-Edge(hallway_nodes[14], hallway_nodes[23])
-Edge(hallway_nodes[14], hallway_nodes[30])
-# --- Lib/Room3 hallway
-Edge(hallway_nodes[15], hallway_nodes[7])  # top run
-Edge(hallway_nodes[16], hallway_nodes[15])
-Edge(hallway_nodes[17], hallway_nodes[16])
-Edge(hallway_nodes[18], hallway_nodes[17])
-Edge(hallway_nodes[19], hallway_nodes[20])
-Edge(hallway_nodes[20], hallway_nodes[21])
-Edge(hallway_nodes[21], hallway_nodes[22])
-Edge(hallway_nodes[18], hallway_nodes[22])
-Edge(hallway_nodes[23], hallway_nodes[19])
-Edge(hallway_nodes[23], hallway_nodes[7])
-Edge(hallway_nodes[22], hallway_nodes[45])
-# --- MR/WR hallway
-Edge(hallway_nodes[22], hallway_nodes[29])
-Edge(hallway_nodes[29], hallway_nodes[28])
-Edge(hallway_nodes[28], hallway_nodes[27])
-Edge(hallway_nodes[27], hallway_nodes[26])
-Edge(hallway_nodes[26], hallway_nodes[25])
-Edge(hallway_nodes[25], hallway_nodes[24])
-Edge(hallway_nodes[29], hallway_nodes[18])
-Edge(hallway_nodes[24], hallway_nodes[18])
-# --- Rooms 1/2/3 hallway
-Edge(hallway_nodes[30], hallway_nodes[31])
-Edge(hallway_nodes[31], hallway_nodes[32])
-Edge(hallway_nodes[32], hallway_nodes[33])
-Edge(hallway_nodes[33], hallway_nodes[34])
-Edge(hallway_nodes[34], hallway_nodes[35])
-Edge(hallway_nodes[35], hallway_nodes[36])
-Edge(hallway_nodes[36], hallway_nodes[37])
-Edge(hallway_nodes[37], hallway_nodes[23])
-Edge(hallway_nodes[34], hallway_nodes[38])
-# --- Rooms 3/4 hallway
-Edge(hallway_nodes[44], hallway_nodes[43])
-Edge(hallway_nodes[43], hallway_nodes[42])
-Edge(hallway_nodes[42], hallway_nodes[35])
-Edge(hallway_nodes[42], hallway_nodes[34])
-Edge(hallway_nodes[38], hallway_nodes[39])
-Edge(hallway_nodes[39], hallway_nodes[34])
-Edge(hallway_nodes[39], hallway_nodes[40])
-Edge(hallway_nodes[40], hallway_nodes[41])
-Edge(hallway_nodes[41], hallway_nodes[44])
-Edge(hallway_nodes[39], hallway_nodes[42], bi=True)
-Edge(hallway_nodes[41], hallway_nodes[51])
-Edge(hallway_nodes[41], hallway_nodes[53])
-# --- Right hallway North
-Edge(hallway_nodes[52], hallway_nodes[51])
-Edge(hallway_nodes[51], hallway_nodes[50])
-Edge(hallway_nodes[50], hallway_nodes[49])
-Edge(hallway_nodes[49], hallway_nodes[48])
-Edge(hallway_nodes[48], hallway_nodes[29])
-Edge(hallway_nodes[45], hallway_nodes[46])
-Edge(hallway_nodes[46], hallway_nodes[47])
-Edge(hallway_nodes[47], hallway_nodes[44])
-Edge(hallway_nodes[52], hallway_nodes[44])
-# --- Right hallway South
-Edge(hallway_nodes[53], hallway_nodes[54])
-Edge(hallway_nodes[54], hallway_nodes[55])
-Edge(hallway_nodes[55], hallway_nodes[55])
-Edge(hallway_nodes[55], hallway_nodes[56])
-Edge(hallway_nodes[58], hallway_nodes[57])
-Edge(hallway_nodes[59], hallway_nodes[57])
-Edge(hallway_nodes[57], hallway_nodes[52])
-Edge(hallway_nodes[55], hallway_nodes[58])
-Edge(hallway_nodes[60], hallway_nodes[58])
-Edge(hallway_nodes[60], hallway_nodes[59])
-Edge(hallway_nodes[60], hallway_nodes[56], bi=True)
-Edge(hallway_nodes[56], hallway_nodes[61])
-Edge(hallway_nodes[55], hallway_nodes[61])
-# --- Hallway South
-Edge(hallway_nodes[61], hallway_nodes[62])
-Edge(hallway_nodes[62], hallway_nodes[63])
-Edge(hallway_nodes[63], hallway_nodes[64])
-Edge(hallway_nodes[64], hallway_nodes[65])
-Edge(hallway_nodes[65], hallway_nodes[60])
-
-# Define door Edges for rooms w/ depth=2 (keep a ref so that it can be locked)
-rooms['Reception'].add_edge(hallway_nodes[0])
-rooms['Main Closet'].add_edge(hallway_nodes[2])
-rooms['Closet North'].add_edge(hallway_nodes[13])
-rooms['Library'].add_edge(hallway_nodes[6])
-rooms['Cafe'].add_edge(hallway_nodes[18])
-rooms['MR'].add_edge(hallway_nodes[28])
-rooms['WR'].add_edge(hallway_nodes[27])
-rooms['Room 1'].add_edge(hallway_nodes[31])
-rooms['Room 2'].add_edge(hallway_nodes[32])
-rooms['Room 3'].add_edge(hallway_nodes[36])
-rooms['Room 4'].add_edge(hallway_nodes[39])
-rooms['Gym'].add_edge(hallway_nodes[34])
-rooms['Closet South'].add_edge(hallway_nodes[56])
-rooms['SR'].add_edge(hallway_nodes[64])
-
-# --- Create map objects
-
-# create waypoints for map objects
-wf1 = Waypoint(
-    position=(380, 130)
-)
-Edge(wf1, hallway_nodes[26], bi=True)
-Edge(wf1, hallway_nodes[27], bi=True)
-
-mt1 = Waypoint(
-    position=(315, 195)
-)
-Edge(mt1, rooms['MR'].entrance, bi=True)
-
-# create actual map objects
-map_objects = {
-    'WF1': WF(
-        rect=pygame.Rect((380, 125), (10, 10)),
-        waypoint=wf1,
-    ),
-    'MT3': Tank(
-        rect=pygame.Rect((334, 185), (16, 20))
-    ),
-    'MT2': Tank(
-        rect=pygame.Rect((322, 185), (12, 20))
-    ),
-    'MT1': Tank(
-        rect=pygame.Rect((310, 185), (12, 20))
-    ),
-    'HNG1': Hng(
-        position=(385, 165)
-    )
-}
+# --- load the map definition (Storage/maps/<map_name>.json + .npz)
+map_data = load_map(configs.map_name)
+rooms = map_data.rooms
+hallway_nodes = map_data.hallway_nodes
+map_objects = map_data.map_objects
 
 # send map objets to the event manager (to pass on to the game loop)
 event_manager.map_objects = list(map_objects.values())
 
-# define graphs for nested rooms (depth > 2)
-# --- Library
-temp_list = [
-    Waypoint(
-        position=(205, 30)
-    ),
-    Waypoint(
-        position=(205, 60)
-    ),
-    Waypoint(
-        position=(205, 90)
-    )
-]
-rooms['Library'].add_waypoint(temp_list)
-Edge(temp_list[0], temp_list[1], bi=True)
-Edge(temp_list[1], temp_list[2], bi=True)
-Edge(temp_list[2], rooms['Library'].entrance, bi=True)
-rooms['Lib Office'].add_edge(temp_list[0])
-rooms['Lib Closet'].add_edge(temp_list[1])
-# --- Cafe
-temp_list = [
-    Waypoint(
-        position=(350, 25)
-    ),
-    Waypoint(
-        position=(330, 25)
-    ),
-]
-rooms['Kitchen'].add_waypoint(temp_list[0])
-rooms['Cafe'].add_waypoint(temp_list[1])
-rooms['Fridge'].add_edge(temp_list[0])
-Edge(temp_list[0], rooms['Kitchen'].entrance, bi=True)
-rooms['Kitchen'].add_edge(temp_list[1])
-Edge(temp_list[1], rooms['Cafe'].entrance, bi=True)
-# --- Gym
-temp_list = [
-    Waypoint(  # office door
-        position=(150, 375)
-    ),
-    Waypoint(  # ML door
-        position=(90, 320)
-    ),
-    Waypoint(  # WL door
-        position=(90, 350)
-    ),
-]
-rooms['Gym'].add_waypoint(temp_list)
-rooms['Gym Office'].add_edge(temp_list[0])
-Edge(temp_list[0], rooms['Gym'].entrance, bi=True)
-rooms['ML'].add_edge(temp_list[1])
-Edge(temp_list[1], rooms['Gym'].entrance, bi=True)
-rooms['WL'].add_edge(temp_list[2])
-Edge(temp_list[2], rooms['Gym'].entrance, bi=True)
-
-# define door edges for nested rooms (depth > 2)
-rooms['Office'].add_edge(rooms['Reception'].entrance)
-# rooms['ML'].add_edge(rooms['Gym'].entrance)
-# rooms['WL'].add_edge(rooms['Gym'].entrance)
-# rooms['Gym Office'].add_edge(rooms['Gym'].entrance)
-rooms['Gym Closet'].add_edge(rooms['Gym Office'].entrance)
-rooms['SR Closet'].add_edge(rooms['SR'].entrance)
-
-# --- Define points of interest
-rls = ['Reception', 'Main Closet', 'Closet North', 'Library', 'Cafe', 'MR', 'WR', 'Room 1', 'Room 2', 'Gym', 'Room 4',
-       'Closet South', 'SR', 'Lib Office', 'Lib Closet', 'Kitchen', 'Fridge', 'Gym Office', 'ML', 'WL']
-locations = [rooms[_].entrance for _ in rls]  # waypoints to all the finished rooms
-# locations = [_ for _ in rooms.values() if _.entrance]
-
-unlock_locations = [
-    rooms['WR'].entrance
-]
-
-# map holding locations for ilding (in no particular order)
-idle_locations = [
-    IdleLocation(hallway_nodes[25]),
-    IdleLocation(hallway_nodes[20]),
-    IdleLocation(hallway_nodes[63]),
-
-]
-
-# Queue positions for tank events
-mr_tank_queue = [
-    vector(340, 180),
-    vector(340, 175),
-    vector(340, 170),
-    vector(340, 165)
-]
-# # reverse the list since I put it in the wrong order
-# mr_tank_queue.reverse()
-
-# --- Create event regions
-event_regions = [
-    # --- UI Event Regions
-    # MSY
-    EventRegion(
-        'MSY',
-        rect=rooms['Kitchen'].rect,
-    ),
-    # SRL
-    EventRegion(
-        'SRL',
-        rect=rooms['MR'].rect,
-        obj=[map_objects['HNG1']]
-    ),
-    EventRegion(
-        'SRL',
-        rect=rooms['WR'].rect,
-    ),
-    # HNG
-    EventRegion(
-        'HNG',
-        rect=rooms['MR'].rect,
-    ),
-    EventRegion(
-        'HNG',
-        rect=rooms['WR'].rect,
-    ),
-    EventRegion(
-        'HNG',
-        rect=rooms['SR Closet'].rect,
-    ),
-    EventRegion(
-        'HNG',
-        rect=rooms['Closet North'].rect,
-    ),
-    EventRegion(
-        'HNG',
-        rect=rooms['Closet South'].rect,
-    ),
-    EventRegion(
-        'HNG',
-        rect=rooms['Main Closet'].rect,
-    ),
-    EventRegion(
-        'HNG',
-        rect=rooms['ML'].rect,
-    ),
-    EventRegion(
-        'HNG',
-        rect=rooms['WL'].rect,
-        obj=[map_objects['HNG1']],
-    ),
-    EventRegion(
-        'HNG',
-        rect=rooms['Gym Closet'].rect,
-    ),
-    EventRegion(
-        'HNG',
-        rect=rooms['Fridge'].rect,
-    ),
-    EventRegion(
-        'HNG',
-        rect=rooms['Lib Closet'].rect,
-    ),
-    # FNG
-    EventRegion(
-        'FNG',
-        rect=rooms['MR'].rect,
-    ),
-    EventRegion(
-        'FNG',
-        rect=rooms['WR'].rect,
-    ),
-    EventRegion(
-        'FNG',
-        rect=rooms['SR Closet'].rect,
-    ),
-    EventRegion(
-        'FNG',
-        rect=rooms['Closet North'].rect,
-    ),
-    EventRegion(
-        'FNG',
-        rect=rooms['Closet South'].rect,
-    ),
-    EventRegion(
-        'FNG',
-        rect=rooms['Main Closet'].rect,
-    ),
-    EventRegion(
-        'FNG',
-        rect=rooms['ML'].rect,
-    ),
-    EventRegion(
-        'FNG',
-        rect=rooms['WL'].rect,
-    ),
-    EventRegion(
-        'FNG',
-        rect=rooms['Gym Closet'].rect,
-    ),
-    EventRegion(
-        'FNG',
-        rect=rooms['Fridge'].rect,
-    ),
-    EventRegion(
-        'FNG',
-        rect=rooms['Lib Closet'].rect,
-    ),
-    # --- Needs Event Regions
-    EventRegion(
-        'water',
-        rect=pygame.Rect((380, 125), (10, 10)),
-        obj=map_objects['WF1'],
-    ),
-    er_classes.TankEventRegion(
-        'tank',
-        room=rooms['MR'],
-        items=[map_objects[_] for _ in ['MT1', 'MT2', 'MT3']],
-        queue_positions=mr_tank_queue,
-    )
-]
+# two level planner using the rooms (built once all waypoints and edges exist)
+room_planner = HierarchicalPlanner(rooms)
+
+# --- points of interest
+locations = map_data.locations  # waypoints to all the finished rooms
+unlock_locations = map_data.unlock_locations
+idle_locations = map_data.idle_locations  # map holding locations for idling (in no particular order)
+mr_tank_queue = map_data.queues.get('mr_tank', [])  # queue positions for tank events
+
+# --- event regions
+event_regions = map_data.event_regions
 
 if debug_graph:
     print(rooms['Gym'].waypoints)
@@ -813,34 +81,53 @@ def get_navmesh_coordinate(v):
     out = tools.floor_vector(dv)
     return out
 
-navmesh = np.zeros((int(configs.width / configs.navmesh_ratio), int(configs.height / configs.navmesh_ratio)))+1
-
-# bake in the walls
-for r in rooms.values():
-    lo = get_navmesh_coordinate(tools.vector(r.rect.left, r.rect.top))
-    hi = get_navmesh_coordinate(tools.vector(r.rect.right, r.rect.bottom))
-    # top wall
-    navmesh[lo.x:hi.x+1, lo.y] = np.zeros(1 + hi.x - lo.x)
-    # bottom wall
-    navmesh[lo.x:hi.x+1, hi.y] = np.zeros(1 + hi.x - lo.x)
-    # left wall
-    navmesh[lo.x, lo.y:hi.y+1] = np.zeros(1 + hi.y - lo.y)
-    # right wall
-    navmesh[hi.x, lo.y:hi.y+1] = np.zeros(1 + hi.y - lo.y)
-
-# un-bake the doors
-for key, r in rooms.items():
-    if key == 'building':  # make sure to leave out the exit to the building
-        continue
-    hi = get_navmesh_coordinate(vector(r.entry_rect.right, r.entry_rect.bottom))
-    lo = get_navmesh_coordinate(vector(r.entry_rect.left, r.entry_rect.top))
-    # navmesh[r.entry_rect.left:r.entry_rect.right, r.entry_rect.top:r.entry_rect.bottom] = 1
-    navmesh[lo.x:hi.x+1, lo.y:hi.y+1] = 1
-    if debug_navmesh:
-        print(key)
-        print((r.entry_rect.left, r.entry_rect.right))
-        print((r.entry_rect.top, r.entry_rect.bottom))
-        print("---")
+def bake_navmesh(rooms, size=(configs.width, configs.height)):
+    """
+    Bake the walls of every room into a new navmesh (and cut the doors back out)
+    :param rooms: dict of rooms
+    :param size: (width, height) of the map in pixels
+    :return: 2D numpy array (1 is walkable, 0 is a wall)
+    """
+    navmesh = np.zeros((int(size[0] / configs.navmesh_ratio), int(size[1] / configs.navmesh_ratio)))+1
+
+    # bake in the walls
+    for r in rooms.values():
+        lo = get_navmesh_coordinate(tools.vector(r.rect.left, r.rect.top))
+        hi = get_navmesh_coordinate(tools.vector(r.rect.right, r.rect.bottom))
+        # top wall
+        navmesh[lo.x:hi.x+1, lo.y] = np.zeros(1 + hi.x - lo.x)
+        # bottom wall
+        navmesh[lo.x:hi.x+1, hi.y] = np.zeros(1 + hi.x - lo.x)
+        # left wall
+        navmesh[lo.x, lo.y:hi.y+1] = np.zeros(1 + hi.y - lo.y)
+        # right wall
+        navmesh[hi.x, lo.y:hi.y+1] = np.zeros(1 + hi.y - lo.y)
+
+    # un-bake the doors
+    for key, r in rooms.items():
+        if key == 'building':  # make sure to leave out the exit to the building
+            continue
+        hi = get_navmesh_coordinate(vector(r.entry_rect.right, r.entry_rect.bottom))
+        lo = get_navmesh_coordinate(vector(r.entry_rect.left, r.entry_rect.top))
+        # navmesh[r.entry_rect.left:r.entry_rect.right, r.entry_rect.top:r.entry_rect.bottom] = 1
+        navmesh[lo.x:hi.x+1, lo.y:hi.y+1] = 1
+        if debug_navmesh:
+            print(key)
+            print((r.entry_rect.left, r.entry_rect.right))
+            print((r.entry_rect.top, r.entry_rect.bottom))
+            print("---")
+    return navmesh
+
+
+# load the compiled map if the definition hasn't changed since it was built
+artifact = MapArtifact(configs.map_name, definition_hash(rooms, Waypoint.waypoints, Edge.edges,
+                                                         EventRegion.regions + er_classes.TankEventRegion.regions))
+compiled = use_compiled and artifact.load()
+if compiled:
+    navmesh = artifact.arrays['navmesh']
+    csr_graph.load(artifact.arrays)
+else:
+    navmesh = bake_navmesh(rooms)
 
 if debug_plot_navmesh:
     plt.imshow(np.transpose(navmesh), cmap='gray')
@@ -851,17 +138,33 @@ if debug_save_navmesh:
     np.save('Storage/navmesh.npy', navmesh)
 
 
-# TODO: BROKEN, UNUSED, remove when ready
+# jump point search planner over the navmesh (for movement that isn't on the waypoint graph)
+grid_planner = GridPlanner(navmesh)
+
+# grid traversal for line of sight checks
+if not use_pvs:
+    pvs = None
+elif compiled and 'pvs' in artifact.arrays:
+    pvs = VisibilitySets(navmesh)
+    pvs.table = artifact.arrays['pvs']
+else:
+    pvs = load_pvs(navmesh)
+line_of_sight = LineOfSight(navmesh, pvs=pvs)
+
+# background pool for path queries (works on its own copy of the navmesh)
+path_workers = PathWorkers(navmesh)
+
+
 # calculate a path through the navmesh
 def navmesh_path(start, end):
     """
     Get a path using the navmesh
     :param start: starting vector
     :param end: ending vector
-    :return: list of vectors to follow
+    :return: reversed list of vectors to follow, start excluded (pop to traverse, empty if no path is found)
     """
-    path = tools.a_star_navmesh(navmesh, start.as_tuple(), end.as_tuple())
-    return [vector(p) for p in path]
+    points = grid_planner.find_path(start, end)
+    return [vector(p[0], p[1]) for p in points[:0:-1]]
 
 
 # create the map object (compartmentalize any map based code in this script)
@@ -870,17 +173,53 @@ class Map(BaseObject):
     Holds and draws all game objects if we want to
     """
 
-    def __init__(self):
+    def __init__(self, compiled=None, map_rooms=None, map_navmesh=None, sight=None):
+        """
+        :param compiled: MapArtifact to take the rasters from (built from the rooms if None)
+        :param map_rooms: dict of rooms (defaults to the rooms of the loaded map)
+        :param map_navmesh: navmesh baked from map_rooms (defaults to the loaded map's navmesh)
+        :param sight: LineOfSight over map_navmesh (defaults to the loaded map's)
+        """
         super(Map, self).__init__()
-        self.rooms = rooms
-        self.navmesh = navmesh  # ref to the navmesh array
+        self.rooms = rooms if map_rooms is None else map_rooms
+        self.navmesh = navmesh if map_navmesh is None else map_navmesh  # ref to the navmesh array
+        self.sight = line_of_sight if sight is None else sight
+
+        # room lookup raster (deepest room of every navmesh cell)
+        self.room_list = []  # room of each id in the raster
+        self.room_table = None  # object array of [None] + room_list (index w/ room id + 1)
+        self.room_ids = None  # int16 array shaped like the navmesh, -1 where there is no room
+        self.room_index = {}  # room: id in the rasters
+
+        # doorway lookup raster
+        self.door_ids = None  # int16 array, first room (in dict order) whose entry_rect covers the cell (-1 if none)
+
+        # event region lookup raster (bit per key)
+        self.event_index = EventIndex(self.navmesh.shape)
+
+        # nearest waypoint raster (Voronoi cells of each room's waypoints)
+        self.room_waypoints = []  # list of waypoints in each room (same ids as room_list)
+        self.room_positions = []  # float array of shape (n, 2) w/ the positions of room_waypoints
+        self.nearest_ids = None  # int32 array, index into room_waypoints[room id] of the closest waypoint (-1 if none)
+        self.nearest_exact = None  # bool array, False near Voronoi borders where the cell's points don't agree
+        self.n_waypoints = -1  # number of waypoints the raster was built for
+
+        if compiled:
+            self.load_compiled(compiled)
+        else:
+            self.build_room_raster()
+            self.build_door_raster()
+            self.build_waypoint_raster()
+
+        # wall segments (w/ the doors cut out) for swept collisions
+        self.walls = WallGrid(wall_segments(self.rooms))
 
     def draw(self, screen):
         super().draw(screen)
 
         # draw all rooms
         if draw_rooms:
-            for name, r in rooms.items():
+            for name, r in self.rooms.items():
                 if r.depth > 1:
                     pygame.draw.rect(screen, configs.room_colors[r.depth - 1], r.rect)
                     pygame.draw.rect(screen, configs.entry_color, r.entry_rect)
@@ -955,21 +294,230 @@ class Map(BaseObject):
         #         rect.top < pos.y < rect.bottom)
         return rect.left > pos.x > rect.right, rect.top > pos.y > rect.bottom
 
+    def load_compiled(self, artifact):
+        """
+        Take the rasters from a compiled map instead of building them
+        :param artifact: MapArtifact built from the same map definition
+        :return: None
+        """
+        a = artifact.arrays
+        self.room_list = list(self.rooms.values())
+        self.room_index = {r: i for i, r in enumerate(self.room_list)}
+        self.room_table = np.array([None] + self.room_list, dtype=object)
+        self.room_ids = a['room_ids']
+        self.door_ids = a['door_ids']
+        self.room_waypoints = [list(r.waypoints.values()) for r in self.room_list]
+        self.room_positions = [np.array([[wp.position.x, wp.position.y] for wp in wps], dtype=float).reshape((-1, 2))
+                               for wps in self.room_waypoints]
+        self.nearest_ids = a['nearest_ids']
+        self.nearest_exact = a['nearest_exact']
+        self.n_waypoints = len(Waypoint.waypoints)
+        self.event_index.load(a['event_masks'], artifact.meta['event_keys'])
+
+    def compiled_arrays(self):
+        """
+        :return: (dict of rasters, dict of json data) to save w/ a compiled map
+        """
+        self.event_index.ensure()
+        arrays = {
+            'room_ids': self.room_ids,
+            'door_ids': self.door_ids,
+            'nearest_ids': self.nearest_ids,
+            'nearest_exact': self.nearest_exact,
+            'event_masks': self.event_index.masks,
+        }
+        return arrays, {'event_keys': self.event_index.key_list}
+
+    def build_room_raster(self):
+        """
+        Paint the deepest room of every navmesh cell into the room id raster
+        Must be called again if any room's rect is changed
+        :return: None
+        """
+        ratio = configs.navmesh_ratio
+        self.room_list = list(self.rooms.values())
+        self.room_index = {r: i for i, r in enumerate(self.room_list)}
+        self.room_table = np.array([None] + self.room_list, dtype=object)
+        self.room_ids = np.full(self.navmesh.shape, -1, dtype=np.int16)
+        depth = np.zeros(self.navmesh.shape, dtype=np.int16)
+        for i, r in enumerate(self.room_list):
+            xs = slice(max(r.rect.left // ratio, 0), max(r.rect.right // ratio, 0))
+            ys = slice(max(r.rect.top // ratio, 0), max(r.rect.bottom // ratio, 0))
+            # same tie break as looping over the rooms (first room of the highest depth wins)
+            deeper = depth[xs, ys] < r.depth
+            self.room_ids[xs, ys][deeper] = i
+            depth[xs, ys][deeper] = r.depth
+
+    def build_door_raster(self):
+        """
+        Paint every room's entry_rect into the doorway raster
+        Must be called again if any room's entry_rect is changed (after Map.build_room_raster if rooms were added)
+        :return: None
+        """
+        ratio = configs.navmesh_ratio
+        self.door_ids = np.full(self.navmesh.shape, -1, dtype=np.int16)
+        for i, r in reversed(list(enumerate(self.room_list))):  # paint backwards so the first room ends up on top
+            xs = slice(max(r.entry_rect.left // ratio, 0), max(r.entry_rect.right // ratio, 0))
+            ys = slice(max(r.entry_rect.top // ratio, 0), max(r.entry_rect.bottom // ratio, 0))
+            self.door_ids[xs, ys] = i
+
+    def build_waypoint_raster(self, tile=64):
+        """
+        Find the closest waypoint (of the cell's room) for every cell of the room raster
+         - Distances are measured from the cell's corner, so a point inside of the cell can be up to one cell
+           diagonal closer/further from a waypoint. Cells where the two closest waypoints are within two diagonals
+           of each other are marked as inexact and are solved exactly on lookup.
+         - Solved a tile at a time, only w/ the waypoints that can be one of the two closest to some cell of the tile
+           (waypoints whose closest point to the tile is further than the second best furthest point are skipped)
+        Must be called again if waypoints are added to rooms (done automatically when Waypoint.waypoints grows)
+        :param tile: size of the tiles in cells
+        :return: None
+        """
+        ratio = configs.navmesh_ratio
+        margin = 2 * np.sqrt(2) * ratio
+        self.room_waypoints = [list(r.waypoints.values()) for r in self.room_list]
+        self.room_positions = [np.array([[wp.position.x, wp.position.y] for wp in wps], dtype=float).reshape((-1, 2))
+                               for wps in self.room_waypoints]
+        self.nearest_ids = np.full(self.navmesh.shape, -1, dtype=np.int32)
+        self.nearest_exact = np.ones(self.navmesh.shape, dtype=bool)
+        w, h = self.navmesh.shape
+        for tx in range(0, w, tile):
+            for ty in range(0, h, tile):
+                ids = self.room_ids[tx:tx + tile, ty:ty + tile]
+                for i in np.unique(ids):
+                    positions = self.room_positions[i] if i >= 0 else ()
+                    if not len(positions):
+                        continue
+                    lx, ly = np.nonzero(ids == i)
+                    cx, cy = lx + tx, ly + ty
+
+                    # prune w/ the bounding box of the cells
+                    x0, x1, y0, y1 = cx.min() * ratio, cx.max() * ratio, cy.min() * ratio, cy.max() * ratio
+                    px, py = positions[:, 0], positions[:, 1]
+                    near = np.hypot(np.maximum(np.maximum(x0 - px, px - x1), 0),
+                                    np.maximum(np.maximum(y0 - py, py - y1), 0))
+                    far = np.hypot(np.maximum(px - x0, x1 - px), np.maximum(py - y0, y1 - py))
+                    if len(positions) > 2:
+                        keep = np.flatnonzero(near <= np.partition(far, 1)[1] + 1e-6)  # keeps index order for ties
+                    else:
+                        keep = np.arange(len(positions))
+
+                    d = np.hypot(cx[:, None] * ratio - px[keep], cy[:, None] * ratio - py[keep])
+                    self.nearest_ids[cx, cy] = keep[np.argmin(d, axis=1)]  # first of any ties (same as a strict < loop)
+                    if len(keep) > 1:
+                        d.sort(axis=1)
+                        self.nearest_exact[cx, cy] = d[:, 1] - d[:, 0] > margin
+        self.n_waypoints = len(Waypoint.waypoints)
+
+    def get_room_waypoint(self, position, room=None):
+        """
+        Return the closest waypoint in the room of a given position
+        :param position: position as type tools.vector
+        :param room: room the position is in (looked up if not given)
+        :return: Waypoint object (None if not in a room or the room has no waypoints)
+        """
+        if self.n_waypoints != len(Waypoint.waypoints):
+            self.build_waypoint_raster()
+        c = self._cell(position)
+        if c is None:  # off of the map, search the room directly
+            room = room or self.get_room(position)
+            if room not in self.room_index:
+                return None
+            i = self.room_index[room]
+        else:
+            i = self.room_ids[c]
+            if i < 0:
+                return None
+            if self.nearest_exact[c]:
+                j = self.nearest_ids[c]
+                return self.room_waypoints[i][j] if j >= 0 else None
+        positions = self.room_positions[i]
+        if not len(positions):
+            return None
+        d = np.hypot(positions[:, 0] - position.x, positions[:, 1] - position.y)
+        return self.room_waypoints[i][np.argmin(d)]
+
+    def get_room_waypoint_ids(self, points):
+        """
+        Vectorized Map.get_room_waypoint
+        :param points: array of shape (n, 2) w/ x, y positions
+        :return: int array of Waypoint.index values (-1 if not in a room or the room has no waypoints)
+        """
+        if self.n_waypoints != len(Waypoint.waypoints):
+            self.build_waypoint_raster()
+        points = np.asarray(points, dtype=float)
+        xy, inside = self._cells(points)
+        out = np.full(len(points), -1, dtype=np.int32)
+        room = np.full(len(points), -1, dtype=np.int32)
+        room[inside] = self.room_ids[xy[inside, 0], xy[inside, 1]]
+        exact = np.zeros(len(points), dtype=bool)
+        exact[inside] = self.nearest_exact[xy[inside, 0], xy[inside, 1]]
+        nearest = np.full(len(points), -1, dtype=np.int32)
+        nearest[inside] = self.nearest_ids[xy[inside, 0], xy[inside, 1]]
+        for k in np.flatnonzero(~inside):  # off of the map, fall back to the room rects
+            r = self.get_room(vector(points[k, 0], points[k, 1]))
+            room[k] = self.room_index.get(r, -1)
+        for i in np.unique(room[room >= 0]):
+            wps = self.room_waypoints[i]
+            if not wps:
+                continue
+            ids = np.array([wp.index for wp in wps])
+            sel = room == i
+            fast = sel & exact
+            out[fast] = ids[nearest[fast]]
+            slow = np.flatnonzero(sel & ~exact)
+            if len(slow):
+                positions = self.room_positions[i]
+                d = np.hypot(points[slow, 0, None] - positions[:, 0], points[slow, 1, None] - positions[:, 1])
+                out[slow] = ids[np.argmin(d, axis=1)]
+        return out
+
+    def _cell(self, position):
+        # raster cell of a position (None if off of the raster), truncated like pygame.Rect.collidepoint
+        x = int(position.x) // configs.navmesh_ratio
+        y = int(position.y) // configs.navmesh_ratio
+        w, h = self.room_ids.shape
+        if 0 <= x < w and 0 <= y < h:
+            return x, y
+        return None
+
+    def _cells(self, points):
+        # vectorized Map._cell, returns (cells, mask of the points on the raster)
+        xy = np.asarray(points).astype(int) // configs.navmesh_ratio
+        w, h = self.room_ids.shape
+        inside = (xy[:, 0] >= 0) & (xy[:, 0] < w) & (xy[:, 1] >= 0) & (xy[:, 1] < h)
+        return xy, inside
+
     def get_room(self, position):
         """
         Return the room with the highest depth for a given position
         :param position: position as type tools.vector
         :return: room.Room obj
         """
-        p = position.as_tuple()
-        out = None  # start with no room
-        for r in rooms.values():
-            if r.collidepoint(p):  # if position is in a room
-                # if we don't have an out room or out's depth is higher than out's depth
-                if not out or out.depth < r.depth:
-                    out = r  # set return variable to new room
+        c = self._cell(position)
+        if c is None:
+            return None
+        return self.room_table[self.room_ids[c] + 1]
+
+    def get_room_ids(self, points):
+        """
+        Vectorized room lookup
+        :param points: array of shape (n, 2) w/ x, y positions
+        :return: int16 array of indices into Map.room_list (-1 if a point isn't in a room)
+        """
+        xy, inside = self._cells(points)
+        out = np.full(len(xy), -1, dtype=np.int16)
+        out[inside] = self.room_ids[xy[inside, 0], xy[inside, 1]]
         return out
 
+    def get_rooms(self, points):
+        """
+        Vectorized Map.get_room
+        :param points: array of shape (n, 2) w/ x, y positions
+        :return: object array of rooms (None if a point isn't in a room)
+        """
+        return self.room_table[self.get_room_ids(points) + 1]
+
     def get_doorframe(self, position):
         """
         Loop through all doorframes to check if player is in an entrance
@@ -977,21 +525,66 @@ class Map(BaseObject):
         :param position: player position > tools.vector
         :return: room of the current entryway (None if not in an entryway)
         """
-        p = position.as_tuple()
-        for r in rooms.values():
-            if r.entry_rect.collidepoint(p):
-                return r
-        return None
+        c = self._cell(position)
+        if c is None:  # entry rects hanging off of the map
+            p = position.as_tuple()
+            for r in self.room_list:
+                if r.entry_rect.collidepoint(p):
+                    return r
+            return None
+        return self.room_table[self.door_ids[c] + 1]
+
+    def get_doorframe_ids(self, points):
+        """
+        Vectorized doorway lookup
+        :param points: array of shape (n, 2) w/ x, y positions
+        :return: int16 array of indices into Map.room_list (-1 if a point isn't in an entryway)
+        """
+        points = np.asarray(points)
+        xy, inside = self._cells(points)
+        out = np.full(len(xy), -1, dtype=np.int16)
+        out[inside] = self.door_ids[xy[inside, 0], xy[inside, 1]]
+        for k in np.flatnonzero(~inside):  # entry rects hanging off of the map
+            p = (points[k, 0], points[k, 1])
+            for i, r in enumerate(self.room_list):
+                if r.entry_rect.collidepoint(p):
+                    out[k] = i
+                    break
+        return out
+
+    def get_doorframes(self, points):
+        """
+        Vectorized Map.get_doorframe
+        :param points: array of shape (n, 2) w/ x, y positions
+        :return: object array of rooms (None if a point isn't in an entryway)
+        """
+        return self.room_table[self.get_doorframe_ids(points) + 1]
 
     def check_event(self, position, key):
-        pos = position.as_tuple()  # get tuple of location to check
+        """
+        Check if an event key is valid at a position
+        :param position: position as type tools.vector
+        :param key: event key (the attack's name)
+        :return: boolean
+        """
+        return self.event_index.is_valid(position, key)
 
-        for r in EventRegion.regions:  # loop through event regions
-            if r.rect.collidepoint(pos):  # if we are in this region
-                if r.key == key:  # if the key matches
-                    return True  # return True
+    def get_event_keys(self, position):
+        """
+        Every event key valid at a position
+        :param position: position as type tools.vector
+        :return: list of keys
+        """
+        return self.event_index.keys_at(position)
 
-        return False  # return false if no matching EventRegion found
+    def check_events(self, points, key):
+        """
+        Vectorized Map.check_event
+        :param points: array of shape (n, 2) w/ x, y positions
+        :param key: event key
+        :return: bool array
+        """
+        return self.event_index.valid_at(points, key)
 
     def get_nearest_waypoint(self, position, waypoints=None):
         """
@@ -1000,12 +593,19 @@ class Map(BaseObject):
         :param waypoints: list of waypoints to check (default: all waypoints in the current room)
         :return: Waypoint object
         """
-        # use all created waypoints if not given a list to search through
-        if not waypoints:
-            waypoints = list(self.get_room(position).waypoints.values())
-
         # loop through waypoints to find the minimum
         mp = Waypoint.waypoints[0]
+
+        # use the waypoint raster if not given a list to search through
+        if not waypoints:
+            wp = self.get_room_waypoint(position)
+            if wp is None:
+                waypoints = list(self.get_room(position).waypoints.values())
+            elif vector.distance(wp.position, position) < vector.distance(mp.position, position):
+                return wp
+            else:
+                return mp
+
         md = vector.distance(mp.position, position)
         for wp in waypoints:
             d = vector.distance(wp.position, position)
@@ -1022,14 +622,53 @@ class Map(BaseObject):
         :param po: second position
         :return: bool for if positions can see eachother
         """
-        n = int(max([(abs(int(pi.x - po.x + 1))), abs(int(pi.y - po.y + 1))]) * configs.can_see_multiplier)
-        xl = np.linspace(pi.x, po.x, n)
-        yl = np.linspace(pi.y, po.y, n)
-        ps = [get_navmesh_coordinate(vector(x, y)) for x, y in zip(xl, yl)]  # all positions on the line
+        return self.sight.visible(pi, po)
 
-        return all([navmesh[v.x, v.y] for v in ps])
+    def can_see_many(self, origin, targets, radius=None, forward=None, fov=None, same_room=False):
+        """
+        Check which targets can be seen from a position
+         - Range, cone and room checks are done for every target at once, only the rest are traced on the navmesh
+        :param origin: position to look from
+        :param targets: array of shape (n, 2) w/ x, y positions
+        :param radius: max distance to a visible target (None for no limit)
+        :param forward: direction the origin is facing (needed for fov)
+        :param fov: max angle (degrees) between forward and a visible target (None for no limit)
+        :param same_room: only targets in the same room as the origin can be seen
+        :return: bool array
+        """
+        targets = np.asarray(targets, dtype=float).reshape((-1, 2))
+        d = targets - (origin.x, origin.y)
+        dist = np.sqrt(d[:, 0] ** 2 + d[:, 1] ** 2)
+        keep = np.flatnonzero(dist < radius) if radius is not None else np.arange(len(targets))
+        if fov is not None and forward is not None and len(keep):
+            # angle < fov <=> cos(angle) > cos(fov), a target on top of the origin is always in view
+            f = forward.unit()
+            dot = d[keep, 0] * f.x + d[keep, 1] * f.y
+            keep = keep[(dot > np.cos(np.radians(fov)) * dist[keep]) | (dist[keep] == 0)]
+        if same_room and len(keep):
+            c = self._cell(origin)
+            room = self.room_ids[c] if c is not None else -1
+            keep = keep[self.get_room_ids(targets[keep]) == room]
+
+        mask = np.zeros(len(targets), dtype=bool)
+        mask[keep] = True
+        for k in keep.tolist():  # trace the survivors
+            mask[k] = self.sight.visible(origin, vector(targets[k, 0], targets[k, 1]))
+        return mask
 
 
 # initialize the map
-game_map = Map()
+game_map = Map(artifact if compiled else None)
+
+# save the compiled map for the next startup
+if use_compiled and not compiled:
+    arrays, meta = game_map.compiled_arrays()
+    arrays.update(csr_graph.arrays())
+    arrays['navmesh'] = navmesh
+    if pvs is not None:
+        arrays['pvs'] = pvs.table
+    artifact.save(arrays, meta)
+
+# string pulling for waypoint routes (uses the map's line of sight check)
+path_smoother = PathSmoother(game_map.can_see, rooms)
 
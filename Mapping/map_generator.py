@@ -0,0 +1,133 @@
+"""
+Procedural buildings for testing the navigation stack on maps much larger than the default one
+Buildings are a grid of rooms w/ hallways between them, emitted in the format of Storage/maps/ (see Mapping.map_loader)
+so they are built into the same Room / Waypoint / Edge / EventRegion objects as the default map
+ - Hallway waypoints sit on every hallway crossing and in front of every door
+ - Some rooms get a closet nested in their corner (depth 3) w/ a waypoint in front of the closet's door
+ - Some hallway segments are left out (seeded), so paths have to go around blocks of rooms
+"""
+
+import numpy as np
+
+from Mapping.map_loader import build_map
+
+# layout variables (pixels)
+room_size = 80  # width and height of every room
+hall_width = 30  # width of the hallways between rooms
+margin = 10  # space between the building and the edge of the map
+
+
+def building_size(cols, rows):
+    """
+    :return: (width, height) in pixels of the map needed for a building
+    """
+    pitch = room_size + hall_width
+    return 2 * margin + hall_width + cols * pitch, 2 * margin + hall_width + rows * pitch
+
+
+def generate_definition(cols, rows, closet_rate=0.3, cut_rate=0.2, seed=0):
+    """
+    Lay out a building as a map definition
+    :param cols: number of rooms along x
+    :param rows: number of rooms along y
+    :param closet_rate: chance of a room getting a nested closet
+    :param cut_rate: chance of a vertical hallway segment being left out (the first column is always kept)
+    :param seed: seed of the random layout
+    :return: (json data, positions, edges) as taken by Mapping.map_loader.build_map
+    """
+    rng = np.random.default_rng(seed)
+    pitch = room_size + hall_width
+    width, height = building_size(cols, rows)
+
+    def hall(k):  # center line of the k-th hallway
+        return margin + hall_width // 2 + k * pitch
+
+    positions = []
+    edges = []
+
+    def add_waypoint(x, y):
+        positions.append((x, y))
+        return len(positions) - 1
+
+    def add_edge(a, b):
+        edges.append((a, b, 1))
+        return len(edges) - 1
+
+    # hallway waypoints (crossings, then one in front of each door)
+    crossing = {(i, j): add_waypoint(hall(i), hall(j)) for i in range(cols + 1) for j in range(rows + 1)}
+    approach = {(i, j): add_waypoint(hall(i) + pitch // 2, hall(j + 1)) for j in range(rows) for i in range(cols)}
+    hallway = list(range(len(positions)))
+
+    # rooms (entrances on the bottom wall, closets go right after the room they are in)
+    rooms = {'building': {'xlim': [margin, width - margin], 'ylim': [margin, height - margin], 'entrance': [-10, -10],
+                          'depth': 1}}
+    closets = {}  # room name: closet name
+    for j in range(rows):
+        for i in range(cols):
+            x0, y0 = margin + hall_width + i * pitch, margin + hall_width + j * pitch
+            name = 'Room %i-%i' % (i, j)
+            rooms[name] = {'xlim': [x0, x0 + room_size], 'ylim': [y0, y0 + room_size],
+                           'entrance': [x0 + room_size // 2, y0 + room_size], 'depth': 2}
+            if rng.random() < closet_rate:
+                closets[name] = 'Closet %i-%i' % (i, j)
+                rooms[closets[name]] = {'xlim': [x0, x0 + room_size // 2], 'ylim': [y0, y0 + room_size // 3],
+                                        'entrance': [x0 + room_size // 2, y0 + room_size // 6], 'depth': 3}
+    for r in rooms.values():
+        r['entrance_waypoint'] = add_waypoint(*r['entrance'])
+        r['waypoints'] = [r['entrance_waypoint']]
+    rooms['building']['waypoints'] = hallway + rooms['building']['waypoints']
+
+    # hallway edges (rows are always whole, some vertical segments are cut)
+    for j in range(rows + 1):
+        for i in range(cols):
+            if j:
+                add_edge(crossing[i, j], approach[i, j - 1])
+                add_edge(approach[i, j - 1], crossing[i + 1, j])
+            else:
+                add_edge(crossing[i, j], crossing[i + 1, j])
+    for i in range(cols + 1):
+        for j in range(rows):
+            if not i or rng.random() >= cut_rate:
+                add_edge(crossing[i, j], crossing[i, j + 1])
+
+    # doors (closets are reached through a waypoint inside of their room)
+    for j in range(rows):
+        for i in range(cols):
+            name = 'Room %i-%i' % (i, j)
+            r = rooms[name]
+            r['door'] = add_edge(r['entrance_waypoint'], approach[i, j])
+            if name in closets:
+                c = rooms[closets[name]]
+                inside = add_waypoint(c['entrance'][0] + hall_width // 2, c['entrance'][1])
+                r['waypoints'] += [inside]
+                add_edge(r['entrance_waypoint'], inside)
+                c['door'] = add_edge(c['entrance_waypoint'], inside)
+
+    # event regions (closets work for the UI events, some rooms for MSY)
+    regions = []
+    for k, name in enumerate(rooms):
+        if name in closets.values():
+            regions += [{'key': 'HNG', 'room': name}, {'key': 'FNG', 'room': name}]
+        elif k % 7 == 1:
+            regions += [{'key': 'MSY', 'room': name}]
+
+    corners = [crossing[0, 0], crossing[cols, 0], crossing[0, rows], crossing[cols, rows]]
+    data = {
+        'rooms': rooms,
+        'hallway': hallway,
+        'map_objects': {},
+        'locations': [name for name in rooms if name != 'building'],
+        'unlock_locations': [],
+        'idle_locations': corners,
+        'queues': {},
+        'event_regions': regions,
+    }
+    return data, np.array(positions, dtype=np.int32), np.array(edges, dtype=np.int32)
+
+
+def generate_map(cols, rows, closet_rate=0.3, cut_rate=0.2, seed=0, name='generated'):
+    """
+    Build a procedural building (replaces the currently loaded map, see Mapping.map_loader.load_map)
+    :return: MapData
+    """
+    return build_map(name, *generate_definition(cols, rows, closet_rate, cut_rate, seed))
@@ -0,0 +1,358 @@
+"""
+Load maps from a declarative definition instead of building them as python literals
+A map is stored as two files in Storage/maps/:
+ - <name>.json: rooms, map objects, points of interest and event regions (waypoints are referenced by index)
+ - <name>.npz: numpy sidecar w/ the waypoint positions (n, 2) and the edges (m, 3) as [node1, node2, bi]
+Every index in the definition is checked before anything is built, so a broken map fails w/o leaving half of a graph
+behind. Waypoints and edges are created in the order they are stored, so indices (and everything keyed by them, like
+compiled artifacts) match between runs.
+"""
+
+import json
+import os
+
+import numpy as np
+import pygame
+
+import configs
+from tools import vector
+
+from Mapping.room import Room
+from Mapping.waypoint import Waypoint, Edge, IdleLocation, reset_graph
+from Mapping.event_region import EventRegion, TankEventRegion
+
+# import map object classes
+from Mapping.objects.WF import WF
+from Mapping.objects.hng import Hng
+from Mapping.objects.tank import Tank
+
+# debug variables
+debug = False
+
+# map object classes by the type used in map files
+object_types = {
+    'WF': WF,
+    'Tank': Tank,
+    'Hng': Hng,
+}
+
+
+class MapData:
+    """
+    Everything built from a map definition
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.rooms = {}  # name: Room (in definition order)
+        self.waypoints = []  # every waypoint (same order as Waypoint.waypoints)
+        self.edges = []  # every edge (in creation order)
+        self.hallway_nodes = []  # waypoints of the hallways
+        self.map_objects = {}  # name: map object
+        self.locations = []  # entrances of the rooms actors wander to
+        self.unlock_locations = []  # entrances of the rooms that can be unlocked
+        self.idle_locations = []  # IdleLocations
+        self.queues = {}  # name: list of queue positions
+        self.event_regions = []  # EventRegions and TankEventRegions
+
+
+def map_paths(name, path=configs.maps_path):
+    """
+    :return: (json path, sidecar path) of a map
+    """
+    return os.path.join(path, name + '.json'), os.path.join(path, name + '.npz')
+
+
+def validate(data, positions, edges):
+    """
+    Check a map definition before anything is built from it
+    :param data: json data of the map
+    :param positions: array of waypoint positions
+    :param edges: array of [node1, node2, bi] edges
+    :return: None (raises an Exception describing the first problem found)
+    """
+    if positions.ndim != 2 or positions.shape[1] != 2:
+        raise Exception("Waypoint positions must be shaped (n, 2) (got %s)" % (positions.shape,))
+    if not np.isfinite(positions).all():
+        raise Exception("Waypoint positions must be finite")
+    n = len(positions)
+    if edges.ndim != 2 or edges.shape[1] != 3 or not np.issubdtype(edges.dtype, np.integer):
+        raise Exception("Edges must be an integer array shaped (m, 3)")
+    out_of_range = ((edges[:, :2] < 0) | (edges[:, :2] >= n)).any(axis=1)
+    bad = np.flatnonzero(out_of_range | ((edges[:, 2] != 0) & (edges[:, 2] != 1)))
+    if len(bad):
+        raise Exception("Edge %i is invalid: %s" % (bad[0], edges[bad[0]].tolist()))
+
+    def check_ids(ids, what):
+        ids = np.asarray(ids, dtype=np.int64)
+        if ids.ndim != 1 or ((ids < 0) | (ids >= n)).any():
+            raise Exception("%s references a waypoint that doesn't exist" % what)
+
+    rooms = data['rooms']
+    entrances = [r['entrance_waypoint'] for r in rooms.values()]
+    check_ids(entrances, "A room's entrance")
+    if len(set(entrances)) != len(entrances):
+        raise Exception("Rooms can't share an entrance waypoint")
+    for name, r in rooms.items():
+        if not (r['xlim'][0] < r['xlim'][1] and r['ylim'][0] < r['ylim'][1]):
+            raise Exception("Room '%s' has empty limits" % name)
+        if r.get('depth', 2) < 1:
+            raise Exception("Room '%s' needs a depth of at least 1" % name)
+        if tuple(positions[r['entrance_waypoint']]) != tuple(r['entrance']):
+            raise Exception("Entrance waypoint of room '%s' isn't at its entrance" % name)
+        check_ids(r.get('waypoints', []), "Room '%s'" % name)
+        door = r.get('door')
+        if door is not None:
+            if not 0 <= door < len(edges) or edges[door, 0] != r['entrance_waypoint'] or not edges[door, 2]:
+                raise Exception("Door of room '%s' must be a bi-directional edge from its entrance" % name)
+
+    check_ids(data.get('hallway', []), "The hallway")
+    check_ids(data.get('idle_locations', []), "An idle location")
+    for key in ('locations', 'unlock_locations'):
+        for name in data.get(key, []):
+            if name not in rooms:
+                raise Exception("Unknown room '%s' in %s" % (name, key))
+
+    objects = data.get('map_objects', {})
+    for name, o in objects.items():
+        if o.get('type') not in object_types:
+            raise Exception("Map object '%s' has an unknown type: %s" % (name, o.get('type')))
+        if 'waypoint' in o:
+            check_ids([o['waypoint']], "Map object '%s'" % name)
+
+    queues = data.get('queues', {})
+    for region in data.get('event_regions', []):
+        if 'room' in region and region['room'] not in rooms:
+            raise Exception("Event region '%s' references an unknown room: %s" % (region['key'], region['room']))
+        if region.get('type') == 'tank':
+            if 'room' not in region or region.get('queue') not in queues:
+                raise Exception("Tank region '%s' needs a room and a queue" % region['key'])
+            names = region.get('items', [])
+        else:
+            if 'room' not in region and 'rect' not in region:
+                raise Exception("Event region '%s' needs a room or a rect" % region['key'])
+            obj = region.get('obj')
+            names = [] if obj is None else obj if type(obj) == list else [obj]
+        for name in names:
+            if name not in objects:
+                raise Exception("Event region '%s' references an unknown map object: %s" % (region['key'], name))
+
+
+def load_map(name=configs.map_name, path=configs.maps_path, reset=True):
+    """
+    Build a map from Storage/maps/
+    :param name: name of the map
+    :param path: directory holding the map files
+    :param reset: forget the waypoints, edges and event regions of the previously loaded map first
+    :return: MapData
+    """
+    json_path, sidecar_path = map_paths(name, path)
+    with open(json_path) as f:
+        data = json.load(f)
+    with np.load(sidecar_path) as sidecar:
+        positions = sidecar['positions']
+        edges = sidecar['edges']
+    return build_map(name, data, positions, edges, reset)
+
+
+def build_map(name, data, positions, edges, reset=True):
+    """
+    Build a map from a definition that is already in memory (see load_map for the format)
+    :param name: name of the map
+    :param data: json data of the map
+    :param positions: array of waypoint positions shaped (n, 2)
+    :param edges: integer array of [node1, node2, bi] shaped (m, 3)
+    :param reset: forget the waypoints, edges and event regions of the previously loaded map first
+    :return: MapData
+    """
+    validate(data, positions, edges)
+
+    if reset:
+        reset_graph()
+        EventRegion.regions = []
+        TankEventRegion.regions = []
+
+    out = MapData(name)
+
+    # rooms
+    entrance_of = {}  # waypoint index: room
+    for room_name, r in data['rooms'].items():
+        entry = r.get('entry', [configs.entry_size, configs.entry_size])
+        room = Room(xlim=r['xlim'], ylim=r['ylim'], entrance=r['entrance'], entry_width=entry[0],
+                    entry_height=entry[1], depth=r.get('depth', 2))
+        room.name = room_name
+        out.rooms[room_name] = room
+        entrance_of[r['entrance_waypoint']] = room
+
+    # waypoints (created in index order, entrances are named after their room)
+    for i, p in enumerate(positions.tolist()):
+        room = entrance_of.get(i)
+        wp = Waypoint(position=tuple(p), name=room.name + '_entrance' if room else None)
+        if room:
+            room.entrance = wp
+        out.waypoints += [wp]
+    wps = out.waypoints
+
+    # room membership (entrances keep the 'entrance' key, the rest are named in order)
+    for room_name, r in data['rooms'].items():
+        room = out.rooms[room_name]
+        for i in r.get('waypoints', []):
+            room.add_waypoint(wps[i], 'entrance' if wps[i] is room.entrance else None)
+
+    # edges (doors keep a ref to theirs so they can be locked)
+    for a, b, bi in edges.tolist():
+        out.edges += [Edge(wps[a], wps[b], bi=bool(bi))]
+    for room_name, r in data['rooms'].items():
+        if r.get('door') is not None:
+            out.rooms[room_name].edge = out.edges[r['door']]
+
+    out.hallway_nodes = [wps[i] for i in data.get('hallway', [])]
+
+    # map objects
+    for obj_name, o in data.get('map_objects', {}).items():
+        kwargs = {}
+        if 'rect' in o:
+            kwargs['rect'] = pygame.Rect(o['rect'])
+        if 'position' in o:
+            kwargs['position'] = tuple(o['position'])
+        if 'waypoint' in o:
+            kwargs['waypoint'] = wps[o['waypoint']]
+        out.map_objects[obj_name] = object_types[o['type']](**kwargs)
+
+    # points of interest
+    out.locations = [out.rooms[_].entrance for _ in data.get('locations', [])]
+    out.unlock_locations = [out.rooms[_].entrance for _ in data.get('unlock_locations', [])]
+    out.idle_locations = [IdleLocation(wps[i]) for i in data.get('idle_locations', [])]
+    out.queues = {k: [vector(p[0], p[1]) for p in v] for k, v in data.get('queues', {}).items()}
+
+    # event regions (regions in a room share the room's rect)
+    for region in data.get('event_regions', []):
+        if region.get('type') == 'tank':
+            out.event_regions += [TankEventRegion(
+                region['key'],
+                room=out.rooms[region['room']],
+                items=[out.map_objects[_] for _ in region['items']],
+                queue_positions=out.queues[region['queue']],
+            )]
+            continue
+        obj = region.get('obj')
+        if type(obj) == list:
+            obj = [out.map_objects[_] for _ in obj]
+        elif obj is not None:
+            obj = out.map_objects[obj]
+        rect = out.rooms[region['room']].rect if 'room' in region else pygame.Rect(region['rect'])
+        out.event_regions += [EventRegion(region['key'], rect=rect, obj=obj)]
+
+    if debug:
+        print("Loaded map '%s': %i rooms, %i waypoints, %i edges" % (name, len(out.rooms), len(wps), len(out.edges)))
+    return out
+
+
+def write_json(definition, f):
+    """
+    Write a map definition w/ one line per room, object and region (keeps map files readable and diffs small)
+    """
+    lines = []
+    for k, v in definition.items():
+        if type(v) == dict and v:
+            text = '{\n%s\n }' % ',\n'.join('  %s: %s' % (json.dumps(a), json.dumps(b)) for a, b in v.items())
+        elif type(v) == list and v and type(v[0]) == dict:
+            text = '[\n%s\n ]' % ',\n'.join('  ' + json.dumps(b) for b in v)
+        else:
+            text = json.dumps(v)
+        lines += [' %s: %s' % (json.dumps(k), text)]
+    f.write('{\n%s\n}\n' % ',\n'.join(lines))
+
+
+def save_map(data, name, path=configs.maps_path):
+    """
+    Write a map to Storage/maps/ (inverse of load_map)
+    :param data: MapData (waypoints, edges and rooms have to be complete)
+    :param name: name of the map
+    :param path: directory to write the map files to
+    :return: (json path, sidecar path)
+    """
+    index = {wp: i for i, wp in enumerate(data.waypoints)}
+    edge_index = {e: i for i, e in enumerate(data.edges)}
+    object_names = {id(o): k for k, o in data.map_objects.items()}
+    queue_names = {id(q): k for k, q in data.queues.items()}
+    room_of_rect = {id(r.rect): k for k, r in data.rooms.items()}
+
+    positions = np.array([(wp.position.x, wp.position.y) for wp in data.waypoints])
+    if np.array_equal(positions, np.round(positions)):
+        positions = positions.astype(np.int32)
+    edges = np.array([(index[e.node1], index[e.node2], int(e.bi)) for e in data.edges], dtype=np.int32).reshape(-1, 3)
+
+    rooms = {}
+    for k, r in data.rooms.items():
+        rooms[k] = {
+            'xlim': [r.rect.left, r.rect.right],
+            'ylim': [r.rect.top, r.rect.bottom],
+            'entrance': list(r.entrance_loc),
+            'depth': r.depth,
+            'entrance_waypoint': index[r.entrance],
+            'waypoints': [index[wp] for wp in r.waypoints.values()],
+            'door': edge_index.get(r.edge),
+        }
+        if r.entry_rect.size != (configs.entry_size, configs.entry_size):
+            rooms[k]['entry'] = list(r.entry_rect.size)
+
+    objects = {}
+    for k, o in data.map_objects.items():
+        kind = [t for t, c in object_types.items() if type(o) == c][0]
+        if kind == 'Hng':
+            objects[k] = {'type': kind, 'position': [o.position.x, o.position.y]}
+        else:
+            objects[k] = {'type': kind, 'rect': list(o.rect)}
+        if kind == 'WF':
+            objects[k]['waypoint'] = index[o.waypoint]
+
+    entrances = {r.entrance: k for k, r in data.rooms.items()}
+    regions = []
+    for region in data.event_regions:
+        if isinstance(region, TankEventRegion):
+            regions += [{'type': 'tank', 'key': region.key, 'room': room_of_rect[id(region.rect)],
+                         'items': [object_names[id(_)] for _ in region.items],
+                         'queue': queue_names[id(region.queue_positions)]}]
+            continue
+        out = {'key': region.key}
+        if id(region.rect) in room_of_rect:
+            out['room'] = room_of_rect[id(region.rect)]
+        else:
+            out['rect'] = list(region.rect)
+        if type(region.object) == list:
+            out['obj'] = [object_names[id(_)] for _ in region.object]
+        elif region.object is not None:
+            out['obj'] = object_names[id(region.object)]
+        regions += [out]
+
+    definition = {
+        'rooms': rooms,
+        'hallway': [index[wp] for wp in data.hallway_nodes],
+        'map_objects': objects,
+        'locations': [entrances[wp] for wp in data.locations],
+        'unlock_locations': [entrances[wp] for wp in data.unlock_locations],
+        'idle_locations': [index[_.waypoint] for _ in data.idle_locations],
+        'queues': {k: [[p.x, p.y] for p in v] for k, v in data.queues.items()},
+        'event_regions': regions,
+    }
+
+    return write_map(name, definition, positions, edges, path)
+
+
+def write_map(name, data, positions, edges, path=configs.maps_path):
+    """
+    Write a map definition to Storage/maps/
+    :param name: name of the map
+    :param data: json data of the map
+    :param positions: array of waypoint positions shaped (n, 2)
+    :param edges: integer array of [node1, node2, bi] shaped (m, 3)
+    :param path: directory to write the map files to
+    :return: (json path, sidecar path)
+    """
+    os.makedirs(path, exist_ok=True)
+    json_path, sidecar_path = map_paths(name, path)
+    with open(json_path, 'w') as f:
+        write_json(data, f)
+    np.savez(sidecar_path, positions=positions, edges=edges)
+    return json_path, sidecar_path
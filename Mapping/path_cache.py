@@ -0,0 +1,98 @@
+"""
+LRU cache for paths through the waypoint graph
+Actors keep asking for the same few routes (locations, idle locations, event waypoints)
+ - Paths are stored once as tuples and shared, callers get a list copy they can pop from
+ - Keys include Edge.epoch, so routes through a door that has since been locked are never served
+"""
+
+from collections import OrderedDict
+
+import configs
+from Mapping.waypoint import Edge
+from Mapping.csr_graph import csr_graph
+from Mapping.routing import routing_table
+
+# debug variables
+debug = False
+
+
+def a_star_solver(start_node, end_node):
+    return csr_graph.path(start_node, end_node)
+
+
+class PathCache:
+    """
+    Bounded LRU cache sitting in front of a path solver
+    """
+
+    def __init__(self, solver=a_star_solver, max_size=configs.path_cache_size):
+        """
+        :param solver: function(start_node, end_node) returning a path w/ the tools.a_star contract
+        :param max_size: max number of routes to keep before evicting the least recently used
+        """
+        self.solver = solver
+        self.max_size = max_size
+
+        self.routes = OrderedDict()  # (start index, end index, epoch): tuple of waypoints
+        self.epoch = Edge.epoch  # graph epoch the stored routes were solved for
+
+        # stats
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, start_node, end_node):
+        """
+        Return the shared (immutable) path between two waypoints
+        :param start_node: starting waypoint
+        :param end_node: ending waypoint
+        :return: tuple in the tools.a_star order (do not modify, use PathCache.path for a poppable copy)
+        """
+        # drop everything solved before the last door change (can never be hit again)
+        if self.epoch != Edge.epoch:
+            self.routes.clear()
+            self.epoch = Edge.epoch
+
+        key = (start_node.index, end_node.index, self.epoch)
+        route = self.routes.get(key)
+        if route is not None:
+            self.hits += 1
+            self.routes.move_to_end(key)  # mark as most recently used
+            return route
+
+        # solve and store the route
+        self.misses += 1
+        route = tuple(self.solver(start_node, end_node))
+        self.routes[key] = route
+        if len(self.routes) > self.max_size:
+            self.routes.popitem(last=False)  # evict the least recently used route
+            self.evictions += 1
+        if debug:
+            print("Path cache miss %s -> %s" % (start_node.name, end_node.name))
+        return route
+
+    def path(self, start_node, end_node):
+        """
+        Drop-in replacement for tools.a_star, returns a list the caller can pop from
+        """
+        return list(self.get(start_node, end_node))
+
+    def clear(self):
+        self.routes.clear()
+
+    def stats(self):
+        """
+        :return: dict of cache counters
+        """
+        total = self.hits + self.misses
+        return {
+            'size': len(self.routes),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / total if total else 0,
+        }
+
+
+# shared cache used by actors and patrols (misses are answered by the routing table)
+path_cache = PathCache(solver=routing_table.path)
@@ -0,0 +1,230 @@
+"""
+Pathfinding on a background pool of workers (concurrent.futures)
+Long navmesh paths and replans after a door locks are solved off of the game loop
+ - Workers only see a frozen copy of the compiled (CSR) graph, never the Waypoint objects
+ - Every query returns a concurrent.futures.Future, callers poll Future.done() in their update and then
+   PathWorkers.collect it (None if a door changed since the request, the path has to be requested again)
+ - With 0 workers, queries are solved on the spot and the future is already done (deterministic for headless tests)
+Process pools get each snapshot (a few flat arrays) written to a temporary file once per door change, every process loads
+it on its first query against it, and on spawn platforms (Windows) rely on main.py only starting the game under __main__
+"""
+
+import atexit
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
+
+import numpy as np
+
+import configs
+from tools import vector
+from Mapping.waypoint import Waypoint, Edge
+from Mapping.csr_graph import csr_graph
+from Mapping.grid_path import GridPlanner
+
+# debug variables
+debug = False
+
+# per worker state (each thread/process gets its own planner, GridPlanner keeps search state on itself)
+_local = threading.local()
+
+
+def solve_graph(key, snapshot, start, end):
+    """
+    A* over a frozen copy of the compiled graph (runs inside of a worker)
+    :param key: id of the snapshot the query was made against (the worker keeps the last snapshot it used)
+    :param snapshot: CSRGraph returned by CSRGraph.snapshot, or the path of the file it was pickled to
+    :param start: index of the starting waypoint
+    :param end: index of the ending waypoint
+    :return: list of waypoint indices w/ the tools.a_star contract (reversed, start excluded)
+    """
+    graph = getattr(_local, 'graph', None)
+    if graph is None or graph[0] != key:
+        if type(snapshot) is str:  # only loaded once per snapshot by each process
+            with open(snapshot, 'rb') as f:
+                snapshot = pickle.load(f)
+        graph = _local.graph = (key, snapshot)
+    return graph[1].a_star(start, end)
+
+
+def init_worker(navmesh):
+    """
+    Build the worker's own navmesh planner (pool initializer, also used by the synchronous fallback)
+    """
+    _local.planner = GridPlanner(navmesh) if navmesh is not None else None
+
+
+def solve_navmesh(start, end):
+    """
+    Jump point search through the navmesh (runs inside of a worker)
+    :param start: (x, y) starting position
+    :param end: (x, y) ending position
+    :return: float array of shape (n, 2) from start to end (empty if there is no path)
+    """
+    planner = getattr(_local, 'planner', None)
+    if planner is None:
+        return np.zeros((0, 2))
+    return planner.find_path(start, end)
+
+
+class PathWorkers:
+    """
+    Hands path queries to a thread/process pool and returns futures
+    """
+
+    def __init__(self, navmesh=None, workers=configs.path_workers, kind=configs.path_worker_kind):
+        """
+        :param navmesh: 2D numpy array of the walkable map (copied for the workers)
+        :param workers: size of the pool (0 solves every query synchronously)
+        :param kind: 'thread' or 'process'
+        """
+        self.navmesh = None if navmesh is None else np.array(navmesh)  # workers never see later edits to the map
+        self.workers = workers
+        self.kind = kind
+        self.pool = None  # started on the first query
+        self.snapshot = None
+        self.snapshot_file = None  # file the current snapshot was pickled to (process pools)
+        self.folder = None  # temporary folder of the snapshot files
+        self.sync_ready = False  # synchronous planner built
+
+        # stats
+        self.snapshots = 0  # also used as the id of the current snapshot
+        self.submitted = 0
+        self.completed = 0  # results collected by the game loop
+        self.stale = 0  # paths thrown away because a door changed while they were solved
+
+        # threads/processes read an old snapshot until the next query after a door change
+        Edge.add_listener(self.edge_changed)
+
+    def edge_changed(self, edge):
+        self.snapshot = None
+
+    def graph(self):
+        """
+        Current snapshot of the waypoint graph (retaken after an edge changes or waypoints are added)
+        """
+        if self.snapshot is None or self.snapshot.size != len(Waypoint.waypoints):
+            self.snapshot = csr_graph.snapshot()
+            self.snapshots += 1
+            self.snapshot_file = None
+        return self.snapshot
+
+    def graph_file(self):
+        """
+        Path of the current snapshot pickled to a file (written once per snapshot, read by the worker processes)
+        Files are kept until shutdown so queries made against an older snapshot can still load it
+        """
+        graph = self.graph()
+        if self.snapshot_file is None:
+            if self.folder is None:
+                self.folder = tempfile.mkdtemp(prefix='path_workers_')
+                atexit.register(shutil.rmtree, self.folder, True)  # the game doesn't always call shutdown
+            self.snapshot_file = os.path.join(self.folder, 'graph_%i.pkl' % self.snapshots)
+            with open(self.snapshot_file, 'wb') as f:
+                pickle.dump(graph, f, protocol=pickle.HIGHEST_PROTOCOL)
+        return self.snapshot_file
+
+    def _start(self):
+        if self.kind == 'process':
+            self.pool = ProcessPoolExecutor(self.workers, initializer=init_worker, initargs=(self.navmesh,))
+        else:
+            self.pool = ThreadPoolExecutor(self.workers, thread_name_prefix='path_worker',
+                                           initializer=init_worker, initargs=(self.navmesh,))
+        if debug:
+            print("Started %i path worker %ss" % (self.workers, self.kind))
+
+    def _run(self, func, *args):
+        """
+        Run a function on the pool (or right now if there are no workers)
+        :return: Future w/ the raw result of the function
+        """
+        self.submitted += 1
+        if self.workers <= 0:
+            if not self.sync_ready:
+                init_worker(self.navmesh)
+                self.sync_ready = True
+            f = Future()
+            try:
+                f.set_result(func(*args))
+            except Exception as e:
+                f.set_exception(e)
+            return f
+        if self.pool is None:
+            self._start()
+        return self.pool.submit(func, *args)
+
+    def _convert(self, inner, convert, epoch=None):
+        """
+        Chain a future so callers get game objects back instead of the worker's raw result
+        :param epoch: Edge.epoch the query was made at (None if locking doors doesn't affect the result)
+        """
+        outer = Future()
+        outer.epoch = epoch
+
+        def done(f):  # runs on the worker's thread, don't touch shared state here
+            try:
+                outer.set_result(convert(f.result()))
+            except Exception as e:
+                outer.set_exception(e)
+
+        inner.add_done_callback(done)  # called right away if the future is already done
+        return outer
+
+    def path(self, start_node, end_node):
+        """
+        Solve a waypoint path in the background
+        :param start_node: starting waypoint
+        :param end_node: ending waypoint
+        :return: Future of a reversed list of waypoints (tools.a_star contract)
+        """
+        if self.kind == 'process' and self.workers > 0:
+            graph = self.graph_file()  # processes load it from disk instead of getting it pickled w/ every query
+        else:
+            graph = self.graph()  # threads share the snapshot
+        inner = self._run(solve_graph, self.snapshots, graph, start_node.index, end_node.index)
+        waypoints = Waypoint.waypoints
+        return self._convert(inner, lambda fp: [waypoints[i] for i in fp], Edge.epoch)
+
+    def collect(self, future):
+        """
+        Result of a finished future (call from the game loop once future.done())
+        :param future: Future returned by path or navmesh_path
+        :return: the result, None if a door was locked/unlocked since a path was requested (request it again)
+        """
+        self.completed += 1
+        if future.epoch is not None and future.epoch != Edge.epoch:
+            self.stale += 1
+            return None
+        return future.result()
+
+    def navmesh_path(self, start, end):
+        """
+        Solve a navmesh path in the background
+        :param start: starting vector
+        :param end: ending vector
+        :return: Future of a reversed list of vectors, start excluded (same as Mapping.map.navmesh_path)
+        """
+        inner = self._run(solve_navmesh, (start.x, start.y), (end.x, end.y))
+        return self._convert(inner, lambda points: [vector(p[0], p[1]) for p in points[:0:-1]])
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+        if self.folder is not None:
+            shutil.rmtree(self.folder, ignore_errors=True)  # queries still running are dropped w/ the pool
+            self.folder = None
+            self.snapshot_file = None
+
+    def stats(self):
+        return {
+            'workers': self.workers,
+            'kind': self.kind,
+            'snapshots': self.snapshots,
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'stale': self.stale,
+        }
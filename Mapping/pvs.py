@@ -0,0 +1,189 @@
+"""
+Potentially visible sets over a coarse grid of the navmesh
+Every pair of coarse cells is marked as one of:
+ - VISIBLE: the bounding box of both cells is walkable, so every point of one cell sees every point of the other
+ - HIDDEN: a fully blocked column (or row) of navmesh cells runs between the two cells across their bounding box,
+   so every segment between them has to cross it
+ - AMBIGUOUS: neither could be proven, the exact grid walk has to decide
+Both proofs only use the cells that Mapping.visibility.LineOfSight would walk, so answers never differ from it
+The table is built at map load and saved to Storage/ along w/ a hash of the navmesh it was built from
+"""
+
+import hashlib
+import os
+
+import numpy as np
+
+import configs
+
+# debug variables
+debug = False
+
+# states stored in the table
+AMBIGUOUS = 0
+VISIBLE = 1
+HIDDEN = 2
+
+
+def navmesh_hash(navmesh, cell):
+    """
+    Key of a table (changes if the navmesh, the coarse cell size or the navmesh ratio changes)
+    """
+    h = hashlib.sha1(np.ascontiguousarray(navmesh, dtype=bool).tobytes())
+    h.update(("%s %i %i" % (navmesh.shape, cell, configs.navmesh_ratio)).encode())
+    return h.hexdigest()
+
+
+def separators(blocked, cell):
+    """
+    Count the fully blocked columns of every coarse row span
+    :param blocked: bool array of blocked navmesh cells (padded to a multiple of cell)
+    :param cell: size of a coarse cell in navmesh cells
+    :return: int array shaped (ny, ny, width + 1), [ya, yb, c] = number of columns before c that are blocked from
+             coarse row ya to coarse row yb (inclusive)
+    """
+    width = blocked.shape[0]
+    ny = blocked.shape[1] // cell
+    full = blocked.reshape((width, ny, cell)).all(axis=2)  # column blocked across a whole coarse row
+    runs = np.zeros((width, ny + 1), dtype=np.int32)
+    np.cumsum(full, axis=1, out=runs[:, 1:])
+    out = np.zeros((ny, ny, width + 1), dtype=np.int16)
+    for ya in range(ny):
+        span = np.arange(ya, ny)
+        fully = (runs[:, span + 1] - runs[:, [ya]]) == (span - ya + 1)  # shape (width, spans)
+        out[ya, ya:, 1:] = np.cumsum(fully, axis=0).T
+    return out
+
+
+class VisibilitySets:
+    """
+    Tri-state visibility table between every pair of coarse cells
+    """
+
+    def __init__(self, navmesh, cell=configs.pvs_cell, ratio=configs.navmesh_ratio):
+        """
+        :param navmesh: 2D numpy array of the walkable map (non-zero is walkable)
+        :param cell: size of a coarse cell in navmesh cells
+        :param ratio: size of a navmesh cell in pixels
+        """
+        self.grid = np.array(navmesh, dtype=bool)
+        self.cell = cell
+        self.ratio = ratio
+        self.nx = -(-self.grid.shape[0] // cell)
+        self.ny = -(-self.grid.shape[1] // cell)
+        self.key = navmesh_hash(self.grid, cell)
+        self.table = None  # int8 array shaped (nx * ny, nx * ny)
+
+        # stats
+        self.visible = 0
+        self.hidden = 0
+        self.ambiguous = 0
+
+    def build(self, chunk=256):
+        """
+        Solve every pair of coarse cells
+        :param chunk: number of cells solved at once (limits memory)
+        :return: None
+        """
+        c = self.cell
+        w, h = self.nx * c, self.ny * c
+        blocked = np.ones((w, h), dtype=bool)  # cells past the edge of the navmesh are walls
+        blocked[:self.grid.shape[0], :self.grid.shape[1]] = ~self.grid
+
+        # summed area table of blocked cells (bounding box checks)
+        sat = np.zeros((w + 1, h + 1), dtype=np.int32)
+        sat[1:, 1:] = blocked.cumsum(axis=0).cumsum(axis=1)
+        cols = separators(blocked, c)
+        rows = separators(blocked.T.copy(), c)
+
+        n = self.nx * self.ny
+        cx, cy = np.divmod(np.arange(n), self.ny)
+        self.table = np.full((n, n), AMBIGUOUS, dtype=np.int8)
+        for lo in range(0, n, chunk):
+            ax, ay = cx[lo:lo + chunk, None], cy[lo:lo + chunk, None]
+            x0, x1 = np.minimum(ax, cx), np.maximum(ax, cx)
+            y0, y1 = np.minimum(ay, cy), np.maximum(ay, cy)
+
+            # walkable bounding box
+            bx0, bx1, by0, by1 = x0 * c, (x1 + 1) * c, y0 * c, (y1 + 1) * c
+            walls = sat[bx1, by1] - sat[bx0, by1] - sat[bx1, by0] + sat[bx0, by0]
+            visible = walls == 0
+
+            # blocked column between the cells (navmesh columns (x0 + 1) * c to x1 * c - 1) or the same for rows
+            apart = x1 > x0
+            col = apart & (cols[y0, y1, np.where(apart, x1 * c, 0)] > cols[y0, y1, np.where(apart, (x0 + 1) * c, 0)])
+            apart = y1 > y0
+            row = apart & (rows[x0, x1, np.where(apart, y1 * c, 0)] > rows[x0, x1, np.where(apart, (y0 + 1) * c, 0)])
+
+            block = self.table[lo:lo + chunk]
+            block[visible] = VISIBLE
+            block[col | row] = HIDDEN
+        if debug:
+            print("Built visibility sets: %.1f%% visible, %.1f%% hidden" %
+                  ((self.table == VISIBLE).mean() * 100, (self.table == HIDDEN).mean() * 100))
+
+    def load(self, path):
+        """
+        Load a saved table (ignored if it was built for a different navmesh)
+        :return: bool for if the table was loaded
+        """
+        if not os.path.exists(path):
+            return False
+        try:
+            with np.load(path) as data:
+                if str(data['key']) != self.key:
+                    return False
+                self.table = data['table']
+        except (OSError, KeyError, ValueError):
+            return False
+        return True
+
+    def save(self, path):
+        np.savez_compressed(path, key=self.key, table=self.table)
+
+    def state(self, pi, po):
+        """
+        Look up the state of the coarse cells of two positions
+        :param pi: first position (tools.vector)
+        :param po: second position (tools.vector)
+        :return: VISIBLE, HIDDEN or AMBIGUOUS (always AMBIGUOUS off of the navmesh)
+        """
+        ax, ay = int(pi.x // self.ratio), int(pi.y // self.ratio)
+        bx, by = int(po.x // self.ratio), int(po.y // self.ratio)
+        w, h = self.grid.shape
+        if not (0 <= ax < w and 0 <= ay < h and 0 <= bx < w and 0 <= by < h):
+            self.ambiguous += 1
+            return AMBIGUOUS
+        s = self.table[(ax // self.cell) * self.ny + ay // self.cell, (bx // self.cell) * self.ny + by // self.cell]
+        if s == VISIBLE:
+            self.visible += 1
+        elif s == HIDDEN:
+            self.hidden += 1
+        else:
+            self.ambiguous += 1
+        return s
+
+    def stats(self):
+        total = self.visible + self.hidden + self.ambiguous
+        return {
+            'visible': self.visible,
+            'hidden': self.hidden,
+            'ambiguous': self.ambiguous,
+            'resolved_rate': (self.visible + self.hidden) / total if total else 0,
+        }
+
+
+def load_pvs(navmesh, path=configs.pvs_path, cell=configs.pvs_cell):
+    """
+    Load the visibility sets of a navmesh from Storage/ (built and saved if missing or out of date)
+    :return: VisibilitySets
+    """
+    pvs = VisibilitySets(navmesh, cell)
+    if not pvs.load(path):
+        pvs.build()
+        try:
+            pvs.save(path)
+        except OSError:  # read only install, rebuild every time
+            if debug:
+                print("Unable to save visibility sets to " + path)
+    return pvs
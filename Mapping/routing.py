@@ -0,0 +1,192 @@
+"""
+All-pairs routing table for the waypoint graph
+The graph is fixed once the map is loaded, so shortest paths are solved once and stored as arrays
+ - Arrays are indexed by Waypoint.index
+ - Path queries walk the next hop table (O(path length) instead of a new search)
+ - Locking/unlocking an Edge patches the table instead of rebuilding it
+"""
+
+import numpy as np
+
+from Mapping.waypoint import Waypoint, Edge
+from Mapping.csr_graph import csr_graph
+
+# debug variables
+debug = False
+
+# value stored in the index tables when there is no path
+no_path = -1
+
+
+def index_dtype(n):
+    """
+    Smallest integer type that can hold the index of every one of n waypoints
+    """
+    return np.int16 if n <= np.iinfo(np.int16).max else np.int32
+
+
+class RoutingTable:
+    """
+    Holds the shortest distance, next hop and predecessor between every pair of waypoints
+     - dist[i, j]: length of the shortest path from waypoint i to waypoint j (inf if unreachable)
+     - next_hop[i, j]: first waypoint to move to when travelling from i to j
+     - pred[i, j]: waypoint visited right before j on the way from i (used to find paths using an edge)
+    """
+
+    def __init__(self):
+        self.size = 0  # number of waypoints the table was built for
+        self.dist = None
+        self.next_hop = None
+        self.pred = None
+
+        # stats
+        self.builds = 0  # number of full builds
+        self.row_updates = 0  # number of rows re-solved after an edge was locked
+
+        # keep the table up to date when doors are locked/unlocked
+        Edge.add_listener(self.edge_changed)
+
+    def ensure(self):
+        """
+        Build the table if it has not been built yet, or if waypoints were added since the last build
+        :return: None
+        """
+        if self.size != len(Waypoint.waypoints):
+            self.build()
+
+    def build(self):
+        """
+        Solve all pairs of shortest paths w/ a vectorized Floyd-Warshall over the current graph
+        :return: None
+        """
+        csr_graph.ensure()
+        n = csr_graph.size
+        idx = np.arange(n)
+
+        # direct edges (enabled arcs of the compiled graph)
+        on = csr_graph.enabled
+        src = np.repeat(idx, np.diff(csr_graph.offsets))[on]
+        dst = csr_graph.targets[on]
+        dist = np.full((n, n), np.inf, dtype=np.float32)
+        next_hop = np.full((n, n), no_path, dtype=index_dtype(n))  # int16 wraps past 32767 waypoints
+        pred = np.full((n, n), no_path, dtype=index_dtype(n))
+        np.minimum.at(dist, (src, dst), csr_graph.weights[on])  # shortest arc if a pair has more than one
+        next_hop[src, dst] = dst
+        pred[src, dst] = src
+        dist[idx, idx] = 0
+        next_hop[idx, idx] = idx
+        pred[idx, idx] = idx
+
+        # relax every pair through each intermediate waypoint k
+        for k in range(n):
+            cand = dist[:, k, None] + dist[None, k, :]
+            better = cand < dist
+            dist = np.where(better, cand, dist)
+            next_hop = np.where(better, next_hop[:, k, None], next_hop)
+            pred = np.where(better, pred[None, k, :], pred)
+
+        self.dist = dist
+        self.next_hop = next_hop
+        self.pred = pred
+        self.size = n
+        self.builds += 1
+        if debug:
+            print("Built routing table for %i waypoints" % n)
+
+    def path(self, start_node, end_node):
+        """
+        Drop-in replacement for tools.a_star using the table
+        :param start_node: starting waypoint
+        :param end_node: ending waypoint
+        :return: a reversed list containing the path, start node excluded (empty if no path is found)
+        """
+        self.ensure()
+        if start_node == end_node:
+            return [start_node]
+
+        # walk the next hops towards the end node
+        i, j = start_node.index, end_node.index
+        if self.next_hop[i, j] == no_path:
+            return []
+        fp = []
+        while i != j:
+            i = self.next_hop[i, j]
+            fp += [Waypoint.waypoints[i]]
+        fp.reverse()  # match the a_star contract (pop to traverse)
+        return fp
+
+    def distance(self, start_node, end_node):
+        """
+        Length of the shortest path between two waypoints
+        :return: float (inf if there is no path)
+        """
+        self.ensure()
+        return float(self.dist[start_node.index, end_node.index])
+
+    # ---------- Incremental updates ----------
+
+    def edge_changed(self, edge):
+        """
+        Called by Edge.notify, patches the table for a locked or unlocked edge
+        :param edge: the Edge that changed
+        :return: None
+        """
+        if edge is None:  # graph was reset, rebuild on the next query
+            self.size = 0
+            return
+        if self.size != len(Waypoint.waypoints):  # nothing to patch (table is built on the next query)
+            return
+        arcs = [(edge.node1, edge.node2)]
+        if edge.bi:
+            arcs += [(edge.node2, edge.node1)]
+
+        if edge.enabled:
+            for u, v in arcs:
+                for k in csr_graph.arc_ids(u.index, v.index):
+                    self._add_arc(u.index, v.index, csr_graph.weights[k])
+        else:
+            # only rows whose shortest path tree used the removed arc need to be solved again
+            rows = np.zeros(self.size, dtype=bool)
+            for u, v in arcs:
+                rows |= self.pred[:, v.index] == u.index
+            for s in np.flatnonzero(rows):
+                self._solve_row(s)
+
+    def _add_arc(self, u, v, w):
+        """
+        Relax every pair through a new arc u -> v (O(n^2), vectorized)
+        """
+        cand = self.dist[:, u, None] + np.float32(w) + self.dist[None, v, :]
+        better = cand < self.dist - 1e-4
+        if not better.any():
+            return
+
+        # first hop towards u (or v itself when starting at u)
+        hop = self.next_hop[:, u].copy()
+        hop[u] = v
+        # predecessor follows v's tree (v itself is reached from u)
+        pred = self.pred[v, :].copy()
+        pred[v] = u
+
+        self.dist = np.where(better, cand, self.dist)
+        self.next_hop = np.where(better, hop[:, None], self.next_hop)
+        self.pred = np.where(better, pred[None, :], self.pred)
+
+    def _solve_row(self, s):
+        """
+        Re-solve a single source w/ Dijkstra over the current graph
+        """
+        dist, pred, order = csr_graph.dijkstra(s)
+        hop = np.full(self.size, no_path, dtype=self.next_hop.dtype)
+        hop[s] = s
+        for i in order[1:]:
+            hop[i] = i if pred[i] == s else hop[pred[i]]  # parents settle before their children
+
+        self.dist[s] = dist
+        self.pred[s] = pred
+        self.next_hop[s] = hop
+        self.row_updates += 1
+
+
+# create the table (built lazily on the first query, once the map has created all of its waypoints)
+routing_table = RoutingTable()
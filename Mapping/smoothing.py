@@ -0,0 +1,92 @@
+"""
+Line of sight path smoothing (string pulling) for waypoint routes
+Routes through the hallways zig-zag between the lane waypoints, most of which can be skipped
+ - A waypoint is dropped when the waypoint after it can be seen from the last waypoint that was kept
+ - Door waypoints (both ends of a room's Edge) can be kept, so locking a door still cuts the route
+ - Smoothed routes are cached, the navmesh never changes so they never go stale
+"""
+
+from collections import OrderedDict
+
+import configs
+
+# debug variables
+debug = False
+
+
+class PathSmoother:
+    """
+    Removes waypoints that can be walked past in a straight line
+    """
+
+    def __init__(self, can_see, rooms=None, keep_doors=configs.smooth_keep_doors, max_size=configs.path_cache_size):
+        """
+        :param can_see: function(position, position) returning True if there is a straight walkable line between them
+        :param rooms: dict of rooms (the ends of each room's edge are the door waypoints)
+        :param keep_doors: never drop door waypoints
+        :param max_size: max number of routes to keep before evicting the least recently used
+        """
+        self.can_see = can_see
+        self.keep_doors = keep_doors
+        self.max_size = max_size
+        self.doors = set()  # indices of door waypoints
+        for r in (rooms or {}).values():
+            if r.edge:
+                self.doors.add(r.edge.node1.index)
+                self.doors.add(r.edge.node2.index)
+
+        self.routes = OrderedDict()  # tuple of waypoint indices (start first): smoothed tuple of waypoints
+
+        # stats
+        self.hits = 0
+        self.misses = 0
+        self.removed = 0  # waypoints dropped over every smoothed route
+
+    def smooth(self, start, path):
+        """
+        Smooth a path w/ the tools.a_star contract
+        :param start: waypoint the path starts from
+        :param path: reversed list of waypoints (start excluded)
+        :return: new reversed list w/ the skippable waypoints removed
+        """
+        if len(path) < 2:
+            return list(path)
+        key = (start.index,) + tuple(wp.index for wp in path)
+        route = self.routes.get(key)
+        if route is not None:
+            self.hits += 1
+            self.routes.move_to_end(key)
+            return list(route)
+
+        self.misses += 1
+        forward = list(reversed(path))
+        out = []
+        anchor = start
+        for i, wp in enumerate(forward[:-1]):
+            if self.keep_doors and wp.index in self.doors:
+                keep = True
+            else:
+                keep = not self.can_see(anchor.position, forward[i + 1].position)
+            if keep:
+                out += [wp]
+                anchor = wp
+        out += [forward[-1]]  # always end at the destination
+        out.reverse()
+        self.removed += len(path) - len(out)
+
+        self.routes[key] = tuple(out)
+        if len(self.routes) > self.max_size:
+            self.routes.popitem(last=False)
+        if debug:
+            print("Smoothed route from %i to %i waypoints" % (len(path), len(out)))
+        return out
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'size': len(self.routes),
+            'hits': self.hits,
+            'misses': self.misses,
+            'removed': self.removed,
+            'hit_rate': self.hits / total if total else 0,
+        }
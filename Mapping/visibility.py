@@ -0,0 +1,116 @@
+"""
+Line of sight over the navmesh
+Walks every navmesh cell a segment passes through exactly once (Amanatides & Woo grid traversal / DDA)
+ - A segment enters a cell if it passes through the cell's interior, touching a corner doesn't count
+ - The cells of both end points are always checked (standing in a wall can't see anything)
+ - Stops at the first blocked cell
+ - Can be given potentially visible sets (Mapping.pvs), only pairs of coarse cells they can't decide are walked
+"""
+
+import math
+
+import numpy as np
+
+import configs
+from Mapping.pvs import VISIBLE, HIDDEN
+
+# debug variables
+debug = False
+
+
+class LineOfSight:
+    """
+    Visibility checks between positions on a walkable grid indexed as grid[x, y]
+    """
+
+    def __init__(self, navmesh, ratio=configs.navmesh_ratio, pvs=None):
+        """
+        :param navmesh: 2D numpy array of the walkable map (non-zero is walkable)
+        :param ratio: size of a navmesh cell in pixels
+        :param pvs: optional Mapping.pvs.VisibilitySets built from the same navmesh
+        """
+        self.grid = np.array(navmesh, dtype=bool)
+        self.rows = self.grid.tolist()  # python lists for the traversal loop (numpy scalar indexing is slow)
+        self.width, self.height = self.grid.shape
+        self.ratio = ratio
+        self.pvs = pvs
+
+        # stats
+        self.queries = 0
+        self.cells = 0  # cells walked over every query
+        self.blocked = 0
+
+    def walkable(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height and self.rows[x][y]
+
+    def visible(self, pi, po):
+        """
+        Check if the straight line between two positions only crosses walkable cells
+        :param pi: first position (tools.vector)
+        :param po: second position (tools.vector)
+        :return: bool
+        """
+        self.queries += 1
+        if self.pvs is not None:
+            s = self.pvs.state(pi, po)
+            if s == VISIBLE:
+                return True
+            if s == HIDDEN:
+                self.blocked += 1
+                return False
+
+        x0, y0 = pi.x / self.ratio, pi.y / self.ratio
+        x1, y1 = po.x / self.ratio, po.y / self.ratio
+        x, y = math.floor(x0), math.floor(y0)
+        if not self.walkable(x, y) or not self.walkable(math.floor(x1), math.floor(y1)):
+            self.cells += 1
+            self.blocked += 1
+            return False
+
+        # distance to the next vertical/horizontal cell border (borders are compared by cross multiplying
+        # so a segment through a corner steps diagonally instead of rounding into one of the side cells)
+        dx, dy = x1 - x0, y1 - y0
+        adx, ady = abs(dx), abs(dy)
+        sx = 1 if dx > 0 else -1
+        sy = 1 if dy > 0 else -1
+        ex = x + 1 - x0 if dx > 0 else x0 - x
+        ey = y + 1 - y0 if dy > 0 else y0 - y
+
+        rows = self.rows
+        n = 1
+        while True:
+            cx = ex * ady if adx else math.inf  # border distances scaled to a common parameter
+            cy = ey * adx if ady else math.inf
+            if cx < cy:
+                if ex >= adx:  # border is at (or past) the end point
+                    break
+                x += sx
+                ex += 1
+            elif cy < cx:
+                if ey >= ady:
+                    break
+                y += sy
+                ey += 1
+            else:  # exactly through a corner (or not moving), go straight to the diagonal cell
+                if not adx or ex >= adx:
+                    break
+                x += sx
+                y += sy
+                ex += 1
+                ey += 1
+            n += 1
+            if not rows[x][y]:  # end point was checked, so every cell in between is on the grid
+                self.cells += n
+                self.blocked += 1
+                return False
+        self.cells += n
+        return True
+
+    def stats(self):
+        return {
+            'queries': self.queries,
+            'cells': self.cells,
+            'blocked': self.blocked,
+            'cells_per_query': self.cells / self.queries if self.queries else 0,
+            'pvs': self.pvs.stats() if self.pvs is not None else None,
+        }
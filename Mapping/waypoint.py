@@ -72,6 +72,8 @@ class Edge:
     track = maintain_edges  # var to keep track of edges
     index = 0
     edges = []
+    listeners = []  # functions called w/ the edge whenever an edge is enabled/disabled (None if the graph was reset)
+    epoch = 0  # bumped whenever an edge is enabled/disabled (anything cached from the graph is stale after)
 
     def __init__(self, node1, node2, bi=False):
         """
@@ -106,7 +108,8 @@ class Edge:
                 self.node1.paths.remove(self.node2)  # remove node 2 from node 1's paths
             if self.bi and self.node1 in self.node2.paths:  # if bi edge and in eachother's paths
                 self.node2.paths.remove(self.node1)  # remove node 1 from node 2's paths
-        self.enabled = False
+            self.enabled = False
+            self.notify()  # let anything built on the graph know it changed
 
     # enable use of an edge
     def enable_edge(self):
@@ -114,6 +117,40 @@ class Edge:
             self.node1.paths += [self.node2]   # add node 2 to node 1's list of paths
         if self.bi and self.node1 not in self.node2.paths:  # if node 1 not already in list of paths
             self.node2.paths += [self.node1]  # add node 1 to node 2's list of paths
+        if not self.enabled:  # only notify if the edge was actually locked
+            self.enabled = True
+            self.notify()
+
+    # pass this edge to everything that is listening for graph changes
+    def notify(self):
+        Edge.epoch += 1
+        for func in Edge.listeners:
+            func(self)
+
+    @staticmethod
+    def add_listener(func):
+        """
+        Register a function to call whenever an edge is enabled or disabled
+        :param func: function that takes the changed Edge as its only argument
+        :return: None
+        """
+        if func not in Edge.listeners:
+            Edge.listeners += [func]
+
+
+def reset_graph():
+    """
+    Forget every waypoint and edge (before loading another map)
+     - Listeners are called w/ None instead of an edge, anything built on the old graph has to be thrown away
+    :return: None
+    """
+    Waypoint.wp_index = 0
+    Waypoint.waypoints = []
+    Edge.index = 0
+    Edge.edges = []
+    Edge.epoch += 1
+    for func in Edge.listeners:
+        func(None)
 
 
 class IdleLocation:
@@ -23,7 +23,8 @@ class TankEmpty(BaseLeaf):
 
     def update(self):
 
-        if self.actor.tank/self.actor.tank_size > 1:
+        if 'overflow' in self.actor.needs:  # emitted by objects.needs
+            self.actor.needs.discard('overflow')
             self.empty = True
             self.actor.get_afm('MSY').value = 1  # add msy afm, set afm.value to 1
             if debug:
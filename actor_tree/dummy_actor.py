@@ -16,15 +16,28 @@ import UI.afm
 from tools import *
 import tools
 
-from Mapping.map import hallway_nodes, locations, unlock_locations, game_map
+from Mapping.map import hallway_nodes, locations, unlock_locations, game_map, path_workers, path_smoother
 from Mapping.waypoint import Waypoint
+from Mapping.path_cache import path_cache
+from Mapping.flow_field import flow_fields
+from Mapping.incremental import incremental_planner
 from actor_tree.tree_setup import create_root
 from objects.base_object import BaseObject
+from objects.path_broker import path_broker
+from objects.actor_store import actor_store
+from objects.needs import needs_system
 
 debug = False
 debug_pathfinding = False
 debug_removal = True
 
+# behavior variables
+use_flow_fields = False  # read next waypoints from shared flow fields instead of keeping a path per actor
+use_path_broker = True  # queue path requests w/ the path broker instead of solving them during the tree tick
+use_path_workers = False  # solve path requests on the background path workers (takes priority over the broker)
+use_incremental = False  # keep per destination searches that are repaired when doors are locked/unlocked
+use_smoothing = False  # skip waypoints that can be walked past in a straight line (Mapping.smoothing)
+
 
 class Actor(BaseObject):
 
@@ -96,7 +109,8 @@ class Actor(BaseObject):
         self.event = None  # keep track of event
         self.event_dict = {}  # use as a blackboard to keep track of necessary items for each event
 
-        # movement and positioning
+        # movement and positioning (position + speed live in the actor store, see the properties below)
+        self.row = actor_store.add(self)
         self.speed = configs.actor_speed
         self.waypoint_radius = configs.waypoint_radius  # distance to consider actor has arrived at waypoint
         self.radius = configs.actor_size
@@ -104,6 +118,7 @@ class Actor(BaseObject):
         self.waypoint = self.destination
         self.position = self.waypoint.position
         self.path = []
+        self.path_request = None  # (start waypoint, future) from the path workers
 
         # variables for actor navigation
         self.wait_time = 0  # initial value for how long to stay stationary voluntarily
@@ -118,16 +133,21 @@ class Actor(BaseObject):
         self.frame_damage = 0
         self.frame_powers = [0 for _ in range(self.num_trackers)]
 
-        # set up variables for event decisions
-        self.tank_size = configs.actor_tank_min + (random.random() * configs.actor_tank_range)
-        self.drain_rate = math.log(2) / (configs.actor_drain_min + (random.random() * configs.actor_drain_range))
-        self.fuel = random.random()
-        self.tank = random.random() * self.tank_size  # set tank to a random value inside of the tank size
-        # self.tank = .95 * self.tank_size  # All actors immediately have to pee
+        # set up variables for event decisions (fuel + tank live in the needs system, see the properties below)
+        tank_size = configs.actor_tank_min + (random.random() * configs.actor_tank_range)
+        drain_rate = math.log(2) / (configs.actor_drain_min + (random.random() * configs.actor_drain_range))
+        fuel = random.random()
+        tank = random.random() * tank_size  # set tank to a random value inside of the tank size
+        # tank = .95 * tank_size  # All actors immediately have to pee
+        self.needs = set()  # keys of needs emitted by the needs system and not handled yet
+        self.needs_row = needs_system.add(self, fuel, tank, tank_size, drain_rate)
 
         # variables for interacting with the map
         self.event_object = None  # used to store a ref to action items (if needed)
 
+        # variables for locking (set before the afms, both slow down the actor)
+        self.lock = None  # Name of Actor's lock (defaults to None), lock should be a string
+
         # afm variables
         self.afm = []  # list holding all Afms
         [self.add_afm(_) for _ in UI.afm.afms.values()]  # assign all afms to actor
@@ -148,9 +168,6 @@ class Actor(BaseObject):
         self.suspend_color = self.color  # color for if actor is suspended (and not stuck)
         self.sus_rect_color = self.suspend_color
 
-        # variables for locking
-        self.lock = None  # Name of Actor's lock (defaults to None), lock should be a string
-
         # create the tree
         self.bt = create_root()
         self.bt.setup(**{'actor': self})
@@ -165,6 +182,16 @@ class Actor(BaseObject):
         self.c_afm = [_ for _ in self.afm if (_.value > 0)]  # tack all afms with a value
         self.dt = dt  # keep dt ref for ease of use in tree
 
+        # collect a path solved by the path workers
+        if self.path_request and self.path_request[1].done():
+            start, future = self.path_request
+            self.path_request = None
+            path = path_workers.collect(future)
+            if path is None:  # solved before a door was locked/unlocked
+                self.request_path()
+            else:
+                self.receive_path(start, path)
+
         # important things
         self.bt.tick()  # tick the tree
 
@@ -212,7 +239,10 @@ class Actor(BaseObject):
 
     def assign_destination(self, destination):
         self.destination = destination
-        self.reset_path()  # grab a new path
+        if (use_path_broker or use_path_workers) and not (use_flow_fields or use_incremental):
+            self.request_path()  # path is delivered later (keep the current waypoint until then)
+        else:
+            self.reset_path()  # grab a new path
 
     def assign_event(self, event):
         self.event = event(self)  # create a new event w/ a ref to self
@@ -223,6 +253,32 @@ class Actor(BaseObject):
     def empty_tank(self):
         self.tank = 0
 
+    # ========== Needs (views over the actor's row in objects.needs) ==========
+
+    @property
+    def fuel(self):
+        return needs_system.fuel.item(self.needs_row)
+
+    @fuel.setter
+    def fuel(self, value):
+        needs_system.fuel[self.needs_row] = value
+
+    @property
+    def tank(self):
+        return needs_system.tank.item(self.needs_row)
+
+    @tank.setter
+    def tank(self, value):
+        needs_system.tank[self.needs_row] = value
+
+    @property
+    def tank_size(self):
+        return needs_system.tank_size.item(self.needs_row)
+
+    @property
+    def drain_rate(self):
+        return needs_system.drain_rate.item(self.needs_row)
+
     # ========== Basic Control ==========
 
     # pause the actor and then check for certain situations
@@ -235,19 +291,49 @@ class Actor(BaseObject):
         self.wait_time = time  # set time to wait
         self.stationary = True  # set stationary bool for a voluntary pause
 
+    # ========== Locomotion state (views over the actor's row in objects.actor_store) ==========
+
+    @property
+    def position(self):
+        """
+        Copy of the actor's position (assign a new vector to move the actor, changing the copy does nothing)
+        """
+        p = actor_store.positions
+        return vector(p.item(self.row, 0), p.item(self.row, 1))
+
+    @position.setter
+    def position(self, v):
+        actor_store.positions[self.row] = (v.x, v.y)
+
+    @property
+    def speed(self):
+        return actor_store.speeds.item(self.row)
+
+    @speed.setter
+    def speed(self, value):
+        actor_store.speeds[self.row] = value
+
+    @property
+    def speed_multiplier(self):
+        return actor_store.multipliers.item(self.row)
+
+    def update_speed(self):
+        """
+        Store the speed decrease of the current lock and afms (call whenever either changes)
+        :return: None
+        """
+        m = 1
+        if self.lock:
+            m = m * self.lock.speed_decrease
+        for i in self.afm:
+            m = m * i.speed_decrease
+        actor_store.multipliers[self.row] = m
+
     # moving to waypoint
         # simple waypoint function, no look ahead or turning involved
     def go_to_waypoint(self):
-        # manage lock's affect on travel
-        speed = self.speed
-        if self.lock:
-            speed = speed * self.lock.speed_decrease
-        # manage afms affect on travel
-        for i in self.afm:
-            speed = speed * i.speed_decrease
-        d = self.waypoint.position - self.position
-        dv = d.unit() * speed * (self.dt / 1000)
-        self.position += dv
+        p = self.waypoint.position
+        actor_store.move(self.row, p.x, p.y, self.dt)  # stepped along w/ every other actor by the store
 
     # movement when self.waypoint is a vector (instead of a waypoint object)
     def go_to_vector(self):
@@ -255,16 +341,7 @@ class Actor(BaseObject):
         Only difference between this and dummy_actor.go_to_waypoint is "self.waypoint.position" -> "self.waypoint"
         :return:
         """
-        # manage lock's affect on travel
-        speed = self.speed
-        if self.lock:
-            speed = speed * self.lock.speed_decrease
-        # manage afms affect on travel
-        for i in self.afm:
-            speed = speed * i.speed_decrease
-        d = self.waypoint - self.position
-        dv = d.unit() * speed * (self.dt / 1000)
-        self.position += dv
+        actor_store.move(self.row, self.waypoint.x, self.waypoint.y, self.dt)
 
     # dummy movement
     def go_to_waypoint_dummy(self):
@@ -272,44 +349,115 @@ class Actor(BaseObject):
         self.waypoint = self.destination
         self.position = self.destination.position
 
-    # reset the path
-    def reset_path(self):
+    def closest_waypoint(self):
+        """
+        Find the closest waypoint in the actor's current room (start of any new path)
+        :return: Waypoint object
+        """
         current_room = game_map.get_room(self.position)  # figure out if player is in a room
-        room_waypoints = list(current_room.waypoints.values())
 
         if not current_room:  # if player is not in a room
             raise Exception("Actor is not in a room")
         else:  # if not in a room
+            wp = game_map.get_room_waypoint(self.position, current_room)  # closest waypoint from the raster
+            if wp is not None:
+                return wp
+            room_waypoints = list(current_room.waypoints.values())
             try:
                 tmp_list = [vector.distance(self.position, _.position) for _ in room_waypoints]  # distance to waypoints
                 tmp_indx = np.argmin(np.array(tmp_list))  # index of the closest waypoint
-                add_closest = not self.waypoint == room_waypoints[
-                    tmp_indx]  # flag to add current closet waypoint to path
-                self.waypoint = room_waypoints[tmp_indx]  # set current waypoint to the closest waypoint in the room
+                return room_waypoints[tmp_indx]  # closest waypoint in the room
             except Exception as e:
                 print(e)
                 print(current_room.name)
                 print(room_waypoints)
                 raise Exception("Things are breaking w/ pathfinding")
 
+    # reset the path
+    def reset_path(self):
+        path_broker.cancel(self)  # a queued request would overwrite this path once delivered
+        self.path_request = None
+        start = self.closest_waypoint()
+
         # find a new path
         if debug_pathfinding:
             print("finding a new path")
-            print('start: ' + str(self.waypoint.name))
+            print('start: ' + str(start.name))
             print('end  : ' + str(self.destination.name))
-        self.path = a_star(hallway_nodes, self.waypoint, self.destination)
+        if use_flow_fields:
+            # only the first step is needed, the rest is read from the shared flow field while moving
+            step = flow_fields.next_waypoint(start, self.destination)
+            path = [step] if step else []
+        elif use_incremental:
+            path = incremental_planner.path(start, self.destination)
+            incremental_planner.watch(self)  # swap paths if a door on this one gets locked
+        else:
+            path = path_cache.path(start, self.destination)
+        self.receive_path(start, path)
+
+    def request_path(self):
+        """
+        Queue a path request w/ the path broker or the path workers (delivered to Actor.receive_path)
+        :return: None
+        """
+        start = self.closest_waypoint()
+        if use_path_workers:
+            path_broker.cancel(self)
+            self.path_request = (start, path_workers.path(start, self.destination))  # polled in update
+        else:
+            self.path_request = None
+            path_broker.submit(self, start, self.destination)
+
+    def receive_path(self, start, path):
+        """
+        Start following a new path
+        :param start: waypoint the path was solved from
+        :param path: reversed list of waypoints (tools.a_star contract)
+        :return: None
+        """
+        if use_smoothing and not use_flow_fields:  # flow field paths are a single step
+            path = path_smoother.smooth(start, path)
+        self.path = path
         if debug_pathfinding: print([p.name for p in self.path])
-        if vector.distance(self.waypoint.position,
+        if vector.distance(start.position,
                            self.position) > self.waypoint_radius:  # waypoint out of range
             if debug_pathfinding:
                 print("Adding the closest waypoint")
-                print(self.path)
                 print([_.name for _ in self.path])
-                print(self.waypoint.name)
-            self.path += [self.waypoint]  # add closest waypoint to the path
+                print(start.name)
+            self.path += [start]  # add closest waypoint to the path
         self.waypoint = self.path.pop()
         self.reset = False
 
+    def path_changed(self):
+        """
+        Called by the incremental planner when an edge on the current path was locked
+        Keeps walking to the current waypoint and replaces the rest of the path from there
+        :return: None
+        """
+        if self.waypoint == self.destination:
+            return
+        path = incremental_planner.path(self.waypoint, self.destination)
+        if path and use_smoothing:
+            path = path_smoother.smooth(self.waypoint, path)
+        if path:
+            self.path = path
+        elif debug_pathfinding:
+            print("%s has no path around the locked edge" % self.name)
+
+    def next_waypoint(self):
+        """
+        Called once the current waypoint has been reached
+        :return: the next Waypoint to walk to
+        """
+        if self.path_request or path_broker.is_pending(self):  # wait at the current waypoint until the new path arrives
+            return self.waypoint
+        if use_flow_fields and type(self.waypoint) is Waypoint and type(self.destination) is Waypoint:
+            step = flow_fields.next_waypoint(self.waypoint, self.destination)
+            if step:
+                return step
+        return self.path.pop()
+
     # prevent actor from moving (still updates in other ways)
     def freeze(self):
         """
@@ -365,6 +513,7 @@ class Actor(BaseObject):
             self.stuck = False
         # add the lock
         self.lock = lock  # add lock to player
+        self.update_speed()
         # if not self.stuck:
         #     self.destination = random.choice(unlock_locations)  # set waypoint to a place to remove the lock
 
@@ -375,6 +524,7 @@ class Actor(BaseObject):
             if self.lock.afm:
                 self.add_afm(self.lock.afm)
         self.lock = None  # remove the lock
+        self.update_speed()
 
     # TODO: REMOVE AND USE SPECIFIC METHODS
     def damage(self, value, dt=0, afm=None):
@@ -563,6 +713,7 @@ class Actor(BaseObject):
                 afm = UI.afm.get_afm(a.name)
                 afm.apply(self)  # add the actor as the owner of the afm
                 self.afm += [afm]  # add this afm to the list
+                self.update_speed()
                 return afm
 
     def has_afm(self, name):
@@ -588,6 +739,7 @@ class Actor(BaseObject):
                     afm = self.afm[idx]
                     if not afm.permanent:
                         del self.afm[idx]  # remove afm from the list
+                        self.update_speed()
                         break  # get out of the loop
                     else:
                         idx -= 1
@@ -80,7 +80,7 @@ class Locomotion(BaseLeaf):
 
             # manage reaching next waypoint
             elif vector.distance(self.actor.position, self.actor.waypoint.position) < self.actor.waypoint_radius:
-                self.actor.waypoint = self.actor.path.pop()  # pop next waypoint from the path
+                self.actor.waypoint = self.actor.next_waypoint()  # next waypoint on the way to the destination
                 if debug_locomotion:
                     # ensure the debug message cool down is reset once we start moving
                     self.debug_timer = 0
@@ -113,6 +113,7 @@ class AssignNeed(BaseLeaf):
     Used to check if actor needs to complete an event
     Will interrupt current assigned event if deemed important enough
     Called every single tick of the tree if actor has control
+     - Only needs emitted by objects.needs (actor.needs) are checked, they are dropped once they lose importance
     """
 
     def __init__(self, name):
@@ -131,10 +132,13 @@ class AssignNeed(BaseLeaf):
         (eve, val) = (None, 0)  # no event, 0 importance
 
         # check each event (order is unimportant)
-        if self.actor.event and self.actor.event.interruptable:
-            for key, value in self.events.items():
+        if self.actor.needs and self.actor.event and self.actor.event.interruptable:
+            for key in [_ for _ in self.events if _ in self.actor.needs]:
+                value = self.events[key]
                 current_val = value.check_importance(self.actor)
-                if val < current_val:
+                if not current_val:
+                    self.actor.needs.discard(key)  # need was taken care of
+                elif val < current_val:
                     eve = value
                     val = current_val
 
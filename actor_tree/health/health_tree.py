@@ -4,12 +4,12 @@ Top node for figuring out the health tree
 
 import py_trees
 
-import math
 import numpy as np
 
 import tools
 
 from actor_tree.base_leaf import BaseLeaf
+from objects.needs import needs_system
 from py_trees.common import Status
 
 debug_log = False
@@ -108,26 +108,13 @@ class LocksSuspensions(BaseLeaf):
 
 class WaterUpdate(BaseLeaf):
     """
-    Update water periodically (managed by self.delay)
+    Fuel drains into the tank in objects.needs (every actor at once)
+    Only steps the actor's own row if the needs system isn't being updated by a game loop
     """
-    def __init__(self, name):
-        super(WaterUpdate, self).__init__(name)
-        self.delay = 1  # time (seconds) between update ticks
-        self.timer = self.delay
 
     def update(self):
-        if self.timer > 0:  # update timer
-            self.timer -= self.actor.dt * (1/1000)
-        else:  # update water values
-            # reset the timer
-            self.timer = self.delay
-
-            # calculate fuel drain
-            df = self.actor.fuel * (1-math.exp(-(self.delay * (1/60)) * self.actor.drain_rate))  # change in fuel
-
-            # update values
-            self.actor.fuel -= df
-            self.actor.tank += df
+        if not needs_system.running:
+            needs_system.step(np.array([self.actor.needs_row]), self.actor.dt)
 
         # # manage tank overflow
         # if self.actor.tank/self.actor.tank_size > 1:
@@ -137,6 +124,3 @@ class WaterUpdate(BaseLeaf):
         #         print("%s emptied tank" % self.actor.name)
 
         return Status.SUCCESS  # don't block the health tree
-
-
-
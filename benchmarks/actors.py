@@ -0,0 +1,190 @@
+"""
+Benchmark for objects.actor_store and objects.needs
+Compares stepping every actor's locomotion one at a time (tools.vector math per actor, as Actor.go_to_waypoint was
+written before the store) against one vectorized ActorStore step, does the same for the fuel drain (per actor timers
+and math.exp, as the WaterUpdate leaf was written before the needs system) and optionally times whole frames of actors
+ - Run from the root of the repo: python -m benchmarks.actors [--counts 100 1000 10000] [--full 1000]
+"""
+
+import argparse
+import builtins
+import json
+import math
+import os
+import random
+import time
+import timeit
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')  # no window needed
+
+import numpy as np
+import pygame
+
+pygame.init()
+pygame.display.set_mode((1, 1))
+
+import configs
+from tools import vector
+from objects.actor_store import ActorStore
+from objects.needs import NeedsSystem
+
+lock_decrease = .8  # speed decrease applied to every other actor (stand in for a lock)
+afm_decreases = [.95, .9, .98, 1]  # speed decreases of the afms every actor has
+
+
+class Mover:
+    """
+    Stand-in for an actor before the store (position, waypoint position, speed, lock and afms)
+    """
+
+    def __init__(self, k, rng):
+        self.position = vector(*rng.random(2).tolist()) * 400
+        self.target = vector(*rng.random(2).tolist()) * 400
+        self.speed = configs.actor_speed
+        self.lock = lock_decrease if k % 2 else None
+        self.afm = afm_decreases
+
+
+def legacy_frame(movers, dt):
+    # locomotion as Actor.go_to_waypoint was written before the store
+    for m in movers:
+        speed = m.speed
+        if m.lock:
+            speed = speed * m.lock
+        for s in m.afm:
+            speed = speed * s
+        dv = m.target - m.position
+        dv.normalize().imul(speed).imul(dt / 1000)
+        m.position += dv
+
+
+def store_frame(store, dt):
+    # every actor marks its row during its tree tick, then the store steps them at once
+    store.moving[:store.size] = True
+    store.update(dt)
+
+
+def make_store(movers):
+    store = ActorStore(capacity=len(movers))
+    for m in movers:
+        row = store.add(m, (m.position.x, m.position.y), m.speed)
+        store.targets[row] = (m.target.x, m.target.y)
+        store.multipliers[row] = np.prod([m.lock or 1] + m.afm)
+    return store
+
+
+class Drainer:
+    """
+    Stand-in for an actor's fuel before the needs system (tank, fuel, drain rate and the WaterUpdate timer)
+    """
+
+    def __init__(self, rng):
+        self.tank_size = configs.actor_tank_min + rng.random() * configs.actor_tank_range
+        self.drain_rate = math.log(2) / (configs.actor_drain_min + rng.random() * configs.actor_drain_range)
+        self.fuel = rng.random()
+        self.tank = rng.random() * self.tank_size
+        self.timer = rng.random()  # spread the drains over the frames
+        self.needs = set()
+
+
+def legacy_drain(drainers, dt, delay=1):
+    # fuel drain + the polled thresholds, as the WaterUpdate leaf and check_importance were written
+    for d in drainers:
+        if d.timer > 0:
+            d.timer -= dt * (1 / 1000)
+        else:
+            d.timer = delay
+            df = d.fuel * (1 - math.exp(-(delay * (1 / 60)) * d.drain_rate))
+            d.fuel -= df
+            d.tank += df
+        d.fuel < .5
+        d.tank / d.tank_size > configs.tank_threshold
+        d.tank / d.tank_size > 1
+
+
+def drain_times(count, frames, seed):
+    rng = np.random.default_rng(seed)
+    drainers = [Drainer(rng) for _ in range(count)]
+    system = NeedsSystem(capacity=count)
+    for d in drainers:
+        row = system.add(d, d.fuel, d.tank, d.tank_size, d.drain_rate)
+        system.timers[row] = d.timer
+    dt = 16
+    legacy = min(timeit.repeat(lambda: legacy_drain(drainers, dt), number=frames, repeat=3)) / frames
+    vectorized = min(timeit.repeat(lambda: system.update(dt), number=frames, repeat=3)) / frames
+    return {'actors': count, 'legacy_us': legacy * 1e6, 'store_us': vectorized * 1e6,
+            'speedup': legacy / vectorized if vectorized else 0}
+
+
+def step_times(count, frames, seed):
+    rng = np.random.default_rng(seed)
+    movers = [Mover(k, rng) for k in range(count)]
+    store = make_store(movers)
+    dt = 16
+    legacy = min(timeit.repeat(lambda: legacy_frame(movers, dt), number=frames, repeat=3)) / frames
+    vectorized = min(timeit.repeat(lambda: store_frame(store, dt), number=frames, repeat=3)) / frames
+    return {'actors': count, 'legacy_us': legacy * 1e6, 'store_us': vectorized * 1e6,
+            'speedup': legacy / vectorized if vectorized else 0}
+
+
+def full_frames(count, frames, seed):
+    """
+    Time whole frames (tree ticks + store and needs steps) of real actors
+    """
+    from actor_tree.dummy_actor import Actor
+    from objects.actor_store import actor_store
+    from objects.needs import needs_system
+    from objects.path_broker import path_broker
+
+    random.seed(seed)
+    configs.debug_print_off = True
+    quiet, builtins.print = builtins.print, lambda *a, **k: None  # the trees print event assignments
+    try:
+        t = time.perf_counter()
+        actors = [Actor() for _ in range(count)]
+        create = time.perf_counter() - t
+        objects = actors + [actor_store, needs_system, path_broker]
+        t = time.perf_counter()
+        for _ in range(frames):
+            for o in objects:
+                o.update(16)
+        frame = (time.perf_counter() - t) / frames
+    finally:
+        builtins.print = quiet
+    return {'actors': count, 'create_s': create, 'frame_ms': frame * 1000, 'store': actor_store.stats(),
+            'needs': needs_system.stats()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--counts', type=int, nargs='+', default=[10, 100, 1000, 10000],
+                        help='numbers of actors stepped')
+    parser.add_argument('--frames', type=int, default=50, help='frames timed per count')
+    parser.add_argument('--full', type=int, default=0, help='also time whole frames of this many real actors')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', help='optional path of a json report')
+    args = parser.parse_args()
+
+    report = {
+        'step': [step_times(n, args.frames, args.seed) for n in args.counts],
+        'drain': [drain_times(n, args.frames, args.seed) for n in args.counts],
+    }
+    for key, title in (('step', 'locomotion step'), ('drain', 'fuel drain + thresholds')):
+        print("--- %s (one frame)" % title)
+        print("%8s %12s %12s %8s" % ('actors', 'legacy us', 'store us', 'speedup'))
+        for r in report[key]:
+            print("%8i %12.1f %12.1f %7.1fx" % (r['actors'], r['legacy_us'], r['store_us'], r['speedup']))
+
+    if args.full:
+        report['full'] = full_frames(args.full, args.frames, args.seed)
+        r = report['full']
+        print("--- %i actors: created in %.2fs, %.1fms per frame" % (r['actors'], r['create_s'], r['frame_ms']))
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=1)
+        print("Wrote " + args.out)
+
+
+if __name__ == '__main__':
+    main()
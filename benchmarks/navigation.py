@@ -0,0 +1,271 @@
+"""
+Scaling benchmark for the navigation stack
+Measures waypoint path latency, room lookups, line of sight checks, event checks and memory on procedural buildings
+(Mapping.map_generator) at multiples of the default map's size, and writes the results to a json report
+ - Run from the root of the repo: python -m benchmarks.navigation --scales 1 10 100
+ - Compare two reports: python -m benchmarks.navigation --compare benchmarks/old.json benchmarks/report.json
+Queries are drawn from a seeded generator, so reports made w/ the same settings can be diffed between versions
+ - Build times are measured while tracing memory (tracemalloc), query rates are not
+ - Line of sight doesn't use potentially visible sets on generated maps (the table grows w/ the square of the area)
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import resource
+import subprocess
+import time
+import tracemalloc
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')  # no window needed
+
+import numpy as np
+import pygame
+
+pygame.init()
+pygame.display.set_mode((1, 1))
+
+import configs
+import tools
+from tools import vector
+import Mapping.map as game_map_module
+from Mapping.map import Map, bake_navmesh
+from Mapping.map_generator import generate_map, building_size
+from Mapping.visibility import LineOfSight
+
+# default number of queries of each kind
+queries = {
+    'path': 200,
+    'room_lookup': 20000,
+    'visibility': 5000,
+    'event_check': 20000,
+    'nearest_waypoint': 20000,
+}
+sight_range = 200  # max distance between the two points of a visibility check (pixels)
+event_keys = ['HNG', 'FNG', 'MSY']
+
+
+def version_info():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pygame': pygame.version.ver,
+    }
+
+
+def rate(count, seconds):
+    return count / seconds if seconds else 0
+
+
+def measure(name, rooms, waypoints, edges, gm, size, rng, counts):
+    """
+    Run every query against a map
+    :param name: label of the map in the report
+    :param rooms: dict of rooms
+    :param waypoints: list of waypoints of the map
+    :param edges: list of edges of the map
+    :param gm: Map built for the rooms
+    :param size: (width, height) of the map in pixels
+    :param rng: numpy random generator
+    :param counts: number of queries of each kind
+    :return: dict of results
+    """
+    out = {
+        'map': name,
+        'size': list(size),
+        'rooms': len(rooms),
+        'waypoints': len(waypoints),
+        'edges': len(edges),
+    }
+
+    # waypoint paths
+    times, lengths, found = [], [], 0
+    pairs = rng.integers(0, len(waypoints), (counts['path'], 2))
+    for a, b in pairs.tolist():
+        t = time.perf_counter()
+        path = tools.a_star(None, waypoints[a], waypoints[b])
+        times += [time.perf_counter() - t]
+        if path:
+            found += 1
+            lengths += [len(path)]
+    times = np.array(times) * 1e6
+    out['path'] = {
+        'queries': len(times),
+        'mean_us': float(times.mean()),
+        'p50_us': float(np.percentile(times, 50)),
+        'p95_us': float(np.percentile(times, 95)),
+        'max_us': float(times.max()),
+        'found_rate': found / len(times),
+        'mean_length': float(np.mean(lengths)) if lengths else 0,
+    }
+
+    # room lookups (one at a time and batched)
+    points = rng.random((counts['room_lookup'], 2)) * size
+    vectors = [vector(x, y) for x, y in points.tolist()]
+    t = time.perf_counter()
+    for v in vectors:
+        gm.get_room(v)
+    single = time.perf_counter() - t
+    t = time.perf_counter()
+    gm.get_room_ids(points)
+    batch = time.perf_counter() - t
+    out['room_lookup'] = {'queries': len(vectors), 'per_s': rate(len(vectors), single),
+                          'batch_per_s': rate(len(vectors), batch)}
+
+    # closest waypoint of the room
+    n = min(len(vectors), counts['nearest_waypoint'])
+    t = time.perf_counter()
+    for v in vectors[:n]:
+        gm.get_room_waypoint(v)
+    out['nearest_waypoint'] = {'queries': n, 'per_s': rate(n, time.perf_counter() - t)}
+
+    # line of sight between nearby points
+    n = counts['visibility']
+    origins = rng.random((n, 2)) * size
+    angles = rng.random(n) * 2 * math.pi
+    dist = rng.random(n) * sight_range
+    targets = np.clip(origins + np.stack([np.cos(angles), np.sin(angles)], axis=1) * dist[:, None], 0,
+                      np.array(size) - 1)
+    pairs = [(vector(a[0], a[1]), vector(b[0], b[1])) for a, b in zip(origins.tolist(), targets.tolist())]
+    t = time.perf_counter()
+    visible = sum(gm.can_see(a, b) for a, b in pairs)
+    out['visibility'] = {'queries': n, 'per_s': rate(n, time.perf_counter() - t), 'visible_rate': visible / n,
+                         'cells_per_query': gm.sight.stats()['cells_per_query']}
+
+    # event checks
+    n = min(len(vectors), counts['event_check'])
+    keys = [event_keys[k % len(event_keys)] for k in range(n)]
+    t = time.perf_counter()
+    hits = sum(gm.check_event(v, key) for v, key in zip(vectors, keys))
+    out['event_check'] = {'queries': n, 'per_s': rate(n, time.perf_counter() - t), 'hit_rate': hits / n}
+    return out
+
+
+def map_arrays_mb(gm):
+    arrays = [gm.navmesh, gm.room_ids, gm.door_ids, gm.nearest_ids, gm.nearest_exact, gm.event_index.masks,
+              gm.sight.grid]
+    return sum(a.nbytes for a in arrays if a is not None) / 2 ** 20
+
+
+def run_default(rng, counts):
+    """
+    Benchmark the map loaded by Mapping.map (has to run before any generated map replaces its waypoints)
+    """
+    gm = game_map_module.game_map
+    out = measure('default', gm.rooms, game_map_module.map_data.waypoints, game_map_module.map_data.edges, gm,
+                  (configs.width, configs.height), rng, counts)
+    out['scale'] = None
+    out['memory_mb'] = {'arrays': map_arrays_mb(gm)}
+    return out
+
+
+def run_scale(scale, rng, counts, closet_rate=0.3, cut_rate=0.2, seed=0):
+    """
+    Build and benchmark a procedural building w/ about scale times the rooms of the default map
+    """
+    target = len(game_map_module.rooms) * scale
+    cols = rows = max(1, round(math.sqrt(target / (1 + closet_rate))))
+    size = building_size(cols, rows)
+
+    tracemalloc.start()
+    build = {}
+    t = time.perf_counter()
+    data = generate_map(cols, rows, closet_rate, cut_rate, seed)
+    build['generate_s'] = time.perf_counter() - t
+    t = time.perf_counter()
+    navmesh = bake_navmesh(data.rooms, size)
+    build['navmesh_s'] = time.perf_counter() - t
+    t = time.perf_counter()
+    gm = Map(map_rooms=data.rooms, map_navmesh=navmesh, sight=LineOfSight(navmesh))
+    gm.event_index.ensure()
+    build['map_s'] = time.perf_counter() - t
+    traced = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    out = measure('generated', data.rooms, data.waypoints, data.edges, gm, size, rng, counts)
+    out.update({'scale': scale, 'cols': cols, 'rows': rows, 'build': build})
+    out['memory_mb'] = {
+        'arrays': map_arrays_mb(gm),
+        'traced_peak': traced / 2 ** 20,
+        'rss_peak': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,  # high water mark of the process
+    }
+    return out
+
+
+def flatten(d, prefix=''):
+    out = {}
+    for k, v in d.items():
+        if type(v) == dict:
+            out.update(flatten(v, prefix + k + '.'))
+        elif type(v) in (int, float) and type(v) != bool:
+            out[prefix + k] = v
+    return out
+
+
+def compare(old_path, new_path):
+    """
+    Print the ratio of every metric between two reports (matched by map and scale)
+    """
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    old_rows = {(r['map'], r['scale']): r for r in old['results']}
+    for r in new['results']:
+        o = old_rows.get((r['map'], r['scale']))
+        if o is None:
+            continue
+        print("--- %s (scale %s)" % (r['map'], r['scale']))
+        a, b = flatten(o), flatten(r)
+        for k in sorted(set(a) & set(b)):
+            if a[k] != b[k]:
+                ratio = b[k] / a[k] if a[k] else math.inf
+                print("%-32s %14.3f -> %14.3f  x%.2f" % (k, a[k], b[k], ratio))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scales', type=float, nargs='+', default=[1, 10, 100],
+                        help='sizes of the generated maps (multiples of the default map\'s room count)')
+    parser.add_argument('--out', default='benchmarks/report.json', help='path of the json report')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--queries', type=float, default=1,
+                        help='multiplier on the number of queries of each kind')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='compare two reports and exit')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    counts = {k: max(1, int(v * args.queries)) for k, v in queries.items()}
+    rng = np.random.default_rng(args.seed)
+    results = [run_default(rng, counts)]
+    for scale in args.scales:
+        results += [run_scale(scale, rng, counts, seed=args.seed)]
+    for r in results:
+        print("scale %-5s rooms %-5i waypoints %-5i path p50 %8.1fus  rooms %9.0f/s  sight %8.0f/s  events %9.0f/s  "
+              "%.0fMB" % (r['scale'] or '-', r['rooms'], r['waypoints'], r['path']['p50_us'],
+                          r['room_lookup']['per_s'], r['visibility']['per_s'], r['event_check']['per_s'],
+                          r['memory_mb']['arrays']))
+
+    report = {
+        'version': version_info(),
+        'settings': {'seed': args.seed, 'queries': counts, 'sight_range': sight_range,
+                     'navmesh_ratio': configs.navmesh_ratio},
+        'results': results,
+    }
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=1)
+    print("Wrote " + args.out)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+"""
+Microbenchmark for tools.vector
+Compares the current vector against the previous dict-backed one (LegacyVector below):
+ - time per operation
+ - size of a vector
+ - vectors allocated (and time taken) by one frame of movement: every actor steps towards its waypoint, checks if it
+   has arrived and the player reads the mouse
+Run from the root of the repo: python -m benchmarks.vector [--actors 20] [--out benchmarks/vector.json]
+"""
+
+import argparse
+import json
+import math
+import sys
+import timeit
+
+from tools import vector
+
+
+class LegacyVector:
+    """
+    tools.vector before __slots__ and the in place methods (kept here for comparison)
+    """
+
+    def __init__(self, x, y=None):
+        if y is None:
+            if type(x) == LegacyVector:
+                self.x = x.x
+                self.y = x.y
+            else:
+                self.x = x[0]
+                self.y = x[1]
+        else:
+            self.x = x
+            self.y = y
+
+    def __sub__(self, v):
+        return LegacyVector(self.x - v.x, self.y - v.y)
+
+    def __add__(self, v):
+        return LegacyVector(self.x + v.x, self.y + v.y)
+
+    def __mul__(self, v):
+        return LegacyVector(self.x * v, self.y * v)
+
+    def __truediv__(self, v):
+        return self * (1 / v)
+
+    def unit(self):
+        return self / LegacyVector.magnitude(self)
+
+    @staticmethod
+    def magnitude(v):
+        return math.sqrt((v.x ** 2) + v.y ** 2)
+
+    @staticmethod
+    def distance(a, b):
+        d = a - b
+        return (math.sqrt((d.x ** 2) + (d.y ** 2)))
+
+
+class Mover:
+    """
+    Stand-in for an actor (position, waypoint position and speed)
+    """
+
+    def __init__(self, cls, k):
+        self.position = cls(10 + k, 20 + 2 * k)
+        self.target = cls(300 - k, 200 + k)
+        self.speed = 40 + k % 7
+
+
+def legacy_frame(movers, mouse, dt):
+    # movement as it was written before the in place methods
+    for m in movers:
+        if LegacyVector.distance(m.position, m.target) < 5:
+            continue
+        d = m.target - m.position
+        dv = d.unit() * m.speed * (dt / 1000)
+        m.position += dv
+    return LegacyVector(mouse)
+
+
+def frame(movers, mouse, dt):
+    # movement as written now (see actor_tree.dummy_actor.Actor.go_to_waypoint)
+    for m in movers:
+        if vector.distance(m.position, m.target) < 5:
+            continue
+        dv = m.target - m.position
+        dv.normalize().imul(m.speed).imul(dt / 1000)
+        m.position += dv
+    return vector(mouse)
+
+
+def count_vectors(cls, func):
+    """
+    Count the vectors made while calling func
+    """
+    count = [0]
+    init = cls.__init__
+
+    def counting_init(self, *args):
+        count[0] += 1
+        init(self, *args)
+
+    cls.__init__ = counting_init
+    try:
+        func()
+    finally:
+        cls.__init__ = init
+    return count[0]
+
+
+def per_op(cls, number):
+    """
+    Time per call of the common operations (nanoseconds)
+    """
+    a, b = cls(3.5, 4.25), cls(1.5, -2.0)
+    t = (3.5, 4.25)
+    ops = {
+        'new (x, y)': lambda: cls(3.5, 4.25),
+        'new (tuple)': lambda: cls(t),
+        'copy': lambda: cls(a),
+        'add': lambda: a + b,
+        'sub': lambda: a - b,
+        'mul': lambda: a * 1.5,
+        'truediv': lambda: a / 1.5,
+        'unit': lambda: a.unit(),
+        'distance': lambda: cls.distance(a, b),
+    }
+    if cls is vector:
+        c = cls(3.5, 4.25)
+        ops.update({
+            'imul': lambda: c.imul(1.0),
+            'normalize': lambda: c.normalize(),
+            'distance_squared': lambda: cls.distance_squared(a, b),
+        })
+    return {k: min(timeit.repeat(f, number=number, repeat=3)) / number * 1e9 for k, f in ops.items()}
+
+
+def size_of(v):
+    return sys.getsizeof(v) + (sys.getsizeof(v.__dict__) if hasattr(v, '__dict__') else 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--actors', type=int, default=20, help='number of moving actors in a frame')
+    parser.add_argument('--frames', type=int, default=200, help='frames timed')
+    parser.add_argument('--number', type=int, default=200000, help='calls timed per operation')
+    parser.add_argument('--out', help='optional path of a json report')
+    args = parser.parse_args()
+    dt, mouse = 16, (120, 80)
+
+    report = {'ops_ns': {}, 'bytes': {}, 'frame': {}}
+    for name, cls, step in (('legacy', LegacyVector, legacy_frame), ('vector', vector, frame)):
+        movers = [Mover(cls, k) for k in range(args.actors)]
+        allocated = count_vectors(cls, lambda: step(movers, mouse, dt))
+        seconds = math.inf
+        for _ in range(5):  # fresh actors each time (nobody reaches their target within the timed frames)
+            movers = [Mover(cls, k) for k in range(args.actors)]
+            seconds = min(seconds, timeit.timeit(lambda: step(movers, mouse, dt), number=args.frames) / args.frames)
+        report['frame'][name] = {'vectors': allocated, 'us': seconds * 1e6}
+        report['bytes'][name] = size_of(cls(1.5, 2.5))
+        report['ops_ns'][name] = per_op(cls, args.number)
+
+    print("--- per operation (ns)")
+    print("%-18s %10s %10s" % ('', 'legacy', 'vector'))
+    for k, v in report['ops_ns']['vector'].items():
+        old = report['ops_ns']['legacy'].get(k)
+        print("%-18s %10s %10.1f" % (k, '%.1f' % old if old is not None else '-', v))
+    print("--- size of a vector: %i -> %i bytes" % (report['bytes']['legacy'], report['bytes']['vector']))
+    old, new = report['frame']['legacy'], report['frame']['vector']
+    print("--- frame of %i actors: %i -> %i vectors allocated, %.1f -> %.1f us" %
+          (args.actors, old['vectors'], new['vectors'], old['us'], new['us']))
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=1)
+        print("Wrote " + args.out)
+
+
+if __name__ == '__main__':
+    main()
@@ -49,10 +49,21 @@ patrol_move_distance = 2  # min distance from guide to move patrol
 patrol_wait_distance = 4  # max distance from guide to stop the guide
 
 # map settings
+map_name = 'default'  # map loaded at startup (Storage/maps/<map_name>.json + .npz)
+maps_path = 'Storage/maps'  # map definitions
 entry_size = controller_size * 3
 navmesh_width = 4  # extra pixels on either side of navmesh walls
 navmesh_ratio = 1  # ratio of resolution:navmesh_resolution
-can_see_multiplier = 2  # checks extra points on the navmesh for vision
+path_cache_size = 256  # max number of routes kept by the path cache
+path_budget_ms = 2  # time each frame the path broker can spend solving queued path requests
+path_workers = 0  # background pathfinding workers (0 solves queries synchronously, reproducible for headless tests)
+path_worker_kind = 'thread'  # 'thread' or 'process' pool for the path workers
+smooth_keep_doors = True  # path smoothing never skips the waypoints on either side of a door (locking still works)
+pvs_cell = 8  # size (in navmesh cells) of the coarse cells used by the potentially visible sets
+pvs_path = 'Storage/pvs.npz'  # saved potentially visible sets (rebuilt if the navmesh changes)
+compiled_path = 'Storage/compiled'  # compiled maps (navmesh + indexes, rebuilt if the map definition changes)
+collision_cell = 32  # size (in pixels) of the grid cells used to look up wall segments for collisions
+collision_steps = 3  # max number of times a move can slide along a wall (corners need 2)
 
 # schedule settings
 period_length = 5/60    # time for each round
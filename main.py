@@ -7,40 +7,45 @@ Mostly just initializes things and passes them to game.py
 import pygame
 import configs
 
-# set up pygame screen first (helps with initialization
-screen = pygame.display.set_mode(configs.resolution)
-
-# import custom modules
-from game import Game
-from objects import actors
-from objects import patrol
-from objects.waypoint import waypoints
-from objects import controller
-from objects.interface import interface
-from objects.uni_graph import game_map
-from objects.schedule import schedule
-import Mapping.map as map
-from objects import recorders
-from actor_tree.dummy_actor import Actor
-import tools
-
-configs.background = pygame.image.load('Storage/NavMesh2.png').convert_alpha()
-pygame.display.set_caption(tools.translator("BU"))
-
-# initialize objects
-num_actors = [0, 3, 5, 6, 9, 13, 15, 20]
-# num_actors = [1]
-# all_actors = [actors.Actor(level=_) for _ in num_actors]
-all_actors = [Actor(level=_) for _ in num_actors]
-
-player = controller.Controller()
-
-n_patrols = 1
-patrols = [patrol.Patrol() for i in range(n_patrols)]
-
-game_objects = [player] + patrols + all_actors + [game_map, map.game_map] + [interface]
-
-game = Game(screen, game_objects)
-
-game.run()
-
+# only start the game when run directly (spawned path worker processes import this file as __mp_main__)
+if __name__ == '__main__':
+    # set up pygame screen first (helps with initialization
+    screen = pygame.display.set_mode(configs.resolution)
+
+    # import custom modules
+    from game import Game
+    from objects import actors
+    from objects import patrol
+    from objects.waypoint import waypoints
+    from objects import controller
+    from objects.interface import interface
+    from objects.uni_graph import game_map
+    from objects.schedule import schedule
+    from objects.path_broker import path_broker
+    from objects.actor_store import actor_store
+    from objects.needs import needs_system
+    import Mapping.map as map
+    from objects import recorders
+    from actor_tree.dummy_actor import Actor
+    import tools
+
+    configs.background = pygame.image.load('Storage/NavMesh2.png').convert_alpha()
+    pygame.display.set_caption(tools.translator("BU"))
+
+    # initialize objects
+    num_actors = [0, 3, 5, 6, 9, 13, 15, 20]
+    # num_actors = [1]
+    # all_actors = [actors.Actor(level=_) for _ in num_actors]
+    all_actors = [Actor(level=_) for _ in num_actors]
+
+    player = controller.Controller()
+
+    n_patrols = 1
+    patrols = [patrol.Patrol() for i in range(n_patrols)]
+
+    game_objects = ([player] + patrols + all_actors + [actor_store, needs_system, path_broker] +
+                    [game_map, map.game_map] + [interface])
+
+    game = Game(screen, game_objects)
+
+    game.run()
@@ -0,0 +1,134 @@
+"""
+Singleton holding the locomotion state of every actor in contiguous numpy arrays (one row per actor)
+Actors read and write their position / speed through properties on their row (see actor_tree.dummy_actor.Actor)
+ - Actors mark their row as moving during their tree tick (Actor.go_to_waypoint / Actor.go_to_vector)
+ - Every moving row is stepped towards its target at once when the store is updated (after the actors)
+ - Rows are stepped immediately if the store isn't being updated by a game loop (tests, tree_testing, etc)
+"""
+
+import numpy as np
+
+from objects.base_object import BaseObject
+
+# debug variables
+debug = False
+
+
+class ActorStore(BaseObject):
+
+    def __init__(self, capacity=64):
+        """
+        :param capacity: number of rows allocated up front (doubled whenever it runs out)
+        """
+        super(ActorStore, self).__init__()
+        self.name = 'actor_store'
+
+        self.size = 0  # number of rows in use
+        self.actors = []  # actor owning each row
+
+        self.positions = np.zeros((capacity, 2))  # current position (x, y)
+        self.targets = np.zeros((capacity, 2))  # position being walked to (set while moving)
+        self.speeds = np.zeros(capacity)  # base speed (pixels / s)
+        self.multipliers = np.ones(capacity)  # product of the speed decreases of the lock and afms
+        self.moving = np.zeros(capacity, dtype=bool)  # rows to step during the next update
+
+        self.running = False  # set once the game loop starts updating the store
+
+        # stats
+        self.steps = 0  # number of vectorized steps
+        self.moved = 0  # rows moved over every step
+
+    def add(self, actor, position=(0, 0), speed=0):
+        """
+        Give an actor a row
+        :param actor: object owning the row
+        :param position: starting position
+        :param speed: base speed (pixels / s)
+        :return: index of the row
+        """
+        if self.size == len(self.speeds):
+            self.grow(2 * len(self.speeds))
+        row = self.size
+        self.size += 1
+        self.actors += [actor]
+        self.positions[row] = (position[0], position[1])
+        self.speeds[row] = speed
+        self.multipliers[row] = 1
+        self.moving[row] = False
+        return row
+
+    def grow(self, capacity):
+        """
+        Reallocate every column w/ room for more rows (rows keep their index)
+        """
+        if debug:
+            print("Growing the actor store to %i rows" % capacity)
+        n = self.size
+
+        def resized(a, fill):
+            out = np.full((capacity,) + a.shape[1:], fill, dtype=a.dtype)
+            out[:n] = a[:n]
+            return out
+
+        self.positions = resized(self.positions, 0)
+        self.targets = resized(self.targets, 0)
+        self.speeds = resized(self.speeds, 0)
+        self.multipliers = resized(self.multipliers, 1)
+        self.moving = resized(self.moving, False)
+
+    def move(self, row, x, y, dt):
+        """
+        Walk a row towards a position for one frame
+        :param row: index of the row
+        :param x: target x
+        :param y: target y
+        :param dt: frame time (ms), only used if the store isn't running
+        :return: None
+        """
+        self.targets[row] = (x, y)
+        if self.running:
+            self.moving[row] = True  # stepped w/ every other moving row in update
+        else:
+            self.step(np.array([row]), dt)
+
+    def step(self, rows, dt):
+        """
+        Move rows towards their targets at their current speed
+        :param rows: array of row indexes
+        :param dt: frame time (ms)
+        :return: None
+        """
+        d = self.targets[rows] - self.positions[rows]
+        m = np.sqrt(d[:, 0] * d[:, 0] + d[:, 1] * d[:, 1])
+        inv = np.divide(1, m, out=np.zeros_like(m), where=m > 0)  # rows already on their target stay put
+        # same order of operations as tools.vector (normalize, then scale by the speed, then by the frame time)
+        d *= inv[:, None]
+        d *= (self.speeds[rows] * self.multipliers[rows])[:, None]
+        d *= dt / 1000
+        self.positions[rows] += d
+        self.steps += 1
+        self.moved += len(rows)
+
+    def update(self, dt):
+        super().update(dt)
+        self.running = True
+
+        rows = np.flatnonzero(self.moving[:self.size])
+        if len(rows):
+            self.step(rows, dt)
+            self.moving[rows] = False
+
+    def stats(self):
+        """
+        :return: dict of row and step counts
+        """
+        return {
+            'rows': self.size,
+            'capacity': len(self.speeds),
+            'steps': self.steps,
+            'rows_per_step': self.moved / self.steps if self.steps else 0,
+        }
+
+
+# create the store singleton (add it to the game objects right after the actors)
+actor_store = ActorStore()
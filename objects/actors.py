@@ -299,8 +299,8 @@ class Actor(BaseObject):
         # manage afms affect on travel
         for i in self.afm:
             speed = speed * i.speed_decrease
-        d = self.waypoint.position - self.position
-        dv = d.unit() * speed * (dt / 1000)
+        dv = self.waypoint.position - self.position
+        dv.normalize().imul(speed).imul(dt / 1000)  # scale the new vector in place
         self.position += dv
 
     # pause the actor and then check for certain situations
@@ -26,6 +26,7 @@ from Mapping.map import map_objects
 # behavior variables
 show_grab_radius = True  # grey circle around player to show grab radius
 control_hold = True  # control held actor instead of player
+use_swept_collisions = False  # collide w/ the wall segments of the map (Map.walls) instead of Map.check_next
 
 # debug display variables
 debug = False    # general debugging messages
@@ -188,7 +189,7 @@ class Controller(BaseObject):
                 speed *= 1.5  # multiply speed by 1.5
 
             if not self.holding or not control_hold:  # move player and (possibly) held actor
-                dp = mv.unit() * speed * (dt / 1000)  # change in position (as a vector)
+                dp = mv.unit().imul(speed).imul(dt / 1000)  # change in position (as a vector)
                 np = self.position + dp  # new desired position
 
                 # adjust change in position by checking for collisions
@@ -202,14 +203,15 @@ class Controller(BaseObject):
                     if room_map.get_doorframe(self.position):
                         self.holding.position += dp
                     else:  # restrict actor movement w/ walls
-                        self.holding.position += self.collision_adjustment(self.holding.position, dp)
+                        self.holding.position += self.collision_adjustment(self.holding.position, dp,
+                                                                           self.holding.radius)
             else:  # move holidng and have player follow
                 # calc desired position
-                dp = mv.unit() * speed * (dt / 1000)  # change in position (as a vector)
+                dp = mv.unit().imul(speed).imul(dt / 1000)  # change in position (as a vector)
                 np = self.holding.position + dp  # new desired position
 
                 # adjust change in position by checking for collisions
-                dp = self.collision_adjustment(self.holding.position, dp)
+                dp = self.collision_adjustment(self.holding.position, dp, self.holding.radius)
 
                 # move holding to the new position (w/ collision manager approved dp vector)
                 self.holding.position += dp
@@ -218,7 +220,7 @@ class Controller(BaseObject):
                 if vector.distance(self.position, self.holding.position) > (.5 * configs.controller_grab_radius):
                     # calc distance to move
                     dp = self.holding.position - self.position
-                    mv = dp.unit() * speed * (dt / 1000)
+                    mv = dp.unit().imul(speed).imul(dt / 1000)
                     self.position += mv
 
     def freeze(self):
@@ -238,11 +240,12 @@ class Controller(BaseObject):
 
 
     @staticmethod
-    def collision_adjustment(cp, dp):
+    def collision_adjustment(cp, dp, radius=configs.controller_size):
         """
         Take a current position and goal position and have the map adjust goal position for collisions in the map
         :param cp: current position
         :param dp: change in position
+        :param radius: radius of the moving circle (only used by swept collisions)
         :return: Map-Approved change in position
         """
 
@@ -250,6 +253,11 @@ class Controller(BaseObject):
         if remove_collisions:
             return dp
 
+        # slide along the walls
+        if use_swept_collisions:
+            dx, dy = room_map.walls.move(cp, dp, radius)
+            return vector(dx, dy)
+
         np = cp + dp  # calculate new position
         possible = room_map.check_next(cp, np)  # get bool tuple from the map
 
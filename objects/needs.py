@@ -0,0 +1,152 @@
+"""
+Singleton advancing the fuel and tank of every actor in contiguous numpy arrays (one row per actor)
+Actors read and write fuel / tank / tank_size / drain_rate through properties on their row (see actor_tree.dummy_actor)
+ - Every row drains fuel into its tank once per delay (same curve as the old per actor WaterUpdate leaf)
+ - Rows crossing a threshold get the matching key added to actor.needs, the tree leaves consume them from there:
+    'overflow': tank is over the tank size (control.tank_empty.TankEmpty)
+    'tank': tank is over configs.tank_threshold (event_tree.AssignNeed -> event_classes.tank.Tank)
+    'water': fuel is under fuel_threshold (event_tree.AssignNeed -> event_classes.water.Water)
+ - Rows are stepped by their own WaterUpdate leaf if the system isn't being updated by a game loop (tests, etc)
+"""
+
+import numpy as np
+
+import configs
+from objects.base_object import BaseObject
+
+# debug variables
+debug = False
+
+fuel_threshold = .5  # fuel under which water becomes a need (see Water.check_importance)
+
+
+class NeedsSystem(BaseObject):
+
+    def __init__(self, capacity=64, delay=1):
+        """
+        :param capacity: number of rows allocated up front (doubled whenever it runs out)
+        :param delay: time (seconds) between fuel drains
+        """
+        super(NeedsSystem, self).__init__()
+        self.name = 'needs_system'
+
+        self.delay = delay
+
+        self.size = 0  # number of rows in use
+        self.actors = []  # actor owning each row
+
+        self.fuel = np.zeros(capacity)
+        self.tank = np.zeros(capacity)
+        self.tank_size = np.ones(capacity)
+        self.drain_rate = np.zeros(capacity)  # fuel drained per minute (ln(2) / half life)
+        self.timers = np.zeros(capacity)  # time (seconds) left until the next drain
+
+        self.running = False  # set once the game loop starts updating the system
+
+        # stats
+        self.steps = 0
+        self.emitted = {'overflow': 0, 'tank': 0, 'water': 0}
+
+    def add(self, actor, fuel, tank, tank_size, drain_rate):
+        """
+        Give an actor a row (needs it already past a threshold are emitted right away)
+        :param actor: object w/ a needs set
+        :return: index of the row
+        """
+        if self.size == len(self.fuel):
+            self.grow(2 * len(self.fuel))
+        row = self.size
+        self.size += 1
+        self.actors += [actor]
+        self.fuel[row] = fuel
+        self.tank[row] = tank
+        self.tank_size[row] = tank_size
+        self.drain_rate[row] = drain_rate
+        self.timers[row] = self.delay
+
+        rows = np.array([row])
+        ratio = self.tank[rows] / self.tank_size[rows]
+        self.emit('overflow', rows[ratio > 1])
+        self.emit('tank', rows[ratio > configs.tank_threshold])
+        self.emit('water', rows[self.fuel[rows] < fuel_threshold])
+        return row
+
+    def grow(self, capacity):
+        """
+        Reallocate every column w/ room for more rows (rows keep their index)
+        """
+        if debug:
+            print("Growing the needs system to %i rows" % capacity)
+        n = self.size
+
+        def resized(a, fill):
+            out = np.full(capacity, fill, dtype=a.dtype)
+            out[:n] = a[:n]
+            return out
+
+        self.fuel = resized(self.fuel, 0)
+        self.tank = resized(self.tank, 0)
+        self.tank_size = resized(self.tank_size, 1)
+        self.drain_rate = resized(self.drain_rate, 0)
+        self.timers = resized(self.timers, 0)
+
+    def emit(self, key, rows):
+        """
+        Add a need to the actors of some rows
+        :param key: name of the need
+        :param rows: array of row indexes
+        :return: None
+        """
+        for row in rows.tolist():
+            self.actors[row].needs.add(key)
+        self.emitted[key] += len(rows)
+
+    def step(self, rows, dt):
+        """
+        Count down the drain timers of some rows, drain the fuel of the rows that ran out and emit crossed thresholds
+        :param rows: array of row indexes
+        :param dt: frame time (ms)
+        :return: None
+        """
+        self.steps += 1
+        t = self.timers[rows]
+        waiting = t > 0
+        self.timers[rows[waiting]] = t[waiting] - dt * (1 / 1000)
+
+        rows = rows[~waiting]
+        if not len(rows):
+            return
+        self.timers[rows] = self.delay
+
+        # drain fuel into the tank
+        fuel = self.fuel[rows]
+        tank = self.tank[rows]
+        df = fuel * (1 - np.exp(-(self.delay * (1 / 60)) * self.drain_rate[rows]))  # change in fuel
+        self.fuel[rows] = fuel - df
+        self.tank[rows] = tank + df
+
+        # emit thresholds crossed by the drain (nothing else can raise the tank or lower the fuel)
+        size = self.tank_size[rows]
+        before, after = tank / size, self.tank[rows] / size
+        self.emit('overflow', rows[(before <= 1) & (after > 1)])
+        self.emit('tank', rows[(before <= configs.tank_threshold) & (after > configs.tank_threshold)])
+        self.emit('water', rows[(fuel >= fuel_threshold) & (self.fuel[rows] < fuel_threshold)])
+
+    def update(self, dt):
+        super().update(dt)
+        self.running = True
+        self.step(np.arange(self.size), dt)  # read by the actors at the start of their next tick
+
+    def stats(self):
+        """
+        :return: dict of row, step and emitted need counts
+        """
+        return {
+            'rows': self.size,
+            'steps': self.steps,
+            'emitted': dict(self.emitted),
+        }
+
+
+# create the needs singleton (add it to the game objects right after the actors)
+needs_system = NeedsSystem()
@@ -0,0 +1,138 @@
+"""
+Singleton used to spread path requests across frames
+Actors submit requests instead of pathfinding inside of their tree tick
+ - Requests for the same (start, destination) are solved once and shared
+ - Requests are serviced once per frame until the frame's time budget is used up
+"""
+
+import time
+from collections import OrderedDict
+
+import configs
+from objects.base_object import BaseObject
+from Mapping.path_cache import path_cache
+
+# debug variables
+debug = False
+
+
+class PathRequest:
+    """
+    One queued (start, destination) pair and every actor waiting on it
+    """
+
+    def __init__(self, start, end):
+        self.start = start
+        self.end = end
+        self.actors = []
+        self.time = time.perf_counter()  # time of the first submission (for latency stats)
+
+
+class PathBroker(BaseObject):
+
+    def __init__(self, solver=path_cache.path, budget=configs.path_budget_ms):
+        """
+        :param solver: function(start_node, end_node) returning a path w/ the tools.a_star contract
+        :param budget: time (ms) that can be spent on requests each frame
+        """
+        super(PathBroker, self).__init__()
+        self.name = 'path_broker'
+
+        self.solver = solver
+        self.budget = budget
+
+        self.queue = OrderedDict()  # (start index, end index): PathRequest
+        self.pending = {}  # actor: key of the request it is waiting on
+        self.running = False  # set once the game loop starts updating the broker
+
+        # stats
+        self.submitted = 0
+        self.coalesced = 0  # requests that joined an already queued request
+        self.serviced = 0  # unique requests solved
+        self.max_depth = 0
+        self.total_latency = 0  # ms from submission to delivery (summed over serviced requests)
+        self.max_latency = 0
+
+    def submit(self, actor, start, end):
+        """
+        Queue a path request for an actor
+         - Solved immediately if the broker isn't being updated by a game loop (tests, tree_testing, etc)
+        :param actor: object w/ a receive_path(start, path) method
+        :param start: starting waypoint
+        :param end: destination waypoint
+        :return: None
+        """
+        self.submitted += 1
+        self.cancel(actor)  # only the latest request of an actor matters
+        if not self.running:
+            actor.receive_path(start, self.solver(start, end))
+            return
+
+        key = (start.index, end.index)
+        request = self.queue.get(key)
+        if request is None:
+            request = PathRequest(start, end)
+            self.queue[key] = request
+        else:
+            self.coalesced += 1
+        request.actors += [actor]
+        self.pending[actor] = key
+        self.max_depth = max(self.max_depth, len(self.queue))
+
+    def cancel(self, actor):
+        """
+        Drop an actor's queued request (if it has one)
+        """
+        key = self.pending.pop(actor, None)
+        if key is not None:
+            request = self.queue[key]
+            request.actors.remove(actor)
+            if not request.actors:
+                del self.queue[key]
+
+    def is_pending(self, actor):
+        return actor in self.pending
+
+    def update(self, dt):
+        super().update(dt)
+        self.running = True
+
+        # always service at least one request so a tiny budget can't starve the queue
+        start = time.perf_counter()
+        while self.queue:
+            key, request = self.queue.popitem(last=False)
+            path = self.solver(request.start, request.end)
+            for actor in request.actors:
+                del self.pending[actor]
+                actor.receive_path(request.start, list(path))  # each actor pops from its own copy
+
+            # manage stats
+            now = time.perf_counter()
+            latency = (now - request.time) * 1000
+            self.serviced += 1
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+
+            if (now - start) * 1000 >= self.budget:
+                break
+
+        if debug and self.queue:
+            print("Path broker carried over %i requests" % len(self.queue))
+
+    def stats(self):
+        """
+        :return: dict of queue depth and latency stats
+        """
+        return {
+            'depth': len(self.queue),
+            'max_depth': self.max_depth,
+            'submitted': self.submitted,
+            'coalesced': self.coalesced,
+            'serviced': self.serviced,
+            'avg_latency_ms': self.total_latency / self.serviced if self.serviced else 0,
+            'max_latency_ms': self.max_latency,
+        }
+
+
+# create the broker singleton (add it to the game objects after the actors)
+path_broker = PathBroker()
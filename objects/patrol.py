@@ -17,6 +17,7 @@ from objects.interface import interface
 from event_manager import event_manager, keys, mouse
 from Mapping.map import game_map as room_map
 import Mapping.map as map
+from actor_tree.dummy_actor import Actor
 
 # rename hallway nodes for compatability
 waypoints = hallway_nodes
@@ -25,6 +26,11 @@ waypoints = hallway_nodes
 show_vision = False  # show area of vision for patrol
 show_forward = True
 
+# behavior variables
+use_path_workers = False  # solve new paths on the background path workers (Mapping.map.path_workers)
+use_smoothing = False  # skip waypoints that can be walked past in a straight line
+watch_actors = True  # also keep track of the actors in view (Patrol.seen), not just the player
+
 # debug_vars
 debug = False
 debug_pathfinding = False
@@ -62,12 +68,14 @@ class Patrol(BaseObject):
 
         # behavior variables
         self.reset_path = False  # choose new waypoint + calculate path
+        self.path_request = None  # future from the path workers (path is empty until it is done)
         self.stationary = False  # disable movement
         self.idle_time = 0
         self.chase = None  # actor/controller to chase
         self.holding = None  # held actor/controller
         self.chase_update_time = 0
         self.chase_update_period = 200  # how often to grab chase position (in ms)
+        self.seen = []  # player/actors in view this frame
 
     def update(self, dt):
         super().update(dt)
@@ -84,6 +92,17 @@ class Patrol(BaseObject):
         else:
             self.idle_time = 0
 
+        # collect a path solved by the path workers
+        if self.path_request and self.path_request.done():
+            path = map.path_workers.collect(self.path_request)
+            self.path_request = None
+            if path is None:  # solved before a door was locked/unlocked, ask again
+                self.path_request = map.path_workers.path(self.waypoint, self.destination)
+            else:
+                self.path = path
+                if use_smoothing:
+                    self.path = map.path_smoother.smooth(self.waypoint, self.path)
+
         # reset the path
         if self.reset_path:
             if debug_pathfinding:
@@ -94,7 +113,13 @@ class Patrol(BaseObject):
             if self.destination == self.waypoint or type(self.destination) == vector:
                 if debug_pathfinding: print("Getting random destination")
                 self.destination = random.choice(waypoints)
-            self.path = a_star(waypoints, self.waypoint, self.destination)
+            if use_path_workers:
+                self.path_request = map.path_workers.path(self.waypoint, self.destination)
+                self.path = []
+            else:
+                self.path = map.room_planner.path(self.waypoint, self.destination)  # long random trips, refined room by room
+                if use_smoothing:
+                    self.path.smoother = map.path_smoother.smooth  # room segments are smoothed as they are refined
             self.reset_path = False
 
 
@@ -119,6 +144,8 @@ class Patrol(BaseObject):
                         if self.holding:
                             self.holding.unfreeze()
                             self.holding = None
+                    elif self.path_request:  # wait at the waypoint until the workers are done
+                        pass
                     else:
                         try:
                             self.waypoint = self.path.pop()
@@ -176,23 +203,33 @@ class Patrol(BaseObject):
                         self.pause(5)
 
         # event detection
+        self.seen = []
         if not self.chase and not interface.state == 'idle':
             # if debug: print("Patrol is Looking...")
-            # check if player is in range
-            if vector.distance(self.position, event_manager.player.position) < self.vision_radius:
-                # check if player is in same room
-                if room_map.get_room(self.position) == room_map.get_room(event_manager.player.position):
-                    # check if we can actually see player
-                    can_see = (room_map.can_see(self.position, event_manager.player.position) and
-                                vector.angle(self.forward, event_manager.player.position - self.position) < self.vision_angle)
-                    if can_see:
-                        if debug: print("Detected an event!")
-                        self.chase = event_manager.player
-                        self.chase_frames = 0
-                        self.waypoint = self.chase.position
-                        self.destination = self.waypoint
-                        self.path = []
+            self.seen = self.look()
+            # check if we can see the player (in range, in the same room and in the cone of vision)
+            if event_manager.player in self.seen:
+                if debug: print("Detected an event!")
+                self.chase = event_manager.player
+                self.chase_frames = 0
+                self.waypoint = self.chase.position
+                self.destination = self.waypoint
+                self.path = []
+                self.path_request = None
+
 
+    def look(self):
+        """
+        Find every target in view w/ a single Map.can_see_many call
+        :return: list of the player/actors the patrol can see
+        """
+        targets = [event_manager.player]
+        if watch_actors:
+            targets += [_ for _ in event_manager.game_objects if type(_) == Actor]
+        points = np.array([[t.position.x, t.position.y] for t in targets])
+        mask = room_map.can_see_many(self.position, points, self.vision_radius, self.forward, self.vision_angle,
+                                     same_room=True)
+        return [t for t, m in zip(targets, mask) if m]
 
     def draw(self, screen):
         super().draw(screen)
@@ -224,9 +261,9 @@ class Patrol(BaseObject):
         # move the guide
         if vector.distance(self.guide, self.position) < self.guide_max_distance:
             speed = self.guide_speed
-            d = gp - self.guide
-            dv = d.unit() * speed * (dt / 1000)
-            self.guide += dv
+            dv = gp - self.guide
+            dv.normalize().imul(speed).imul(dt / 1000)  # scale the new vector in place
+            self.guide += dv  # new vector (the held actor shares the old guide)
 
         # manage held actor
         if self.holding:
@@ -236,8 +273,8 @@ class Patrol(BaseObject):
         if vector.distance(self.guide, self.position) > self.guide_min_distance:
             # move the position
             speed = self.speed
-            d = self.guide - self.position
-            dv = d.unit() * speed * (dt / 1000)
+            dv = self.guide - self.position
+            dv.normalize().imul(speed).imul(dt / 1000)  # scale the new vector in place
             self.position += dv
 
     # pause the actor and then check for certain situations
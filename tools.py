@@ -8,6 +8,7 @@ import configs
 import math
 import random
 
+import heapq
 import queue
 
 # debug_variables
@@ -16,17 +17,29 @@ debug_navmesh = True
 
 
 class vector:
+    """
+    2D vector used for every position on the map
+     - __slots__ keeps vectors small and attribute access fast (vectors are made in every hot loop)
+     - Operators always return a new vector. Positions are shared between objects (an actor standing on a waypoint
+       holds the waypoint's position), so += is left as a new vector too.
+     - iadd/isub/imul/normalize change a vector in place (no new object), only use them on a vector nothing else holds
+       a ref to (like the result of an operator)
+    """
+    __slots__ = ('x', 'y')
+
     def __init__(self, x, y=None):
-        if y is None:
-            if type(x) == vector:  # given another vector to copy
-                self.x = x.x
-                self.y = x.y
-            else:  # hopefully given a tuple/list
-                self.x = x[0]
-                self.y = x[1]
-        else:  # passed two arguments
+        if y is not None:  # passed two arguments (most common)
             self.x = x
             self.y = y
+        elif type(x) is tuple:  # mouse positions, rect centers, etc.
+            self.x = x[0]
+            self.y = x[1]
+        elif type(x) is vector:  # given another vector to copy
+            self.x = x.x
+            self.y = x.y
+        else:  # hopefully given a list (or another sequence)
+            self.x = x[0]
+            self.y = x[1]
 
     def __repr__(self):
         return ("x: %i,y: %i" % (self.x, self.y))
@@ -53,10 +66,39 @@ class vector:
         return vector(self.x * v, self.y * v)
 
     def __truediv__(self, v):
-        return self * (1 / v)
+        inv = 1 / v  # same rounding as multiplying by the inverse
+        return vector(self.x * inv, self.y * inv)
 
     def unit(self):
-        return self / vector.magnitude(self)
+        inv = 1 / math.sqrt(self.x * self.x + self.y * self.y)
+        return vector(self.x * inv, self.y * inv)
+
+    # ------ In place methods (return the same vector, so they can be chained)
+    def iadd(self, v):
+        self.x += v.x
+        self.y += v.y
+        return self
+
+    def isub(self, v):
+        self.x -= v.x
+        self.y -= v.y
+        return self
+
+    def imul(self, v):
+        self.x *= v
+        self.y *= v
+        return self
+
+    def normalize(self):
+        """
+        Scale to a length of 1 in place (a zero vector is left as is)
+        """
+        m = math.sqrt(self.x * self.x + self.y * self.y)
+        if m:
+            inv = 1 / m
+            self.x *= inv
+            self.y *= inv
+        return self
 
     # return vector as a tuple of (x, y)
     def as_tuple(self):
@@ -70,12 +112,22 @@ class vector:
     # call with tools.vector.function
     @staticmethod
     def magnitude(v):
-        return math.sqrt((v.x ** 2) + v.y ** 2)
+        return math.sqrt(v.x * v.x + v.y * v.y)
 
     @staticmethod
     def distance(a, b):
-        d = a - b
-        return (math.sqrt((d.x ** 2) + (d.y ** 2)))
+        dx = a.x - b.x
+        dy = a.y - b.y
+        return math.sqrt(dx * dx + dy * dy)
+
+    @staticmethod
+    def distance_squared(a, b):
+        """
+        Squared distance (compare against a squared radius to skip the square root)
+        """
+        dx = a.x - b.x
+        dy = a.y - b.y
+        return dx * dx + dy * dy
 
     @staticmethod
     def angle(a, b):
@@ -93,38 +145,29 @@ def vector_from_tuple(t):
 # start_node and end_node are the actual waypoint objects, not the names
 def a_star(graph, start_node, end_node):
     """
-    Used to find the best path through a graph
+    Used to find the shortest path through a graph
+     - Open list is a binary heap, edges cost the distance between waypoint positions
+     - Improved g values are pushed as new heap entries, stale entries are skipped when popped
     :param graph: graph object (?), could be removed since it is not actually used
     :param start_node: staring node on the graph
     :param end_node: ending node of the graph
-    :return: a list containing the path (empty if no path is found)
+    :return: a reversed list containing the path, start node excluded (empty if no path is found)
     """
-    # init open and closed lists
-    open = start_node
-    open_list = set([start_node])
-    closed_list = set([])
-
-    # init dict of g values
+    # init g values and parents (for reverse traversal)
     g = {start_node: 0}
-
-    # start parents list (for reverse traversal)
     parents = {start_node: start_node}
+    closed_list = set()
 
-    # while there are still things in the open list
-    while len(open_list) > 0:
-        # initial next path is an empty list
-        n = None
+    # heap entries are (f, tie breaker, node), the counter keeps waypoints from ever being compared
+    count = 0
+    open_heap = [(astar_h(start_node, end_node), count, start_node)]
 
-        # go through the open paths to find approximate quickest
-        for v in open_list:
-            if not n or g[v] + astar_h(open, v) < g[n] + astar_h(open, n):  # calculate next g value
-                n = v
-
-        if n == None:  # no more paths to check
-            print("Path does not exist")
-            return []
+    # while there are still things in the open list
+    while open_heap:
+        _, _, n = heapq.heappop(open_heap)  # node w/ the lowest f value
+        if n in closed_list:  # stale entry from a g value that has since been improved
+            continue
 
-        # TODO: Finsh reconstructing the path
         if n == end_node:
             # reconstruct the path
             fp = []
@@ -133,110 +176,24 @@ def a_star(graph, start_node, end_node):
                 n = parents[n]
                 if n == start_node:
                     break
-            # fp.reverse()  # reverse in place
-            return fp  # return list of nodes in order to traverse them
+            return fp  # return list of nodes in reverse order (pop to traverse them)
 
-        # loop through next paths
-        for m in n.paths:
-            # try and add list to open paths (if not already viewed)
-            if m not in open_list and m not in closed_list:
-                open_list.add(m)  # add to open list
-                parents[m] = n  # add parent node of n
-                g[m] = g[n] + astar_h(open, n)  # add g score for current node
-            # # check if this is a quicker way to get to the previous node
-            # else:
-            #     if g[m] > g[n]:
-            #         g[m] = g[n]
-            #         parents[m] = parents[n]
-            #
-            #         if m in closed_list:
-            #             closed_list.remove(m)
-            #             open_list.add(m)
-        open_list.remove(n)
         closed_list.add(n)
 
+        # loop through next paths
+        for m in n.paths:
+            if m in closed_list:
+                continue
+            gm = g[n] + astar_h(n, m)  # g score through the current node
+            if m not in g or gm < g[m]:  # new node or quicker way to get to it
+                g[m] = gm
+                parents[m] = n
+                count += 1
+                heapq.heappush(open_heap, (gm + astar_h(m, end_node), count, m))
 
-# calculate h value for the A* algorithm
-def astar_h_navmesh(a, b):
-    return vector.distance(vector(a), vector(b))
-
-
-# start_node and end_node are the actual waypoint objects, not the names
-def a_star_navmesh(graph, start_node, end_node):
-    """
-    Used to find the best path through a graph
-    :param graph: navmesh array filled with 1's and 0's
-    :param start_node: staring position as a vector
-    :param end_node: ending position as a vector
-    :return: a list containing the path (empty if no path is found)
-    """
-    # init open and closed lists
-    if True:
-        open = start_node
-        open_list = set([start_node])
-        closed_list = set([])
-
-        # init dict of g values
-        g = {start_node: 0}
-
-        # start parents list (for reverse traversal)
-        parents = {start_node: start_node}
-
-        # while there are still things in the open list
-        while len(open_list) > 0:
-            # initial next path is an empty list
-            n = None
-
-            # go through the open paths to find approximate quickest
-            for v in open_list:
-                if not n or g[v] + astar_h_navmesh(end_node, v) < g[n] + astar_h_navmesh(end_node, n):  # calculate next g value
-                    n = v
-
-            if n == None:  # no more paths to check
-                print("Path does not exist")
-                return []
-
-            # TODO: Finsh reconstructing the path
-            if n == end_node:
-                # reconstruct the path
-                print("Finished the path!")
-                fp = []
-                while True:
-                    fp += [n]
-                    n = parents[n]
-                    if n == start_node:
-                        break
-                # fp.reverse()  # reverse in place
-                return fp  # return list of nodes in order to traverse them
-
-            # loop through next paths
-            nv = vector(n)
-            checklist = [(-1, 0), (1, 0), (0, -1), (0, 1)]
-            random.shuffle(checklist)
-            paths = [floor_vector(nv + vector(_)) for _ in checklist if inbounds(nv + vector(_))]
-            paths = [_ for _ in paths if graph[_.x, _.y]]
-            for m in paths:
-                # try and add list to open paths (if not already viewed)
-                if m.as_tuple() not in open_list and m.as_tuple() not in closed_list:
-                    open_list.add(m.as_tuple())  # add to open list
-                    parents[m.as_tuple()] = n  # add parent node of n
-                    g[m.as_tuple()] = g[n] + astar_h_navmesh(open, n)  # add g score for current node
-                # check if this is a quicker way to get to the previous node
-                else:
-                    if g[m.as_tuple()] > g[n]:
-                        g[m.as_tuple()] = g[n]
-                        parents[m.as_tuple()] = parents[n]
-
-                        if m.as_tuple() in closed_list:
-                            closed_list.remove(m.as_tuple())
-                            open_list.add(m.as_tuple())
-            open_list.remove(n)
-            closed_list.add(n)
-
-            # if debug_navmesh:
-            #     print(len(open_list))
-            #     print(len(closed_list))
-            #     print("------")
+    if debug:
+        print("Path does not exist")
+    return []
 
 
 # calculate h value for the A* algorithm
@@ -244,16 +201,6 @@ def astar_h(a, b):
     return vector.distance(a.position, b.position)
 
 
-# calculate h value for the A* algorithm
-def astar_h_navmesh(a, b):
-    return vector.distance(vector(a), vector(b))
-
-
-def inbounds(v):
-    (mx, my) = (configs.width, configs.height)
-    return 0 <= v.x < mx and 0 <= v.y < my
-
-
 # ensure position tuples are ints
 def floor_vector(v):
     return vector(math.floor(v.x), math.floor(v.y))